@@ -3,14 +3,35 @@
 提供完整的天氣預報功能
 """
 
-from .models import WeatherForecast, WeatherEntry, WindInfo, WeatherError
-from .weather_service import WeatherService
+from .models import (
+    WeatherForecast,
+    WeatherEntry,
+    WindInfo,
+    WeatherError,
+    BatchWeatherForecast,
+    ForecastErrorInfo,
+    CompactWeatherEntry,
+    CompactWeatherForecast,
+    ForecastSeries,
+    DailyWeatherSummary,
+)
+from .weather_service import WeatherService, AsyncWeatherService
+from .weather_cache import ForecastCache, GeocodeCache
 
 __version__ = "1.0.0"
 __all__ = [
     "WeatherService",
+    "AsyncWeatherService",
+    "GeocodeCache",
+    "ForecastCache",
     "WeatherForecast",
     "WeatherEntry",
     "WindInfo",
     "WeatherError",
+    "BatchWeatherForecast",
+    "ForecastErrorInfo",
+    "CompactWeatherEntry",
+    "CompactWeatherForecast",
+    "ForecastSeries",
+    "DailyWeatherSummary",
 ]
@@ -0,0 +1,180 @@
+"""
+預報處理路徑基準測試
+
+以合成的 /forecast 回應比較逐筆處理（pydantic）、精簡欄位與 NumPy 向量化三種路徑，
+不需要網路與 API 金鑰。
+
+用法:
+    python benchmarks/bench_forecast_processing.py --cities 500 --repeat 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import forecast_vectorized  # noqa: E402
+from models import DailyWeatherSummary  # noqa: E402
+from weather_cache import ForecastCache, GeocodeCache  # noqa: E402
+from weather_service import WeatherService  # noqa: E402
+
+
+def make_current(rng: random.Random) -> Dict[str, Any]:
+    """產生一筆合成的 /weather 回應"""
+    return {
+        "coord": {"lat": rng.uniform(-60, 60), "lon": rng.uniform(-180, 180)},
+        "main": {
+            "temp": round(rng.uniform(-5, 35), 2),
+            "feels_like": round(rng.uniform(-5, 35), 2),
+            "temp_min": round(rng.uniform(-5, 35), 2),
+            "temp_max": round(rng.uniform(-5, 35), 2),
+            "humidity": rng.randint(20, 100),
+        },
+        "weather": [{"description": "scattered clouds"}],
+        "wind": {"speed": round(rng.uniform(0, 15), 2), "deg": rng.randint(0, 359)},
+        "clouds": {"all": rng.randint(0, 100)},
+    }
+
+
+def make_forecast(rng: random.Random, slots: int = 40) -> Dict[str, Any]:
+    """產生一筆合成的 /forecast 回應（3 小時一筆）"""
+    start = int(time.time()) // 10800 * 10800
+    entries = []
+    for i in range(slots):
+        entry = make_current(rng)
+        entry.pop("coord")
+        entry["dt"] = start + i * 10800
+        if rng.random() < 0.3:
+            entry["rain"] = {"3h": round(rng.uniform(0, 5), 2)}
+        entries.append(entry)
+    return {"list": entries, "city": {"coord": {"lat": 0.0, "lon": 0.0}}}
+
+
+def bench(name: str, fn: Callable[[], Any], repeat: int, cities: int) -> float:
+    """執行 fn repeat 次，輸出最佳耗時與每城市耗時"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<32} {best * 1000:10.2f} ms  {best / cities * 1e6:10.1f} µs/city")
+    return best
+
+
+def python_daily_summary(
+    forecast: Dict[str, Any], tz: timezone
+) -> List[DailyWeatherSummary]:
+    """逐筆計算每日統計，作為向量化版本的對照"""
+    days: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in forecast["list"]:
+        date = datetime.fromtimestamp(entry["dt"], tz).date().isoformat()
+        days.setdefault(date, []).append(entry)
+    return [
+        DailyWeatherSummary(
+            date=date,
+            temp_min=round(min(e["main"]["temp_min"] for e in entries), 2),
+            temp_max=round(max(e["main"]["temp_max"] for e in entries), 2),
+            temp_mean=round(sum(e["main"]["temp"] for e in entries) / len(entries), 2),
+            humidity_mean=round(
+                sum(e["main"]["humidity"] for e in entries) / len(entries), 1
+            ),
+            wind_speed_max=round(max(e["wind"]["speed"] for e in entries), 2),
+            rain_total=round(
+                sum(e["rain"].get("3h", 0) for e in entries if "rain" in e), 2
+            ),
+            slots=len(entries),
+        )
+        for date, entries in sorted(days.items())
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=500, help="城市數量")
+    parser.add_argument("--slots", type=int, default=40, help="每個城市的預報時段數")
+    parser.add_argument("--repeat", type=int, default=3, help="每個路徑重複次數")
+    parser.add_argument(
+        "--timezone-offset", type=int, default=8, help="時區偏移（小時）"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = [
+        (make_current(rng), make_forecast(rng, args.slots)) for _ in range(args.cities)
+    ]
+    forecasts = [forecast for _, forecast in payloads]
+    tz = timezone(timedelta(hours=args.timezone_offset))
+    service = WeatherService(
+        api_key="bench",
+        geocode_cache=GeocodeCache(":memory:"),
+        forecast_cache=ForecastCache(),
+    )
+
+    print(
+        f"{args.cities} cities x {args.slots} slots, "
+        f"best of {args.repeat}, numpy={'yes' if forecast_vectorized.is_available() else 'no'}"
+    )
+    bench(
+        "pydantic WeatherForecast",
+        lambda: [
+            service._build_forecast(service._format_current_weather(c, tz), f, tz)
+            for c, f in payloads
+        ],
+        args.repeat,
+        args.cities,
+    )
+    bench(
+        "compact (python)",
+        lambda: [service._build_compact_forecast(c, f, tz) for c, f in payloads],
+        args.repeat,
+        args.cities,
+    )
+    bench(
+        "compact + to_dict (python)",
+        lambda: [
+            service._build_compact_forecast(c, f, tz).to_dict() for c, f in payloads
+        ],
+        args.repeat,
+        args.cities,
+    )
+    bench(
+        "daily summary (python)",
+        lambda: [python_daily_summary(f, tz) for f in forecasts],
+        args.repeat,
+        args.cities,
+    )
+
+    if not forecast_vectorized.is_available():
+        print("numpy 未安裝，略過向量化路徑")
+        return
+
+    bench(
+        "compact (numpy)",
+        lambda: [
+            service._build_compact_forecast(c, f, tz, vectorized=True)
+            for c, f in payloads
+        ],
+        args.repeat,
+        args.cities,
+    )
+    bench(
+        "daily summary (numpy, per city)",
+        lambda: [forecast_vectorized.summarize_daily(f, tz) for f in forecasts],
+        args.repeat,
+        args.cities,
+    )
+    bench(
+        "daily summary (numpy, batched)",
+        lambda: forecast_vectorized.summarize_daily_batch(forecasts, tz),
+        args.repeat,
+        args.cities,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+天氣服務負載基準測試
+
+啟動本機 OpenWeatherMap 替身伺服器（fake_owm_server.py），以多個並發客戶端驅動
+天氣服務，輸出吞吐量與 p50/p95/p99 延遲，不需要網路與 API 金鑰。
+
+目標:
+    service  直接呼叫 AsyncWeatherService.get_forecast
+    sse      經由 SSE 呼叫 MCP 工具 get_current_weather（每個客戶端一個工作階段）
+    stdio    經由 stdio 呼叫 MCP 工具 get_current_weather（每個客戶端一個伺服器行程）
+
+用法:
+    python benchmarks/bench_load.py service --clients 50 --requests 2000
+    python benchmarks/bench_load.py sse --clients 20 --requests 500 --cache-ttl 0
+    python benchmarks/bench_load.py stdio --clients 4 --requests 200 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# 在子行程中啟動 MCP 伺服器用的程式碼
+SERVER_CODE = "import weather_forecast_mcp_server as s; s.mcp.run({args})"
+
+
+def free_port() -> int:
+    """取得一個可用的本機連接埠"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(url: str, timeout: float = 15.0) -> None:
+    """等待 HTTP 服務可以連線"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} 在 {timeout} 秒內未啟動")
+            time.sleep(0.1)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """返回已排序樣本的百分位數"""
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def report(name: str, latencies: List[float], errors: int, elapsed: float) -> None:
+    """輸出吞吐量與延遲百分位數"""
+    ordered = sorted(latencies)
+    total = len(latencies) + errors
+    print(f"目標: {name}")
+    print(f"  請求數 {total}（失敗 {errors}），耗時 {elapsed:.2f} s")
+    print(f"  吞吐量 {total / elapsed:10.1f} req/s")
+    for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        print(f"  {label} {percentile(ordered, q) * 1000:10.2f} ms")
+
+
+async def drive(
+    clients: int,
+    requests: int,
+    locations: List[str],
+    call: Callable[[int, str], Awaitable[Any]],
+) -> tuple[List[float], int, float]:
+    """
+    以 clients 個並發工作者共發送 requests 次呼叫
+
+    Args:
+        clients: 並發工作者數
+        requests: 總呼叫次數
+        locations: 輪流查詢的地點
+        call: 呼叫函數，參數為 (工作者編號, 地點)
+
+    Returns:
+        (成功呼叫的延遲列表, 失敗次數, 總耗時秒數)
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker(worker_id: int) -> None:
+        nonlocal errors
+        for i in counter:
+            location = locations[i % len(locations)]
+            started = time.perf_counter()
+            try:
+                await call(worker_id, location)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def bench_service(args: argparse.Namespace, locations: List[str]) -> None:
+    """直接驅動 AsyncWeatherService"""
+    from weather_service import AsyncWeatherService
+
+    async with AsyncWeatherService() as service:
+        result = await drive(
+            args.clients,
+            args.requests,
+            locations,
+            lambda _, location: service.get_forecast(location, 8),
+        )
+        report("AsyncWeatherService.get_forecast", *result)
+        print(f"  快取統計 {service.cache_stats()['forecast']}")
+
+
+async def bench_mcp(
+    name: str,
+    args: argparse.Namespace,
+    locations: List[str],
+    make_transport: Callable[[], Any],
+) -> None:
+    """以多個 MCP 客戶端工作階段呼叫 get_current_weather"""
+    from fastmcp import Client
+
+    sessions = [Client(make_transport()) for _ in range(args.clients)]
+    setup_started = time.perf_counter()
+    await asyncio.gather(*(session.__aenter__() for session in sessions))
+    setup = time.perf_counter() - setup_started
+    try:
+        result = await drive(
+            args.clients,
+            args.requests,
+            locations,
+            lambda worker_id, location: sessions[worker_id].call_tool(
+                "get_current_weather", {"location": location, "timezone_offset": 8}
+            ),
+        )
+        report(name, *result)
+        print(f"  建立 {args.clients} 個工作階段耗時 {setup * 1000:.0f} ms")
+    finally:
+        await asyncio.gather(
+            *(session.__aexit__(None, None, None) for session in sessions),
+            return_exceptions=True,
+        )
+
+
+async def run(args: argparse.Namespace, env: Dict[str, str]) -> None:
+    """依目標執行基準測試"""
+    from fastmcp.client.transports import SSETransport, StdioTransport
+
+    locations = [f"City{i}" for i in range(args.locations)]
+    if args.target == "service":
+        await bench_service(args, locations)
+    elif args.target == "sse":
+        port = free_port()
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                SERVER_CODE.format(args=f"transport='sse', port={port}"),
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}/sse"
+            wait_for_http(f"http://127.0.0.1:{port}/metrics")
+            await bench_mcp(
+                "MCP SSE get_current_weather",
+                args,
+                locations,
+                lambda: SSETransport(url),
+            )
+        finally:
+            server.terminate()
+            server.wait()
+    else:
+        await bench_mcp(
+            "MCP stdio get_current_weather",
+            args,
+            locations,
+            lambda: StdioTransport(
+                sys.executable,
+                ["-c", SERVER_CODE.format(args="")],
+                env=env,
+                cwd=str(ROOT),
+            ),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="天氣服務負載基準測試")
+    parser.add_argument("target", choices=["service", "sse", "stdio"])
+    parser.add_argument("--clients", type=int, default=20, help="並發客戶端數")
+    parser.add_argument("--requests", type=int, default=500, help="總請求數")
+    parser.add_argument("--locations", type=int, default=50, help="輪流查詢的城市數")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="替身伺服器延遲秒數"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="替身伺服器隨機延遲上限"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="替身伺服器 503 機率"
+    )
+    parser.add_argument("--slots", type=int, default=40, help="/forecast 預報筆數")
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="預報快取新鮮期秒數，0 表示每次都查詢上游（預設沿用服務設定）",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0,
+        help="每分鐘上游請求上限，預設 0 表示關閉限流以量測最大吞吐量",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=1000,
+        help="同時進行的上游請求上限，預設放寬以免限流器成為瓶頸",
+    )
+    args = parser.parse_args()
+
+    owm_port = free_port()
+    tmpdir = tempfile.TemporaryDirectory()
+    env = {
+        **os.environ,
+        "OPENWEATHER_API_KEY": "benchmark",
+        "OPENWEATHER_BASE_URL": f"http://127.0.0.1:{owm_port}/data/2.5",
+        "OPENWEATHER_RATE_LIMIT_PER_MINUTE": str(args.rate_limit),
+        "OPENWEATHER_MAX_IN_FLIGHT": str(args.max_in_flight),
+        "WEATHER_GEOCODE_CACHE_PATH": os.path.join(tmpdir.name, "geocode.sqlite3"),
+    }
+    if args.cache_ttl is not None:
+        env["WEATHER_FORECAST_CACHE_TTL"] = str(args.cache_ttl)
+    # service 目標在本行程內建立服務，同樣使用上述設定
+    os.environ.update(env)
+
+    fake_owm = subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve().parent / "fake_owm_server.py"),
+            "--port",
+            str(owm_port),
+            "--latency",
+            str(args.latency),
+            "--jitter",
+            str(args.jitter),
+            "--error-rate",
+            str(args.error_rate),
+            "--slots",
+            str(args.slots),
+        ]
+    )
+    try:
+        wait_for_http(f"http://127.0.0.1:{owm_port}/stats")
+        asyncio.run(run(args, env))
+        print(
+            f"替身伺服器請求統計 {httpx.get(f'http://127.0.0.1:{owm_port}/stats').json()}"
+        )
+    finally:
+        fake_owm.terminate()
+        fake_owm.wait()
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+本機 OpenWeatherMap 替身伺服器
+
+提供 /data/2.5/weather 與 /data/2.5/forecast 兩個端點，回應格式與正式 API 相同，
+可設定延遲、錯誤率與預報筆數，供基準測試在離線環境下驅動天氣服務。
+
+用法:
+    python benchmarks/fake_owm_server.py --port 8765 --latency 0.05 --error-rate 0.01
+
+搭配天氣服務使用:
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8765/data/2.5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from typing import Dict, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from bench_forecast_processing import make_current, make_forecast
+
+# 查無此城市的地點名稱，用於測試錯誤路徑
+UNKNOWN_LOCATION = "Nowhere"
+
+
+def _city_coord(name: str) -> Dict[str, float]:
+    """依城市名稱產生固定的坐標，使不同城市落在不同的快取鍵"""
+    seed = zlib.crc32(name.casefold().encode("utf-8"))
+    rng = random.Random(seed)
+    return {
+        "lat": round(rng.uniform(-60, 60), 4),
+        "lon": round(rng.uniform(-180, 180), 4),
+    }
+
+
+def create_app(
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    slots: int = 40,
+    seed: Optional[int] = None,
+) -> Starlette:
+    """
+    建立替身伺服器應用
+
+    Args:
+        latency: 每個回應的基本延遲秒數
+        jitter: 在基本延遲上加上的隨機延遲上限秒數
+        error_rate: 回應 503 的機率
+        slots: /forecast 回應的預報筆數，用於調整回應大小
+        seed: 隨機種子
+
+    Returns:
+        Starlette 應用
+    """
+    rng = random.Random(seed)
+    counts = {"weather": 0, "forecast": 0, "errors": 0}
+    # 快取已編碼的回應，避免伺服器本身的運算干擾量測
+    current_payloads: Dict[str, bytes] = {}
+    forecast_payloads: Dict[str, bytes] = {}
+
+    def location_key(request: Request) -> Optional[str]:
+        params = request.query_params
+        if "q" in params:
+            return params["q"]
+        if "lat" in params and "lon" in params:
+            return f"{float(params['lat']):.4f},{float(params['lon']):.4f}"
+        return None
+
+    def coord_for(key: str) -> Dict[str, float]:
+        if "," in key:
+            lat, lon = key.split(",")
+            return {"lat": float(lat), "lon": float(lon)}
+        return _city_coord(key)
+
+    async def simulate() -> Optional[Response]:
+        delay = latency + (rng.uniform(0, jitter) if jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error_rate and rng.random() < error_rate:
+            counts["errors"] += 1
+            return JSONResponse(
+                {"cod": 503, "message": "service unavailable"}, status_code=503
+            )
+        return None
+
+    async def weather(request: Request) -> Response:
+        counts["weather"] += 1
+        error = await simulate()
+        if error is not None:
+            return error
+        key = location_key(request)
+        if key is None or key == UNKNOWN_LOCATION:
+            return JSONResponse(
+                {"cod": "404", "message": "city not found"}, status_code=404
+            )
+        body = current_payloads.get(key)
+        if body is None:
+            payload = make_current(rng)
+            payload["coord"] = coord_for(key)
+            payload["name"] = key
+            body = current_payloads[key] = json.dumps(payload).encode("utf-8")
+        return Response(body, media_type="application/json")
+
+    async def forecast(request: Request) -> Response:
+        counts["forecast"] += 1
+        error = await simulate()
+        if error is not None:
+            return error
+        key = location_key(request)
+        if key is None or key == UNKNOWN_LOCATION:
+            return JSONResponse(
+                {"cod": "404", "message": "city not found"}, status_code=404
+            )
+        body = forecast_payloads.get(key)
+        if body is None:
+            payload = make_forecast(rng, slots)
+            payload["city"] = {"coord": coord_for(key), "name": key}
+            body = forecast_payloads[key] = json.dumps(payload).encode("utf-8")
+        return Response(body, media_type="application/json")
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse(counts)
+
+    return Starlette(
+        routes=[
+            Route("/data/2.5/weather", weather),
+            Route("/data/2.5/forecast", forecast),
+            Route("/stats", stats),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本機 OpenWeatherMap 替身伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="基本延遲秒數")
+    parser.add_argument("--jitter", type=float, default=0.0, help="隨機延遲上限秒數")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回應 503 的機率")
+    parser.add_argument("--slots", type=int, default=40, help="/forecast 預報筆數")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.slots, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+天氣預報系統 - JSON 編解碼
+優先使用 orjson，其次 msgspec，皆未安裝時退回標準庫 json
+"""
+
+import json
+from typing import Any, Union
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用依賴
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec 為選用依賴
+    msgspec = None
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+
+def _default(obj: Any) -> Any:
+    """將 pydantic 模型與精簡天氣模型轉換為可序列化的結構"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    to_dict = getattr(obj, "to_dict", None)
+    if callable(to_dict):
+        return to_dict()
+    return str(obj)
+
+
+if msgspec is not None:
+    _msgspec_decoder = msgspec.json.Decoder()
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    解析 JSON
+
+    Args:
+        data: JSON 原始位元組或字串
+
+    Returns:
+        解析後的數據
+
+    Raises:
+        ValueError: 內容不是合法的 JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)  # orjson.JSONDecodeError 繼承自 ValueError
+    if msgspec is not None:
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    將數據序列化為 UTF-8 編碼的緊湊 JSON
+
+    支援 pydantic 模型與具有 to_dict() 的精簡天氣模型。
+
+    Args:
+        obj: 要序列化的數據
+
+    Returns:
+        JSON 位元組
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    if msgspec is not None:
+        return _msgspec_encoder.encode(obj)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def dumps(obj: Any) -> str:
+    """
+    將數據序列化為緊湊 JSON 字串，可作為 FastMCP 的 tool_serializer
+
+    Args:
+        obj: 要序列化的數據
+
+    Returns:
+        JSON 字串
+    """
+    return dumps_bytes(obj).decode()
@@ -0,0 +1,219 @@
+"""
+天氣預報系統 - 向量化預報處理
+以 NumPy 欄位批次完成時區分日與每日統計，需要安裝 numpy
+"""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # numpy 為選用依賴
+    np = None
+
+from models import (
+    CompactWeatherEntry,
+    CompactWeatherForecast,
+    DailyWeatherSummary,
+    ForecastSeries,
+    WeatherError,
+)
+
+
+SECONDS_PER_DAY = 86400
+
+_FLOAT_COLUMNS = ("temperature", "feels_like", "temp_min", "temp_max", "wind_speed")
+_INT_COLUMNS = ("humidity", "wind_direction", "clouds")
+
+
+def is_available() -> bool:
+    """返回向量化處理是否可用"""
+    return np is not None
+
+
+def _require_numpy() -> None:
+    """確認 numpy 可用"""
+    if np is None:
+        raise WeatherError(
+            "向量化處理需要 numpy。請執行 pip install numpy", "DEPENDENCY_MISSING"
+        )
+
+
+def forecast_columns(forecast_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    將 /forecast 回應轉換為 NumPy 欄位
+
+    Args:
+        forecast_data: /forecast 端點的原始回應數據
+
+    Returns:
+        欄位名稱對應 ndarray 的字典；沒有降雨的時段 rain 為 NaN，
+        weather_conditions 為字串列表
+    """
+    _require_numpy()
+    entries = forecast_data["list"]
+    count = len(entries)
+    mains = [entry["main"] for entry in entries]
+    winds = [entry["wind"] for entry in entries]
+
+    return {
+        "timestamps": np.fromiter((e["dt"] for e in entries), np.int64, count),
+        "temperature": np.fromiter((m["temp"] for m in mains), np.float64, count),
+        "feels_like": np.fromiter((m["feels_like"] for m in mains), np.float64, count),
+        "temp_min": np.fromiter((m["temp_min"] for m in mains), np.float64, count),
+        "temp_max": np.fromiter((m["temp_max"] for m in mains), np.float64, count),
+        "humidity": np.fromiter((m["humidity"] for m in mains), np.intc, count),
+        "wind_speed": np.fromiter((w["speed"] for w in winds), np.float64, count),
+        "wind_direction": np.fromiter((w["deg"] for w in winds), np.intc, count),
+        "rain": np.fromiter(
+            (e["rain"].get("3h", 0) if "rain" in e else np.nan for e in entries),
+            np.float64,
+            count,
+        ),
+        "clouds": np.fromiter((e["clouds"]["all"] for e in entries), np.intc, count),
+        "weather_conditions": [e["weather"][0]["description"] for e in entries],
+    }
+
+
+def local_day_index(timestamps: Any, tz: timezone) -> Any:
+    """
+    計算各時間戳在指定時區的日序號（自 1970-01-01 起算的天數）
+
+    Args:
+        timestamps: UNIX 時間戳陣列
+        tz: 時區
+
+    Returns:
+        日序號陣列
+    """
+    offset = int(tz.utcoffset(None).total_seconds())
+    return (timestamps + offset) // SECONDS_PER_DAY
+
+
+def _take_series(columns: Dict[str, Any], mask: Any, tz: timezone) -> ForecastSeries:
+    """依布林遮罩取出時段並填入 ForecastSeries 的欄位陣列"""
+    series = ForecastSeries(tz)
+    # 以位元組直接建立 array，避免逐一轉換元素
+    series.timestamps = array(
+        "d", columns["timestamps"][mask].astype(np.float64).tobytes()
+    )
+    for name in _FLOAT_COLUMNS:
+        setattr(series, name, array("d", columns[name][mask].tobytes()))
+    for name in _INT_COLUMNS:
+        setattr(series, name, array("i", columns[name][mask].tobytes()))
+    series.rain = array("d", columns["rain"][mask].tobytes())
+    conditions = columns["weather_conditions"]
+    series.weather_conditions = [conditions[i] for i in np.flatnonzero(mask)]
+    return series
+
+
+def build_compact_forecast(
+    current: CompactWeatherEntry, forecast_data: Dict[str, Any], tz: timezone
+) -> CompactWeatherForecast:
+    """
+    以向量化方式將預報數據分為今日與明日
+
+    Args:
+        current: 當前天氣條目
+        forecast_data: /forecast 端點的原始回應數據
+        tz: 時區
+
+    Returns:
+        精簡天氣預報對象，內容與逐筆處理的結果相同
+    """
+    columns = forecast_columns(forecast_data)
+    days = local_day_index(columns["timestamps"], tz)
+    today = int(local_day_index(np.int64(current.timestamp), tz))
+    return CompactWeatherForecast(
+        current,
+        _take_series(columns, days == today, tz),
+        _take_series(columns, days == today + 1, tz),
+    )
+
+
+def summarize_daily(
+    forecast_data: Dict[str, Any], tz: timezone
+) -> List[DailyWeatherSummary]:
+    """
+    計算預報期間每日的溫度、濕度、風速與降雨統計
+
+    Args:
+        forecast_data: /forecast 端點的原始回應數據
+        tz: 時區
+
+    Returns:
+        依日期排序的每日統計
+    """
+    return summarize_daily_batch([forecast_data], tz)[0]
+
+
+def summarize_daily_batch(
+    forecasts: List[Dict[str, Any]], tz: timezone
+) -> List[List[DailyWeatherSummary]]:
+    """
+    一次計算多個地點的每日統計
+
+    所有地點的時段串接為同一組欄位，以 (地點, 日期) 分組後用 reduceat 批次聚合。
+
+    Args:
+        forecasts: 各地點 /forecast 端點的原始回應數據
+        tz: 時區
+
+    Returns:
+        與 forecasts 對應的每日統計列表
+    """
+    _require_numpy()
+    columns = [forecast_columns(data) for data in forecasts]
+    results: List[List[DailyWeatherSummary]] = [[] for _ in forecasts]
+    if not any(len(c["timestamps"]) for c in columns):
+        return results
+
+    city = np.concatenate(
+        [np.full(len(c["timestamps"]), i, np.int64) for i, c in enumerate(columns)]
+    )
+    days = local_day_index(np.concatenate([c["timestamps"] for c in columns]), tz)
+
+    def stacked(name: str) -> Any:
+        return np.concatenate([c[name] for c in columns]).astype(np.float64)
+
+    temp = stacked("temperature")
+    temp_min = stacked("temp_min")
+    temp_max = stacked("temp_max")
+    humidity = stacked("humidity")
+    wind = stacked("wind_speed")
+    rain = np.nan_to_num(stacked("rain"))
+
+    # 依 (地點, 日期) 排序後找出每組的起點
+    order = np.lexsort((days, city))
+    city, days = city[order], days[order]
+    boundaries = np.flatnonzero(
+        np.r_[True, (city[1:] != city[:-1]) | (days[1:] != days[:-1])]
+    )
+    counts = np.diff(np.r_[boundaries, len(order)])
+
+    def reduce(ufunc: Any, values: Any) -> Any:
+        return ufunc.reduceat(values[order], boundaries)
+
+    mins = reduce(np.minimum, temp_min)
+    maxs = reduce(np.maximum, temp_max)
+    temp_means = reduce(np.add, temp) / counts
+    humidity_means = reduce(np.add, humidity) / counts
+    wind_maxs = reduce(np.maximum, wind)
+    rain_totals = reduce(np.add, rain)
+
+    epoch = datetime(1970, 1, 1).date()
+    for i, start in enumerate(boundaries):
+        results[int(city[start])].append(
+            DailyWeatherSummary(
+                date=(epoch + timedelta(days=int(days[start]))).isoformat(),
+                temp_min=round(float(mins[i]), 2),
+                temp_max=round(float(maxs[i]), 2),
+                temp_mean=round(float(temp_means[i]), 2),
+                humidity_mean=round(float(humidity_means[i]), 1),
+                wind_speed_max=round(float(wind_maxs[i]), 2),
+                rain_total=round(float(rain_totals[i]), 2),
+                slots=int(counts[i]),
+            )
+        )
+    return results
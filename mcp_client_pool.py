@@ -0,0 +1,483 @@
+"""
+MCP 客戶端工作階段池
+維持一組已完成 initialize 握手的 SSE / stdio 工作階段，將並發的工具呼叫分配到
+負載最低的工作階段上多工傳送，連線中斷時自動重連，並快取工具、資源與提示列表，
+直到伺服器發出 list_changed 通知為止。PooledProxyClient 讓 FastMCPProxy 使用工作階段池，
+並可選擇以 ToolResultCache 合併相同的並發工具呼叫、依工具 TTL 快取冪等工具的結果。
+
+用法:
+    pool = MCPSessionPool(lambda: SSETransport("http://localhost:8001/sse"), size=4)
+    async with pool:
+        tools = await pool.list_tools()
+        result = await pool.call_tool("get_current_weather", {"location": "Taipei"})
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+import mcp.types
+from fastmcp import Client
+from fastmcp.client.transports import ClientTransport
+from fastmcp.exceptions import ToolError
+from mcp.shared.exceptions import McpError
+
+from singleflight import AsyncSingleFlight
+
+# 列表快取的種類與對應的 list_changed 通知
+_LIST_CHANGED = {
+    mcp.types.ToolListChangedNotification: ("tools",),
+    mcp.types.ResourceListChangedNotification: ("resources", "resource_templates"),
+    mcp.types.PromptListChangedNotification: ("prompts",),
+}
+
+
+def is_disconnect_error(error: BaseException) -> bool:
+    """判斷異常是否代表工作階段的連線已中斷（而非伺服器回應的錯誤）"""
+    if isinstance(error, McpError):
+        return error.error.code == mcp.types.CONNECTION_CLOSED
+    return isinstance(
+        error,
+        (
+            anyio.ClosedResourceError,
+            anyio.BrokenResourceError,
+            anyio.EndOfStream,
+            httpx.TransportError,
+            ConnectionError,
+        ),
+    )
+
+
+class _PooledSession:
+    """池中的一個工作階段"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.client: Optional[Client] = None
+        self.in_flight = 0
+        self.calls = 0
+        self.connects = 0
+        self.last_used = time.monotonic()
+        # 重連期間其他呼叫等待同一次重連完成
+        self.lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+
+class MCPSessionPool:
+    """MCP 客戶端工作階段池"""
+
+    def __init__(
+        self,
+        transport_factory: Callable[[], ClientTransport],
+        size: int = 4,
+        max_calls_per_session: int = 32,
+        retry_on_disconnect: bool = True,
+    ):
+        """
+        初始化工作階段池
+
+        Args:
+            transport_factory: 建立傳輸的函數，每次（重新）連線都會呼叫一次，
+                例如 lambda: SSETransport(url) 或 lambda: StdioTransport(...)
+            size: 工作階段數
+            max_calls_per_session: 單一工作階段同時進行的呼叫上限
+            retry_on_disconnect: 連線中斷導致呼叫失敗時，是否重連後重試一次；
+                非冪等的工具請關閉
+        """
+        self.transport_factory = transport_factory
+        self.retry_on_disconnect = retry_on_disconnect
+        self._sessions = [_PooledSession(i) for i in range(max(1, size))]
+        self._capacity = asyncio.Semaphore(max(1, size) * max_calls_per_session)
+        self._lists: Dict[str, List[Any]] = {}
+        # 每收到一次 list_changed 通知遞增，避免把通知前取得的舊列表寫回快取
+        self._list_generation = 0
+        # 快取未命中時，並發的列表請求共用同一次往返
+        self._list_flight = AsyncSingleFlight()
+        self.list_cache_hits = 0
+        self.reconnects = 0
+        self.connect_seconds: List[float] = []
+
+    async def __aenter__(self) -> "MCPSessionPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def start(self) -> None:
+        """
+        並行建立所有工作階段（預熱）
+
+        Raises:
+            ConnectionError: 所有工作階段都無法連線時
+        """
+        results = await asyncio.gather(
+            *(self._connect(session) for session in self._sessions),
+            return_exceptions=True,
+        )
+        if all(isinstance(result, BaseException) for result in results):
+            raise ConnectionError(f"無法建立任何 MCP 工作階段: {results[0]}")
+
+    async def aclose(self) -> None:
+        """關閉所有工作階段"""
+        clients = [session.client for session in self._sessions if session.client]
+        for session in self._sessions:
+            session.client = None
+        await asyncio.gather(
+            *(client.close() for client in clients), return_exceptions=True
+        )
+
+    async def _on_message(self, message: Any) -> None:
+        """伺服器通知處理：收到 list_changed 時清除對應的列表快取"""
+        if isinstance(message, mcp.types.ServerNotification):
+            kinds = _LIST_CHANGED.get(type(message.root), ())
+            if kinds:
+                self._list_generation += 1
+            for kind in kinds:
+                self._lists.pop(kind, None)
+
+    async def _connect(self, session: _PooledSession) -> None:
+        """為工作階段建立新的客戶端並完成握手"""
+        started = time.perf_counter()
+        client = Client(self.transport_factory(), message_handler=self._on_message)
+        await client.__aenter__()
+        if not client.is_connected():
+            await client.close()
+            raise ConnectionError("MCP 工作階段初始化失敗")
+        session.client = client
+        session.connects += 1
+        self.connect_seconds.append(time.perf_counter() - started)
+
+    async def _reconnect(
+        self, session: _PooledSession, stale: Optional[Client]
+    ) -> None:
+        """重連工作階段；若其他呼叫已完成重連則直接返回"""
+        async with session.lock:
+            if session.client is not stale and session.connected:
+                return
+            if stale is not None:
+                session.client = None
+                try:
+                    await stale.close()
+                except Exception:
+                    pass
+            self.reconnects += 1
+            await self._connect(session)
+
+    def _pick(self) -> _PooledSession:
+        """選擇進行中呼叫最少的工作階段，優先選擇已連線者"""
+        return min(
+            self._sessions, key=lambda s: (not s.connected, s.in_flight, s.calls)
+        )
+
+    async def _run(self, operation: Callable[[Client], Any]) -> Any:
+        """
+        在負載最低的工作階段上執行操作，必要時重連
+
+        Args:
+            operation: 接收 Client 並返回 awaitable 的函數
+
+        Returns:
+            操作的返回值
+        """
+        async with self._capacity:
+            session = self._pick()
+            session.in_flight += 1
+            session.calls += 1
+            try:
+                for attempt in range(2):
+                    client = session.client
+                    if client is None or not client.is_connected():
+                        await self._reconnect(session, client)
+                        client = session.client
+                    try:
+                        return await operation(client)
+                    except Exception as e:
+                        if (
+                            attempt
+                            or not self.retry_on_disconnect
+                            or not is_disconnect_error(e)
+                        ):
+                            raise
+                        await self._reconnect(session, client)
+            finally:
+                session.in_flight -= 1
+                session.last_used = time.monotonic()
+
+    async def call_tool(
+        self, name: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        呼叫工具
+
+        Args:
+            name: 工具名稱
+            arguments: 工具參數
+
+        Returns:
+            工具回應內容
+        """
+        return await self._run(lambda client: client.call_tool(name, arguments or {}))
+
+    async def read_resource(self, uri: str) -> Any:
+        """讀取資源"""
+        return await self._run(lambda client: client.read_resource(uri))
+
+    async def get_prompt(
+        self, name: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """取得提示"""
+        return await self._run(lambda client: client.get_prompt(name, arguments))
+
+    async def _cached_list(
+        self, kind: str, fetch: Callable[[Client], Any]
+    ) -> List[Any]:
+        cached = self._lists.get(kind)
+        if cached is not None:
+            self.list_cache_hits += 1
+            return cached
+        generation = self._list_generation
+
+        async def load() -> List[Any]:
+            result = await self._run(fetch)
+            if generation == self._list_generation:
+                self._lists[kind] = result
+            return result
+
+        return await self._list_flight.do((kind, generation), load)
+
+    async def list_tools(self) -> List[mcp.types.Tool]:
+        """列出工具，結果快取至伺服器發出 tools/list_changed 通知"""
+        return await self._cached_list("tools", lambda client: client.list_tools())
+
+    async def list_resources(self) -> List[mcp.types.Resource]:
+        """列出資源，結果快取至伺服器發出 resources/list_changed 通知"""
+        return await self._cached_list(
+            "resources", lambda client: client.list_resources()
+        )
+
+    async def list_resource_templates(self) -> List[mcp.types.ResourceTemplate]:
+        """列出資源模板，結果快取至伺服器發出 resources/list_changed 通知"""
+        return await self._cached_list(
+            "resource_templates", lambda client: client.list_resource_templates()
+        )
+
+    async def list_prompts(self) -> List[mcp.types.Prompt]:
+        """列出提示，結果快取至伺服器發出 prompts/list_changed 通知"""
+        return await self._cached_list("prompts", lambda client: client.list_prompts())
+
+    def invalidate(self, kind: Optional[str] = None) -> None:
+        """
+        手動清除列表快取
+
+        Args:
+            kind: "tools"、"resources"、"resource_templates" 或 "prompts"，
+                未指定時全部清除
+        """
+        if kind is None:
+            self._lists.clear()
+        else:
+            self._lists.pop(kind, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回工作階段池的統計資訊"""
+        return {
+            "sessions": [
+                {
+                    "connected": session.connected,
+                    "in_flight": session.in_flight,
+                    "calls": session.calls,
+                    "connects": session.connects,
+                }
+                for session in self._sessions
+            ],
+            "reconnects": self.reconnects,
+            "list_cache_hits": self.list_cache_hits,
+            "cached_lists": sorted(self._lists),
+        }
+
+
+class ToolResultCache:
+    """
+    代理的工具結果快取
+
+    只處理名稱符合 TTL 規則的工具（呼叫端須確認這些工具是冪等的）：相同名稱與參數的
+    並發呼叫只送出一次，成功的結果在 TTL 內直接返回；TTL 為 0 的工具只合併不快取。
+    其他工具照常逐次轉送。
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_size: int = 1024):
+        """
+        初始化工具結果快取
+
+        Args:
+            ttls: 鍵為工具名稱的正規表示式，值為 TTL 秒數；依序比對，使用第一個符合的規則
+            max_size: 最大條目數，超過時淘汰最久未使用的條目
+        """
+        self.rules: List[Tuple[re.Pattern, float]] = [
+            (re.compile(pattern), float(ttl)) for pattern, ttl in ttls.items()
+        ]
+        self.max_size = max_size
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, Any]] = OrderedDict()
+        self._flight = AsyncSingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, name: str) -> Optional[float]:
+        """返回工具的 TTL 秒數，不符合任何規則時返回 None"""
+        for pattern, ttl in self.rules:
+            if pattern.search(name):
+                return ttl
+        return None
+
+    async def call(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        fetch: Callable[[], Any],
+    ) -> Any:
+        """
+        經由快取與請求合併呼叫工具
+
+        Args:
+            name: 工具名稱
+            arguments: 工具參數
+            fetch: 實際呼叫工具、返回 CallToolResult 的協程函數
+
+        Returns:
+            工具的 CallToolResult
+        """
+        ttl = self.ttl_for(name)
+        if ttl is None:
+            return await fetch()
+
+        key = (name, json.dumps(arguments, sort_keys=True, default=str))
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+        self.misses += 1
+
+        async def load() -> Any:
+            result = await fetch()
+            # 錯誤結果不快取，下一次呼叫重新嘗試
+            if ttl > 0 and not result.isError:
+                self._entries[key] = (time.monotonic() + ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return result
+
+        return await self._flight.do(key, load)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回快取的條目數、命中率與合併的呼叫數"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self._flight.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class PooledProxyClient:
+    """
+    以工作階段池實作 FastMCPProxy 所需的 Client 介面
+
+    FastMCP.as_proxy 會為每次請求進出一次 Client 的 context manager 並重新列出工具；
+    改用 FastMCPProxy(client=PooledProxyClient(pool)) 時，請求分散到池中的工作階段，
+    列表則由池快取；提供 result_cache 時工具呼叫再經由 ToolResultCache 合併與快取。
+    """
+
+    def __init__(
+        self, pool: MCPSessionPool, result_cache: Optional[ToolResultCache] = None
+    ):
+        """
+        初始化代理客戶端
+
+        Args:
+            pool: 尚未啟動的工作階段池，第一次使用時在目前的事件迴圈中啟動
+            result_cache: 工具結果快取，如未提供則每次呼叫都轉送到工作階段池
+        """
+        self.pool = pool
+        self.result_cache = result_cache
+        self._started: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "PooledProxyClient":
+        if self._started is None:
+            self._started = asyncio.ensure_future(self.pool.start())
+            self._started.add_done_callback(self._on_start_done)
+        await asyncio.shield(self._started)
+        return self
+
+    def _on_start_done(self, task: asyncio.Task) -> None:
+        # 啟動失敗（例如工作行程無法執行）時不保留結果，下一個請求重新嘗試啟動
+        if task.cancelled() or task.exception() is not None:
+            if self._started is task:
+                self._started = None
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        # 工作階段由池持有，不隨單次請求關閉
+        pass
+
+    async def list_tools(self) -> List[mcp.types.Tool]:
+        return await self.pool.list_tools()
+
+    async def list_resources(self) -> List[mcp.types.Resource]:
+        return await self.pool.list_resources()
+
+    async def list_resource_templates(self) -> List[mcp.types.ResourceTemplate]:
+        return await self.pool.list_resource_templates()
+
+    async def list_prompts(self) -> List[mcp.types.Prompt]:
+        return await self.pool.list_prompts()
+
+    async def call_tool_mcp(
+        self, name: str, arguments: Dict[str, Any]
+    ) -> mcp.types.CallToolResult:
+        async def fetch() -> mcp.types.CallToolResult:
+            return await self.pool._run(
+                lambda client: client.call_tool_mcp(name=name, arguments=arguments)
+            )
+
+        if self.result_cache is None:
+            return await fetch()
+        return await self.result_cache.call(name, arguments, fetch)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        # FastMCPProxy 經由這裡轉送工具呼叫；與 Client.call_tool 相同地把錯誤結果轉為 ToolError
+        result = await self.call_tool_mcp(name, arguments or {})
+        if result.isError:
+            first = result.content[0] if result.content else None
+            if isinstance(first, mcp.types.TextContent):
+                raise ToolError(first.text)
+            raise ToolError(f"工具 {name} 執行失敗")
+        return result.content
+
+    async def read_resource(self, uri: Any) -> Any:
+        return await self.pool.read_resource(uri)
+
+    async def get_prompt(
+        self, name: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        return await self.pool.get_prompt(name, arguments)
@@ -1,9 +1,17 @@
 # client_inspector.py (最終修正版)
+import argparse
 import asyncio
+import json
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, List
 from fastmcp import Client
 from fastmcp.client.transports import SSETransport
+from mcp_client_pool import MCPSessionPool
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 
 # 伺服器的 URL
 SERVER_URL = "http://localhost:8001/sse"
@@ -131,6 +139,149 @@ async def main():
         console.print(f"[bold red]❌ 發生錯誤:[/bold red] {e}")
 
 
+def load_workload(path: str) -> List[Dict[str, Any]]:
+    """
+    讀取工具參數工作負載檔
+
+    支援 JSON 陣列，或每行一個 JSON 物件的 JSON Lines 格式。
+
+    Args:
+        path: 檔案路徑
+
+    Returns:
+        工具參數列表
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        workload = json.loads(text)
+    else:
+        workload = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not workload:
+        raise ValueError(f"工作負載檔 {path} 沒有任何參數")
+    return workload
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """返回已排序樣本的百分位數"""
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+async def run_load(args: argparse.Namespace) -> None:
+    """
+    負載模式：開啟多個並發工作階段，以目標速率呼叫指定工具並統計延遲。
+
+    指定 --rate 時以開放模型排程（依預定發送時間計算延遲，避免伺服器變慢時
+    少算排隊時間）；未指定時每個工作階段連續發送請求。
+    """
+    workload = (
+        load_workload(args.workload) if args.workload else [json.loads(args.args)]
+    )
+    console.print(
+        f"[bold cyan]負載模式:[/bold cyan] {args.sessions} 個工作階段 → "
+        f"[yellow]{args.url}[/yellow]，工具 [cyan]{args.tool}[/cyan]，"
+        f"{args.requests} 次呼叫，目標速率 "
+        f"{f'{args.rate:g} req/s' if args.rate else '不限'}"
+    )
+
+    # 1. 建立工作階段並量測握手成本
+    pool = MCPSessionPool(lambda: SSETransport(args.url), size=args.sessions)
+    setup_started = time.perf_counter()
+    try:
+        await pool.start()
+    except ConnectionError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        return
+    setup_total = time.perf_counter() - setup_started
+    setup_times = pool.connect_seconds[:]
+    connected = sum(session["connected"] for session in pool.stats()["sessions"])
+
+    # 2. 發送請求（由工作階段池分配到負載最低的工作階段）
+    latencies: List[float] = []
+    errors: Counter = Counter()
+
+    async def call(index: int, scheduled: float) -> None:
+        arguments = workload[index % len(workload)]
+        try:
+            await pool.call_tool(args.tool, arguments)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        else:
+            latencies.append(time.perf_counter() - scheduled)
+
+    started = time.perf_counter()
+    try:
+        if args.rate:
+            tasks = []
+            for i in range(args.requests):
+                scheduled = started + i / args.rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(call(i, scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+            counter = iter(range(args.requests))
+
+            async def worker() -> None:
+                for i in counter:
+                    await call(i, time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+    finally:
+        reconnects = pool.reconnects
+        await pool.aclose()
+
+    # 3. 輸出結果
+    ordered = sorted(latencies)
+    total = len(latencies) + sum(errors.values())
+    table = Table(title="負載測試結果", show_header=False)
+    table.add_row("工作階段", f"{connected} / {args.sessions}（重連 {reconnects} 次）")
+    table.add_row(
+        "握手耗時",
+        f"總計 {setup_total * 1000:.0f} ms，平均 "
+        f"{sum(setup_times) / len(setup_times) * 1000:.1f} ms / 工作階段",
+    )
+    table.add_row("呼叫次數", f"{total}（成功 {len(latencies)}）")
+    table.add_row("實際速率", f"{total / elapsed:.1f} req/s")
+    for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0)):
+        table.add_row(label, f"{percentile(ordered, q) * 1000:.1f} ms")
+    table.add_row(
+        "錯誤",
+        ", ".join(f"{name}: {count}" for name, count in errors.most_common()) or "無",
+    )
+    console.print(table)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="MCP SSE 客戶端：檢視伺服器或產生負載")
+    parser.add_argument("--url", default=SERVER_URL, help="伺服器 SSE 端點")
+    parser.add_argument("--load", action="store_true", help="啟用負載模式")
+    parser.add_argument("--sessions", type=int, default=10, help="並發工作階段數")
+    parser.add_argument("--tool", default="get_current_weather", help="呼叫的工具")
+    parser.add_argument(
+        "--args",
+        default='{"location": "Taipei", "timezone_offset": 8}',
+        help="工具參數（JSON），未指定 --workload 時使用",
+    )
+    parser.add_argument(
+        "--workload", help="工具參數檔（JSON 陣列或 JSON Lines），依序輪流使用"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="總呼叫次數")
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="目標速率 req/s，0 表示不限速"
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    # 請確保您的 weather_server.py 正在運行
-    asyncio.run(main())
+    args = parse_args()
+    if args.load:
+        asyncio.run(run_load(args))
+    else:
+        SERVER_URL = args.url
+        # 請確保您的 weather_server.py 正在運行
+        asyncio.run(main())
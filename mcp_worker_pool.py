@@ -0,0 +1,217 @@
+"""
+預先啟動的 stdio MCP 伺服器工作行程池
+維持一組已完成握手的 stdio 伺服器子行程，將工具呼叫分配到負載最低的行程，
+定期以 ping 檢查閒置的行程並重新啟動已結束者，依負載在 min_workers 與
+max_workers 之間擴縮，讓 CPU 密集或較慢的工具能同時使用多個核心，
+而不是全部排隊經過同一個子行程。
+
+用法:
+    pool = StdioWorkerPool(
+        lambda: PythonStdioTransport("./stdio/mcp_stdio_server.py"),
+        min_workers=2,
+        max_workers=8,
+    )
+    async with pool:
+        result = await pool.call_tool("add", {"a": 1, "b": 2})
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastmcp.client.transports import ClientTransport
+
+from mcp_client_pool import MCPSessionPool, _PooledSession
+
+# 代理以 stdio 對外服務時 stdout 是傳輸通道，診斷訊息一律經由 logging（預設寫到 stderr）
+logger = logging.getLogger(__name__)
+
+
+class StdioWorkerPool(MCPSessionPool):
+    """會自動重啟與擴縮的 stdio MCP 伺服器工作行程池"""
+
+    def __init__(
+        self,
+        transport_factory: Callable[[], ClientTransport],
+        min_workers: int = 2,
+        max_workers: Optional[int] = None,
+        scale_up_threshold: int = 4,
+        idle_timeout: float = 60.0,
+        check_interval: float = 5.0,
+        ping_timeout: float = 5.0,
+        max_calls_per_session: int = 32,
+        retry_on_disconnect: bool = True,
+    ):
+        """
+        初始化工作行程池
+
+        Args:
+            transport_factory: 建立 stdio 傳輸的函數，每次啟動工作行程都會呼叫一次，
+                例如 lambda: PythonStdioTransport("server.py")
+            min_workers: 常駐的工作行程數，啟動時預先建立
+            max_workers: 工作行程數上限，預設為 CPU 核心數
+            scale_up_threshold: 所有工作行程的進行中呼叫都達到此數時，新增一個工作行程
+            idle_timeout: 超過最低數量的工作行程閒置多少秒後關閉
+            check_interval: 健康檢查與縮減的間隔秒數
+            ping_timeout: 健康檢查 ping 的逾時秒數
+            max_calls_per_session: 單一工作行程同時進行的呼叫上限
+            retry_on_disconnect: 工作行程中途結束導致呼叫失敗時，是否在重啟後重試一次
+        """
+        min_workers = max(1, min_workers)
+        max_workers = max(min_workers, max_workers or os.cpu_count() or 1)
+        super().__init__(
+            transport_factory,
+            size=min_workers,
+            max_calls_per_session=max_calls_per_session,
+            retry_on_disconnect=retry_on_disconnect,
+        )
+        # 總容量以擴充後的上限計算
+        self._capacity = asyncio.Semaphore(max_workers * max_calls_per_session)
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.scale_up_threshold = max(1, scale_up_threshold)
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.ping_timeout = ping_timeout
+        self._next_index = min_workers
+        self._spawning: Optional[asyncio.Task] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self.restarts = 0
+        self.scale_ups = 0
+        self.scale_downs = 0
+
+    async def start(self) -> None:
+        """
+        預先啟動 min_workers 個工作行程並開始監督
+
+        Raises:
+            ConnectionError: 所有工作行程都無法啟動時
+        """
+        await super().start()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def aclose(self) -> None:
+        """停止監督並關閉所有工作行程"""
+        for task in (self._supervisor, self._spawning):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._supervisor = self._spawning = None
+        await super().aclose()
+
+    async def _run(self, operation: Callable[[Any], Any]) -> Any:
+        """所有工作行程都忙碌時先擴充，再交由負載最低的工作行程執行"""
+        while (
+            self._pick().in_flight >= self.scale_up_threshold
+            and len(self._sessions) < self.max_workers
+        ):
+            # 同時只啟動一個新行程，其他等待中的呼叫共用同一次啟動
+            if self._spawning is None:
+                self._spawning = asyncio.create_task(self._scale_up())
+            if not await asyncio.shield(self._spawning):
+                break
+        return await super()._run(operation)
+
+    async def _scale_up(self) -> bool:
+        """
+        啟動一個新的工作行程，完成握手後才加入池中
+
+        Returns:
+            是否成功新增
+        """
+        session = _PooledSession(self._next_index)
+        self._next_index += 1
+        try:
+            await self._connect(session)
+        except Exception as e:
+            logger.warning("新增工作行程失敗: %s", e)
+            return False
+        else:
+            self._sessions.append(session)
+            self.scale_ups += 1
+            return True
+        finally:
+            self._spawning = None
+
+    async def _supervise(self) -> None:
+        """定期檢查工作行程健康狀態並縮減閒置的工作行程"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            results = await asyncio.gather(
+                *(self._check(session) for session in list(self._sessions)),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning("檢查工作行程失敗: %s", result)
+            try:
+                await self._scale_down()
+            except Exception:
+                # 監督迴圈結束後就不會再重啟或縮減工作行程，記錄後繼續
+                logger.exception("縮減工作行程失敗")
+
+    async def _check(self, session: _PooledSession) -> None:
+        """以 ping 檢查閒置的工作行程，失敗或已結束時重新啟動"""
+        # 忙碌中的行程若結束，會由進行中的呼叫在重試時重連
+        if session.in_flight:
+            return
+        client = session.client
+        if client is not None and client.is_connected():
+            try:
+                await asyncio.wait_for(client.ping(), self.ping_timeout)
+                return
+            except Exception:
+                pass
+        if session not in self._sessions:
+            return
+        self.restarts += 1
+        try:
+            await self._reconnect(session, client)
+        except Exception as e:
+            logger.warning("重新啟動工作行程 %d 失敗: %s", session.index, e)
+
+    async def _scale_down(self) -> None:
+        """關閉閒置超過 idle_timeout 且超出 min_workers 的工作行程"""
+        now = time.monotonic()
+        idle = [
+            session
+            for session in self._sessions
+            if session.in_flight == 0 and now - session.last_used > self.idle_timeout
+        ]
+        # 先移除最久未使用的行程
+        idle.sort(key=lambda s: s.last_used)
+        removed = []
+        for session in idle:
+            if len(self._sessions) <= self.min_workers:
+                break
+            # 先從池中移除，之後的 _pick 就不會再選到它
+            self._sessions.remove(session)
+            removed.append(session)
+            self.scale_downs += 1
+        for session in removed:
+            client, session.client = session.client, None
+            if client is not None:
+                try:
+                    await client.close()
+                except Exception as e:
+                    logger.debug("關閉工作行程 %d 失敗: %s", session.index, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回工作行程池的統計資訊"""
+        stats = super().stats()
+        stats.update(
+            {
+                "workers": len(self._sessions),
+                "min_workers": self.min_workers,
+                "max_workers": self.max_workers,
+                "restarts": self.restarts,
+                "scale_ups": self.scale_ups,
+                "scale_downs": self.scale_downs,
+            }
+        )
+        return stats
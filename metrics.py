@@ -0,0 +1,367 @@
+"""
+天氣預報系統 - 指標與追蹤
+提供 Prometheus 文字格式的計數器、量表與直方圖，
+以及記錄各階段耗時的 span（已安裝 OpenTelemetry 時同時建立追蹤 span）
+"""
+
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    _otel_trace = None
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 與 Prometheus 客戶端預設相同的延遲分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    """以 Prometheus 文字格式輸出數值"""
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """輸出 {name="value",...} 標籤字串"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """帶標籤的指標基底類別"""
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional["Registry"] = None,
+    ):
+        """
+        初始化指標
+
+        Args:
+            name: 指標名稱
+            documentation: 說明文字（輸出於 # HELP）
+            labelnames: 標籤名稱
+            registry: 註冊的指標集合，預設為模組層級的 REGISTRY
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} 需要標籤 {self.labelnames}，收到 {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """輸出此指標的 Prometheus 文字格式"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """增加計數"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """返回目前計數"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in items
+        ]
+
+
+class Gauge(Counter):
+    """可任意設定的量表"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        """設定數值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """減少數值"""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """累積分桶直方圖"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional["Registry"] = None,
+    ):
+        """
+        初始化直方圖
+
+        Args:
+            name: 指標名稱
+            documentation: 說明文字
+            labelnames: 標籤名稱
+            buckets: 分桶上界（不含 +Inf）
+            registry: 註冊的指標集合
+        """
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """記錄一次觀測值"""
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """指標集合"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        """註冊指標，名稱重複時拋出 ValueError"""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指標 {metric.name} 已註冊")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """輸出所有指標的 Prometheus 文字格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Prometheus 文字格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = Histogram(
+    "weather_stage_duration_seconds",
+    "天氣查詢各階段耗時（地理編碼、上游請求、格式化、模型驗證、工具呼叫）",
+    ["stage"],
+)
+STAGE_ERRORS = Counter(
+    "weather_stage_errors_total", "天氣查詢各階段拋出異常的次數", ["stage", "error"]
+)
+UPSTREAM_REQUESTS = Counter(
+    "weather_upstream_requests_total",
+    "對 OpenWeatherMap 發送的請求數，依端點與 HTTP 狀態碼分類",
+    ["endpoint", "status"],
+)
+UPSTREAM_SECONDS = Histogram(
+    "weather_upstream_request_duration_seconds",
+    "OpenWeatherMap 單次請求耗時",
+    ["endpoint"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "weather_upstream_in_flight", "目前進行中的 OpenWeatherMap 請求數"
+)
+TOOL_IN_FLIGHT = Gauge("mcp_tool_in_flight", "目前進行中的 MCP 工具呼叫數", ["tool"])
+CACHE_STATS = Gauge(
+    "weather_cache_stat",
+    "天氣服務快取、請求合併、限流與容錯統計（於抓取時更新）",
+    ["name"],
+)
+
+
+def _tracer() -> Any:
+    return _otel_trace.get_tracer("weather") if _otel_trace is not None else None
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[None]:
+    """
+    記錄一個階段的耗時
+
+    耗時寫入 weather_stage_duration_seconds；已安裝 OpenTelemetry 時同時建立追蹤 span。
+
+    Args:
+        stage: 階段名稱，例如 "geocode"、"forecast_fetch"
+        attributes: 附加於追蹤 span 的屬性
+    """
+    tracer = _tracer()
+    otel_span = (
+        tracer.start_as_current_span(stage, attributes=attributes)
+        if tracer is not None
+        else None
+    )
+    if otel_span is not None:
+        otel_span.__enter__()
+    started = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        STAGE_ERRORS.inc(stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        if otel_span is not None:
+            if error is None:
+                otel_span.__exit__(None, None, None)
+            else:
+                otel_span.__exit__(type(error), error, error.__traceback__)
+
+
+def traced(stage: str) -> Callable[[F], F]:
+    """
+    以 span 包裝函數的裝飾器，同時支援同步與非同步函數
+
+    Args:
+        stage: 階段名稱
+
+    Returns:
+        裝飾器
+    """
+
+    def decorator(fn: F) -> F:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(stage):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def record_cache_stats(stats: Dict[str, Any], prefix: str = "") -> None:
+    """
+    將巢狀的統計字典攤平為 weather_cache_stat 量表
+
+    Args:
+        stats: 例如 WeatherService.cache_stats() 的返回值
+        prefix: 名稱前綴
+    """
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            record_cache_stats(value, f"{name}.")
+        elif isinstance(value, bool):
+            CACHE_STATS.set(float(value), name=name)
+        elif isinstance(value, (int, float)):
+            CACHE_STATS.set(value, name=name)
+
+
+def render() -> str:
+    """輸出所有已註冊指標的 Prometheus 文字格式"""
+    return REGISTRY.render()
+
+
+def instrument_tool(fn: F) -> F:
+    """
+    MCP 工具用的裝飾器：記錄呼叫耗時、異常與進行中的呼叫數
+
+    Args:
+        fn: 非同步工具函數
+
+    Returns:
+        包裝後的函數，保留原函數簽名供 FastMCP 產生參數結構
+    """
+    name = fn.__name__
+    timed = traced(f"tool.{name}")(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        TOOL_IN_FLIGHT.inc(tool=name)
+        try:
+            return await timed(*args, **kwargs)
+        finally:
+            TOOL_IN_FLIGHT.dec(tool=name)
+
+    return wrapper  # type: ignore[return-value]
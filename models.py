@@ -3,8 +3,12 @@
 包含所有相關的數據結構定義
 """
 
+import math
+import re
+from array import array
+from datetime import datetime, timezone
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional
 
 
 class WindInfo(BaseModel):
@@ -36,10 +40,273 @@ class WeatherForecast(BaseModel):
     tomorrow: List[WeatherEntry] = Field(..., description="明日天氣預報")
 
 
+def _format_number(value: float) -> str:
+    """
+    以最短形式輸出數值，整數值不帶小數點
+
+    精簡格式以 float 保存所有量測值，無法分辨上游 JSON 中的 23 與 23.0；
+    OpenWeatherMap 以 23 表示整數值，因此整數值輸出為 "23"。若上游回傳 23.0，
+    WeatherForecast.model_dump() 會輸出 "23.0"，這是兩者唯一的差異。
+    """
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class CompactWeatherEntry:
+    """
+    精簡天氣數據
+
+    以數值欄位保存各項量測值，只有在序列化時才加上單位，
+    輸出格式與 WeatherEntry 相同（數值的格式見 _format_number）。
+    """
+
+    __slots__ = (
+        "timestamp",
+        "tz",
+        "temperature",
+        "feels_like",
+        "temp_min",
+        "temp_max",
+        "weather_condition",
+        "humidity",
+        "wind_speed",
+        "wind_direction",
+        "rain",
+        "rain_unit",
+        "clouds",
+    )
+
+    def __init__(
+        self,
+        timestamp: float,
+        tz: timezone,
+        temperature: float,
+        feels_like: float,
+        temp_min: float,
+        temp_max: float,
+        weather_condition: str,
+        humidity: int,
+        wind_speed: float,
+        wind_direction: int,
+        rain: Optional[float],
+        rain_unit: str,
+        clouds: int,
+    ):
+        self.timestamp = timestamp
+        self.tz = tz
+        self.temperature = temperature
+        self.feels_like = feels_like
+        self.temp_min = temp_min
+        self.temp_max = temp_max
+        self.weather_condition = weather_condition
+        self.humidity = humidity
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.rain = rain
+        self.rain_unit = rain_unit
+        self.clouds = clouds
+
+    @property
+    def time(self) -> datetime:
+        """數據時間"""
+        return datetime.fromtimestamp(self.timestamp, self.tz)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化為與 WeatherEntry 相同格式的字典"""
+        return {
+            "time": self.time.strftime("%Y-%m-%d %H:%M:%S"),
+            "temperature": f"{_format_number(self.temperature)} °C",
+            "feels_like": f"{_format_number(self.feels_like)} °C",
+            "temp_min": f"{_format_number(self.temp_min)} °C",
+            "temp_max": f"{_format_number(self.temp_max)} °C",
+            "weather_condition": self.weather_condition,
+            "humidity": f"{self.humidity}%",
+            "wind": {
+                "speed": f"{_format_number(self.wind_speed)} m/s",
+                "direction": f"{self.wind_direction} degrees",
+            },
+            "rain": f"{_format_number(self.rain)} {self.rain_unit}"
+            if self.rain is not None
+            else "No rain",
+            "clouds": f"{self.clouds}%",
+        }
+
+
+class ForecastSeries:
+    """
+    以欄位陣列保存的預報序列
+
+    每個量測值一個 array 欄位，避免為每個時段建立物件；
+    下游可直接對欄位做數值運算。沒有降雨的時段 rain 為 NaN。
+    """
+
+    __slots__ = (
+        "tz",
+        "rain_unit",
+        "timestamps",
+        "temperature",
+        "feels_like",
+        "temp_min",
+        "temp_max",
+        "humidity",
+        "wind_speed",
+        "wind_direction",
+        "rain",
+        "clouds",
+        "weather_conditions",
+    )
+
+    def __init__(self, tz: timezone, rain_unit: str = "mm/3h"):
+        self.tz = tz
+        self.rain_unit = rain_unit
+        self.timestamps = array("d")
+        self.temperature = array("d")
+        self.feels_like = array("d")
+        self.temp_min = array("d")
+        self.temp_max = array("d")
+        self.humidity = array("i")
+        self.wind_speed = array("d")
+        self.wind_direction = array("i")
+        self.rain = array("d")
+        self.clouds = array("i")
+        self.weather_conditions: List[str] = []
+
+    def append(
+        self,
+        timestamp: float,
+        temperature: float,
+        feels_like: float,
+        temp_min: float,
+        temp_max: float,
+        weather_condition: str,
+        humidity: int,
+        wind_speed: float,
+        wind_direction: int,
+        rain: Optional[float],
+        clouds: int,
+    ) -> None:
+        """新增一個時段"""
+        self.timestamps.append(timestamp)
+        self.temperature.append(temperature)
+        self.feels_like.append(feels_like)
+        self.temp_min.append(temp_min)
+        self.temp_max.append(temp_max)
+        self.weather_conditions.append(weather_condition)
+        self.humidity.append(humidity)
+        self.wind_speed.append(wind_speed)
+        self.wind_direction.append(wind_direction)
+        self.rain.append(math.nan if rain is None else rain)
+        self.clouds.append(clouds)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index: int) -> CompactWeatherEntry:
+        rain = self.rain[index]
+        return CompactWeatherEntry(
+            timestamp=self.timestamps[index],
+            tz=self.tz,
+            temperature=self.temperature[index],
+            feels_like=self.feels_like[index],
+            temp_min=self.temp_min[index],
+            temp_max=self.temp_max[index],
+            weather_condition=self.weather_conditions[index],
+            humidity=self.humidity[index],
+            wind_speed=self.wind_speed[index],
+            wind_direction=self.wind_direction[index],
+            rain=None if math.isnan(rain) else rain,
+            rain_unit=self.rain_unit,
+            clouds=self.clouds[index],
+        )
+
+    def __iter__(self) -> Iterator[CompactWeatherEntry]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """序列化為與 WeatherEntry 相同格式的字典列表"""
+        return [entry.to_dict() for entry in self]
+
+
+class CompactWeatherForecast:
+    """
+    精簡天氣預報
+
+    序列化結果與 WeatherForecast.model_dump() 相同，唯一的例外是上游以小數表示的
+    整數值（例如 23.0）會輸出為 "23"，見 _format_number。
+    """
+
+    __slots__ = ("current", "today", "tomorrow")
+
+    def __init__(
+        self,
+        current: CompactWeatherEntry,
+        today: ForecastSeries,
+        tomorrow: ForecastSeries,
+    ):
+        self.current = current
+        self.today = today
+        self.tomorrow = tomorrow
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化為字典，今日預報的第一筆為當前天氣"""
+        return {
+            "today": [self.current.to_dict(), *self.today.to_list()],
+            "tomorrow": self.tomorrow.to_list(),
+        }
+
+    def to_weather_forecast(self) -> WeatherForecast:
+        """轉換為經 pydantic 驗證的 WeatherForecast"""
+        return WeatherForecast.model_validate(self.to_dict())
+
+
+class DailyWeatherSummary(BaseModel):
+    """每日天氣統計"""
+
+    date: str = Field(..., description="日期 (YYYY-MM-DD)")
+    temp_min: float = Field(..., description="最低溫度 (攝氏度)")
+    temp_max: float = Field(..., description="最高溫度 (攝氏度)")
+    temp_mean: float = Field(..., description="平均溫度 (攝氏度)")
+    humidity_mean: float = Field(..., description="平均濕度百分比")
+    wind_speed_max: float = Field(..., description="最大風速 (米/秒)")
+    rain_total: float = Field(..., description="總降雨量 (毫米)")
+    slots: int = Field(..., description="納入統計的預報時段數")
+
+
+class ForecastErrorInfo(BaseModel):
+    """單一地點查詢失敗的錯誤資訊"""
+
+    error_type: str = Field(..., description="錯誤類型")
+    message: str = Field(..., description="錯誤訊息")
+
+
+class BatchWeatherForecast(BaseModel):
+    """多地點天氣預報模型"""
+
+    forecasts: Dict[str, WeatherForecast] = Field(
+        ..., description="查詢成功的地點及其天氣預報"
+    )
+    errors: Dict[str, ForecastErrorInfo] = Field(
+        ..., description="查詢失敗的地點及其錯誤資訊"
+    )
+
+
+# 上游錯誤訊息中的請求網址帶有 API 金鑰（appid 查詢參數）
+_APPID_PATTERN = re.compile(r"(appid=)[^&\s'\"]+", re.IGNORECASE)
+
+
+def redact_api_key(message: str) -> str:
+    """遮蔽錯誤訊息中的 API 金鑰，訊息會作為工具結果返回給客戶端"""
+    return _APPID_PATTERN.sub(r"\1***", message)
+
+
 class WeatherError(Exception):
-    """天氣服務自定義異常"""
+    """
+    天氣服務自定義異常
+
+    訊息會作為工具錯誤返回給客戶端並寫入日誌，建立時即遮蔽其中的 API 金鑰。
+    """
 
     def __init__(self, message: str, error_type: str = "UNKNOWN"):
-        self.message = message
+        self.message = redact_api_key(message)
         self.error_type = error_type
         super().__init__(self.message)
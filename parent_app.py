@@ -2,19 +2,16 @@ import subprocess
 import time
 import threading
 
+from stdio.framing import iter_frames
+
 
 def read_output(process):
-    """讀取子程序的輸出"""
-    while True:
-        try:
-            output = process.stdout.readline()
-            if output == "" and process.poll() is not None:
-                break
-            if output:
-                print(f"[程式A收到]: {output.strip()}")
-        except Exception as e:
-            print(f"讀取錯誤: {e}")
-            break
+    """讀取子程序的輸出，以大區塊讀取並只解碼完整的行"""
+    try:
+        for frame in iter_frames(process.stdout):
+            print(f"[程式A收到]: {frame.decode('utf-8', errors='replace').strip()}")
+    except Exception as e:
+        print(f"讀取錯誤: {e}")
 
 
 def main():
@@ -28,8 +25,6 @@ def main():
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,  # 行緩衝
     )
 
     print(f"程式B已啟動，PID: {process.pid}")
@@ -54,7 +49,7 @@ def main():
         #     time.sleep(300)
         print(f"[程式A發送]: {msg}")
         try:
-            process.stdin.write(msg + "\n")
+            process.stdin.write(msg.encode("utf-8") + b"\n")
             process.stdin.flush()
         except Exception as e:
             print(f"發送錯誤: {e}")
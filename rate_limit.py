@@ -0,0 +1,228 @@
+"""
+天氣預報系統 - 上游速率限制
+令牌桶限制每秒請求數，並以最大並發數控制同時進行的請求；
+等待中的請求依優先權排隊，使用者請求優先於背景重新整理
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+
+# 優先權數值越小越先執行
+PRIORITY_LIVE = 0
+PRIORITY_REFRESH = 10
+
+# OpenWeatherMap 免費方案為每分鐘 60 次呼叫
+DEFAULT_RATE_PER_MINUTE = 60.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_IN_FLIGHT = 20
+
+
+class TokenBucket:
+    """令牌桶，呼叫端需自行處理同步"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒補充的令牌數
+            capacity: 令牌桶容量（允許的瞬間突發量）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def try_take(self) -> float:
+        """
+        嘗試取得一個令牌
+
+        Returns:
+            0 表示已取得；否則為還需等待的秒數
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _LimiterBase:
+    """同步與非同步限流器共用的設定與統計"""
+
+    def __init__(
+        self,
+        rate_per_minute: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+    ):
+        """
+        初始化限流器
+
+        Args:
+            rate_per_minute: 每分鐘請求上限，如未提供則從環境變量
+                OPENWEATHER_RATE_LIMIT_PER_MINUTE 獲取；0 表示不限速
+            burst: 令牌桶容量，如未提供則從環境變量 OPENWEATHER_RATE_LIMIT_BURST 獲取
+            max_in_flight: 同時進行的請求上限，如未提供則從環境變量
+                OPENWEATHER_MAX_IN_FLIGHT 獲取
+        """
+        if rate_per_minute is None:
+            rate_per_minute = float(
+                os.getenv("OPENWEATHER_RATE_LIMIT_PER_MINUTE", DEFAULT_RATE_PER_MINUTE)
+            )
+        if burst is None:
+            burst = int(os.getenv("OPENWEATHER_RATE_LIMIT_BURST", DEFAULT_BURST))
+        if max_in_flight is None:
+            max_in_flight = int(
+                os.getenv("OPENWEATHER_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)
+            )
+
+        self.bucket = (
+            TokenBucket(rate_per_minute / 60.0, max(1, burst))
+            if rate_per_minute > 0
+            else None
+        )
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self.admitted = 0
+        self._counter = itertools.count()
+
+    def _take_token(self) -> float:
+        """取得令牌；未限速時永遠立即成功"""
+        return self.bucket.try_take() if self.bucket is not None else 0.0
+
+    def _stats(self, queued: int) -> Dict[str, Any]:
+        return {
+            "rate_per_minute": self.bucket.rate * 60 if self.bucket else None,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": queued,
+            "admitted": self.admitted,
+        }
+
+
+class RateLimiter(_LimiterBase):
+    """供多執行緒使用的限流器"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+        self._waiters: List[tuple[int, int]] = []
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_LIVE) -> Iterator[None]:
+        """
+        取得一個請求名額，離開時釋放
+
+        Args:
+            priority: 優先權，數值越小越先執行
+        """
+        ticket = (priority, next(self._counter))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    at_head = self._waiters[0] == ticket
+                    if at_head and self.in_flight < self.max_in_flight:
+                        wait = self._take_token()
+                        if wait == 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            self.admitted += 1
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回限流器目前狀態"""
+        with self._cond:
+            return self._stats(len(self._waiters))
+
+
+class AsyncRateLimiter(_LimiterBase):
+    """供 asyncio 使用的限流器"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._waiters: List[tuple[int, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _dispatch(self) -> None:
+        """依優先權放行排隊中的請求，令牌不足時排程稍後再試"""
+        self._timer = None
+        while self._waiters and self.in_flight < self.max_in_flight:
+            future = self._waiters[0][2]
+            if future.done():  # 等待者已取消
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._take_token()
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(
+                    wait, self._dispatch
+                )
+                return
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            self.admitted += 1
+            future.set_result(None)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_LIVE) -> AsyncIterator[None]:
+        """
+        取得一個請求名額，離開時釋放
+
+        Args:
+            priority: 優先權，數值越小越先執行
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已被放行但呼叫端在同一時間被取消，歸還名額
+                self._release()
+            raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回限流器目前狀態"""
+        queued = sum(1 for _, _, future in self._waiters if not future.done())
+        return self._stats(queued)
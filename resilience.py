@@ -0,0 +1,181 @@
+"""
+天氣預報系統 - 上游容錯
+提供抖動指數退避重試、依延遲分佈決定的對沖請求門檻，以及斷路器
+"""
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class RetryPolicy:
+    """抖動指數退避重試策略"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        deadline: float = 10.0,
+    ):
+        """
+        初始化重試策略
+
+        Args:
+            max_attempts: 最多嘗試次數（含第一次）
+            base_delay: 第一次重試前的基準等待秒數
+            max_delay: 單次等待秒數上限
+            deadline: 整個請求（含所有重試）的時間預算秒數
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def next_delay(self, attempt: int, elapsed: float) -> Optional[float]:
+        """
+        計算下一次重試前的等待時間（full jitter）
+
+        Args:
+            attempt: 已失敗的嘗試序號，從 0 開始
+            elapsed: 自第一次嘗試起已經過的秒數
+
+        Returns:
+            等待秒數；不應再重試時返回 None
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if elapsed + delay >= self.deadline:
+            return None
+        return delay
+
+
+class LatencyTracker:
+    """記錄最近的上游延遲，以高百分位數作為對沖請求的等待門檻"""
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 20,
+        quantile: float = 0.95,
+        min_delay: float = 0.05,
+    ):
+        """
+        初始化延遲追蹤器
+
+        Args:
+            window: 保留的樣本數
+            min_samples: 開始對沖前所需的最少樣本數
+            quantile: 作為門檻的百分位數
+            min_delay: 對沖門檻下限秒數，避免對極快的上游重複發送
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """記錄一次成功請求的延遲"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self) -> Optional[float]:
+        """返回目前的延遲百分位數；樣本不足時返回 None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(self.quantile * len(ordered)) - 1)
+        return ordered[index]
+
+    def hedge_delay(self) -> Optional[float]:
+        """返回發送對沖請求前應等待的秒數；樣本不足時返回 None（不對沖）"""
+        p = self.percentile()
+        return None if p is None else max(self.min_delay, p)
+
+
+class CircuitBreaker:
+    """
+    斷路器
+
+    連續失敗達門檻後開路，在冷卻期間直接拒絕請求；
+    冷卻結束後放行一次試探請求（半開），成功則閉路，失敗則重新開路。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化斷路器
+
+        Args:
+            failure_threshold: 連續失敗多少次後開路
+            reset_timeout: 開路後多久進入半開狀態（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """返回目前是否允許發送請求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release(self) -> None:
+        """
+        放棄試探請求而沒有結果時（例如呼叫端被取消）歸還名額
+
+        半開狀態下若不歸還，後續所有請求都會被拒絕；其他狀態下沒有作用。
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        """記錄上游正常回應"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """記錄上游失敗（逾時、連線錯誤、5xx 或 429）"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """返回斷路器狀態"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+            }
@@ -0,0 +1,95 @@
+"""
+天氣預報系統 - 請求合併
+同一時間對相同鍵的多個呼叫只執行一次，所有呼叫端共用同一個結果
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    """一次進行中的同步呼叫"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """同步（多執行緒）版本的請求合併"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        執行 fn，若相同鍵已有呼叫進行中則等待並共用其結果
+
+        Args:
+            key: 合併用的鍵
+            fn: 實際執行的函數
+
+        Returns:
+            fn 的返回值；fn 拋出的異常會傳遞給所有等待者
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """非同步版本的請求合併"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        執行 fn，若相同鍵已有呼叫進行中則等待並共用其結果
+
+        單一呼叫端被取消不會中斷共用的請求。
+
+        Args:
+            key: 合併用的鍵
+            fn: 實際執行的協程函數
+
+        Returns:
+            fn 的返回值；fn 拋出的異常會傳遞給所有等待者
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,112 @@
+"""
+stdio 傳輸用的換行分隔（NDJSON）分框工具
+
+以大區塊讀取位元組，在 bytearray 緩衝區內尋找換行切出完整的訊息框，
+只對完整的訊息框解碼。每次只掃描新讀入的位元組，因此很大的訊息
+（例如數 MB 的工具結果）也是線性時間，不會因反覆重掃或串接而變成平方成本。
+"""
+
+import json
+from typing import Any, BinaryIO, Iterator, List
+
+# 每次從管線讀取的最大位元組數
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# 單一訊息框的大小上限，避免異常輸出耗盡記憶體
+DEFAULT_MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class FrameTooLargeError(ValueError):
+    """訊息框超過大小上限"""
+
+
+class LineFramer:
+    """將位元組串流切成以換行結尾的訊息框"""
+
+    def __init__(self, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE):
+        """
+        初始化分框器
+
+        Args:
+            max_frame_size: 單一訊息框的大小上限（位元組）
+        """
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        # 緩衝區中已確認沒有換行的長度，下次從這裡繼續尋找
+        self._scanned = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        放入新讀到的位元組，返回因此而完整的訊息框（不含換行與空白行）
+
+        Args:
+            data: 新讀到的位元組
+
+        Returns:
+            完整的訊息框列表
+
+        Raises:
+            FrameTooLargeError: 未完成的訊息框超過大小上限時
+        """
+        buffer = self._buffer
+        buffer += data
+        frames: List[bytes] = []
+        start = 0
+        newline = buffer.find(b"\n", self._scanned)
+        if newline >= 0:
+            with memoryview(buffer) as view:
+                while newline >= 0:
+                    end = newline
+                    if end > start and buffer[end - 1] == 0x0D:  # \r\n
+                        end -= 1
+                    if end > start:
+                        # 直接從緩衝區複製出訊息框，不產生中間的 bytearray
+                        frames.append(view[start:end].tobytes())
+                    start = newline + 1
+                    newline = buffer.find(b"\n", start)
+            # 一次移除所有已處理的訊息框
+            del buffer[:start]
+
+        self._scanned = len(buffer)
+        if self._scanned > self.max_frame_size:
+            raise FrameTooLargeError(f"訊息框超過 {self.max_frame_size} 位元組仍未結束")
+        return frames
+
+    @property
+    def pending(self) -> int:
+        """緩衝區中尚未完成的位元組數"""
+        return len(self._buffer)
+
+
+def iter_frames(
+    stream: BinaryIO,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+) -> Iterator[bytes]:
+    """
+    從二進位串流逐一讀出訊息框，直到 EOF
+
+    Args:
+        stream: 二進位模式的串流，例如 Popen(...).stdout
+        chunk_size: 每次讀取的最大位元組數
+        max_frame_size: 單一訊息框的大小上限
+
+    Yields:
+        不含換行的訊息框
+    """
+    framer = LineFramer(max_frame_size)
+    # read1 只做一次底層讀取，有多少返回多少，不會為了湊滿 chunk_size 而阻塞
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        data = read(chunk_size)
+        if not data:
+            return
+        yield from framer.feed(data)
+
+
+def encode_frame(message: Any) -> bytes:
+    """將訊息編碼為一個以換行結尾的 JSON 訊息框"""
+    return (
+        json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        + b"\n"
+    )
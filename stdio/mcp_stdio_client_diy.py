@@ -1,44 +1,118 @@
 import subprocess
 import threading
-import time
+import itertools
 import json
-import queue
 import os
+import sys
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 與 parent_app.py 相同，以專案根目錄為基準匯入 stdio.framing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stdio.framing import encode_frame, iter_frames  # noqa: E402
+
+
+class MCPError(Exception):
+    """伺服器回傳的 JSON-RPC 錯誤"""
+
+    def __init__(self, error: Dict[str, Any]):
+        self.code = error.get("code")
+        self.data = error.get("data")
+        super().__init__(f"[{self.code}] {error.get('message')}")
 
 
 class MCPClient:
-    def __init__(self, command, env_vars=None):
+    """
+    多工的 stdio JSON-RPC 客戶端
+
+    單一讀取執行緒負責解析子程式的輸出，依請求 ID 完成對應的 Future，
+    因此可以同時有大量請求在途；伺服器通知交給已註冊的處理函數。
+    """
+
+    def __init__(self, command, env_vars=None, verbose=True):
         self.command = command
+        # 是否印出每則收發的訊息；大量呼叫時關閉以免 I/O 拖慢熱路徑
+        self.verbose = verbose
         self.process = None
         self.read_thread = None
-        self.response_queue = queue.Queue()
+        self.stderr_thread = None
         self.env_vars = env_vars or {}
+        # 進行中的請求：請求 ID -> Future
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._notification_handlers: Dict[str, List[Callable[[Dict], None]]] = {}
+        self.server_info: Optional[Dict[str, Any]] = None
 
     def _read_output(self):
-        """讀取子程式的輸出"""
-        while True:
-            try:
-                if self.process.poll() is not None:
-                    break
-
-                output = self.process.stdout.readline()
-                if output:
-                    output = output.strip()
-                    print(f"[收到]: {output}")
-
-                    # 嘗試解析 JSON 回應
-                    try:
-                        json_response = json.loads(output)
-                        self.response_queue.put(json_response)
-                    except json.JSONDecodeError:
-                        pass  # 忽略非 JSON 輸出
-
-            except Exception as e:
-                print(f"讀取錯誤: {e}")
-                break
+        """讀取子程式的輸出，並將每則訊息分派給等待者或通知處理函數"""
+        try:
+            for frame in iter_frames(self.process.stdout):
+                if self.verbose:
+                    print(f"[收到]: {frame.decode('utf-8', errors='replace')}")
+
+                # 嘗試解析 JSON 回應（json 直接解析 UTF-8 位元組）
+                try:
+                    message = json.loads(frame)
+                except ValueError:
+                    continue  # 忽略非 JSON 輸出
+                if not isinstance(message, dict):
+                    continue  # 忽略不是 JSON-RPC 訊息物件的輸出（陣列、數字、字串）
+                self._dispatch(message)
+        except Exception as e:
+            print(f"讀取錯誤: {e}")
+        finally:
+            # 子程式結束：讓所有等待中的請求立即失敗，而不是等到逾時
+            self._fail_pending(ConnectionError("MCP 伺服器已結束"))
+
+    def _drain_stderr(self):
+        """持續讀取 stderr，避免伺服器日誌塞滿管線而卡住子程式"""
+        for frame in iter_frames(self.process.stderr):
+            if self.verbose:
+                print(f"[伺服器日誌]: {frame.decode('utf-8', errors='replace')}")
+
+    def _dispatch(self, message: Dict[str, Any]):
+        """依訊息種類分派：回應、伺服器請求或通知"""
+        if "method" not in message:
+            with self._pending_lock:
+                future = self._pending.pop(message.get("id"), None)
+            # 已逾時或被取消的請求不再等待回應
+            if future is None or future.done():
+                return
+            if "error" in message:
+                future.set_exception(MCPError(message["error"]))
+            else:
+                future.set_result(message.get("result"))
+        elif "id" in message:
+            # 伺服器發出的請求（例如 ping）：本客戶端不提供其他能力，僅回應 ping
+            if message["method"] == "ping":
+                self.send_message({"jsonrpc": "2.0", "id": message["id"], "result": {}})
+            else:
+                self.send_message(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": message["id"],
+                        "error": {"code": -32601, "message": "Method not found"},
+                    }
+                )
+        else:
+            for handler in self._notification_handlers.get(message["method"], []):
+                try:
+                    handler(message.get("params") or {})
+                except Exception as e:
+                    print(f"通知處理錯誤: {e}")
+
+    def _fail_pending(self, error: Exception):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
 
     def start(self):
-        """啟動子程式"""
+        """啟動子程式；伺服器是否就緒由 initialize 回應判斷，不需固定等待"""
         # 準備環境變數
         env = os.environ.copy()
         env.update(self.env_vars)
@@ -48,75 +122,128 @@ class MCPClient:
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
             env=env,
         )
 
         # 啟動讀取執行緒
         self.read_thread = threading.Thread(target=self._read_output, daemon=True)
         self.read_thread.start()
+        self.stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self.stderr_thread.start()
+
+    def on_notification(self, method: str, handler: Callable[[Dict], None]):
+        """
+        註冊通知處理函數
 
-        time.sleep(2)  # 等待程式啟動
+        Args:
+            method: 通知方法，例如 "notifications/tools/list_changed"
+            handler: 接收通知 params 的函數（在讀取執行緒中呼叫，應盡快返回）
+        """
+        self._notification_handlers.setdefault(method, []).append(handler)
 
     def send_message(self, message):
         """發送訊息"""
-        try:
-            json_str = json.dumps(message) + "\n"
-            self.process.stdin.write(json_str)
+        frame = encode_frame(message)
+        with self._write_lock:
+            self.process.stdin.write(frame)
             self.process.stdin.flush()
-            print(f"[發送]: {json.dumps(message)}")
+        if self.verbose:
+            print(f"[發送]: {frame.decode('utf-8').rstrip()}")
+
+    def request_async(self, method: str, params: Optional[Dict] = None) -> Future:
+        """
+        發送請求但不等待，返回在收到回應時完成的 Future
+
+        Args:
+            method: JSON-RPC 方法
+            params: 參數
+
+        Returns:
+            結果為回應 result 的 Future；伺服器回傳錯誤時以 MCPError 失敗
+        """
+        return self._send_request(method, params)[1]
+
+    def _send_request(
+        self, method: str, params: Optional[Dict] = None
+    ) -> Tuple[int, Future]:
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            self.send_message(message)
         except Exception as e:
-            print(f"發送錯誤: {e}")
-
-    def wait_for_response(self, request_id, timeout=10):
-        """等待特定 ID 的回應"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            try:
-                response = self.response_queue.get(timeout=1)
-                if response.get("id") == request_id:
-                    return response
-                # 不是目標回應，放回佇列
-                self.response_queue.put(response)
-            except queue.Empty:
-                continue
-        raise TimeoutError(f"等待回應超時 (ID: {request_id})")
-
-    def initialize_mcp(self):
+            self._forget(request_id)
+            future.set_exception(ConnectionError(f"發送錯誤: {e}"))
+        return request_id, future
+
+    def _forget(self, request_id: int):
+        """移除不再等待的請求，避免逾時的請求留在 _pending 中"""
+        with self._pending_lock:
+            self._pending.pop(request_id, None)
+
+    def request(self, method: str, params: Optional[Dict] = None, timeout=10):
+        """發送請求並等待回應的 result"""
+        request_id, future = self._send_request(method, params)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"等待回應超時 (method: {method})")
+        finally:
+            self._forget(request_id)
+
+    def notify(self, method: str, params: Optional[Dict] = None):
+        """發送通知（不需要回應）"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self.send_message(message)
+
+    def initialize_mcp(self, timeout=30):
         """執行 MCP 初始化序列"""
-        # 1. 發送 initialize 並等待回應
-        init_msg = {
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-03",
+        # 1. 發送 initialize 並等待回應；收到回應即代表伺服器已就緒
+        init_result = self.request(
+            "initialize",
+            {
+                "protocolVersion": "2024-11-05",
                 "capabilities": {},
                 "clientInfo": {"name": "mcp", "version": "0.1.0"},
             },
-            "jsonrpc": "2.0",
-            "id": 0,
-        }
-
-        self.send_message(init_msg)
-        init_response = self.wait_for_response(0)
-        print(f"[初始化完成]: {json.dumps(init_response, ensure_ascii=False)}")
+            timeout=timeout,
+        )
+        self.server_info = init_result
+        if self.verbose:
+            print(f"[初始化完成]: {json.dumps(init_result, ensure_ascii=False)}")
 
         # 2. 發送 notifications/initialized
-        self.send_message({"method": "notifications/initialized", "jsonrpc": "2.0"})
-        time.sleep(0.5)  # 給伺服器處理時間
+        self.notify("notifications/initialized")
 
         # 3. 發送 tools/list 並等待回應
-        tools_msg = {"method": "tools/list", "jsonrpc": "2.0", "id": 1}
-        self.send_message(tools_msg)
-        tools_response = self.wait_for_response(1)
-        print(f"[工具清單]: {json.dumps(tools_response, ensure_ascii=False, indent=2)}")
+        tools = self.list_tools()
+        if self.verbose:
+            print(f"[工具清單]: {json.dumps(tools, ensure_ascii=False, indent=2)}")
 
         return True
 
+    def list_tools(self, timeout=10):
+        """取得工具清單"""
+        return self.request("tools/list", timeout=timeout)["tools"]
+
+    def call_tool(self, name: str, arguments: Optional[Dict] = None, timeout=30):
+        """呼叫工具並返回結果"""
+        return self.request(
+            "tools/call", {"name": name, "arguments": arguments or {}}, timeout
+        )
+
     def close(self):
         """關閉程式"""
         if self.process:
             self.process.terminate()
+            self.process.wait()
 
 
 def main():
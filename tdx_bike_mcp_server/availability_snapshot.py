@@ -0,0 +1,439 @@
+"""
+YouBike 即時車位快照
+
+AvailabilityScheduler 在背景依固定間隔抓取設定縣市的即時車位，依站點 UID 與更新時間
+比對，只把有變動的紀錄套用到記憶體中的快照並通知訂閱者（例如站點空間索引）。
+SnapshotTransport 讓 OpenAPI 產生的 Availability 工具直接由快照回應，工具延遲不再
+取決於 TDX 的延遲。多個工作行程共用 SharedSnapshotStore 時只有一個行程向 TDX 抓取，
+上游負載為每個縣市每個間隔一次請求，與工作行程數無關。
+"""
+
+import asyncio
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+import fast_json
+from openapi_cache import _write_atomic
+
+DEFAULT_CITIES = "Taipei,NewTaipei"
+DEFAULT_INTERVAL = 60.0
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), ".snapshot_cache")
+
+# 非 leader 行程檢查共用快照檔案的間隔，以及啟動時等待 leader 第一次載入的秒數
+FOLLOWER_POLL_INTERVAL = 5.0
+FOLLOWER_WAIT = 30.0
+
+# 由快照回應的路徑，例如 /v2/Bike/Availability/City/Taipei
+AVAILABILITY_PATH = re.compile(r"/v2/Bike/Availability/City/(?P<city>[^/]+)$")
+
+# 快照可以自行處理的查詢參數；帶有其他參數（例如 $filter）的請求仍送往上游
+_SNAPSHOT_PARAMS = {"$format", "$top", "$skip", "$select"}
+
+# 訂閱者：(縣市, 變動或新增的紀錄, 已移除的站點 UID)
+Listener = Callable[[str, List[Dict[str, Any]], List[str]], None]
+
+
+def configured_cities() -> List[str]:
+    """返回環境變量 TDX_BIKE_CITIES 設定的縣市（以逗號分隔）"""
+    return [
+        city.strip()
+        for city in os.getenv("TDX_BIKE_CITIES", DEFAULT_CITIES).split(",")
+        if city.strip()
+    ]
+
+
+def _version_of(record: Dict[str, Any]) -> Any:
+    """紀錄的更新時間；沒有時間欄位時以整筆紀錄比對"""
+    return record.get("SrcUpdateTime") or record.get("UpdateTime") or record
+
+
+class CitySnapshot:
+    """單一縣市的即時車位快照"""
+
+    def __init__(self, city: str):
+        self.city = city
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.fetched_at: Optional[float] = None
+        self._body: Optional[bytes] = None
+
+    def body(self) -> bytes:
+        """整個縣市的 JSON 陣列，只在快照改變後重新編碼"""
+        if self._body is None:
+            self._body = fast_json.dumps_bytes(list(self.records.values()))
+        return self._body
+
+    def apply(
+        self, records: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        以完整的紀錄列表更新快照
+
+        Args:
+            records: TDX Availability API 的全部紀錄
+
+        Returns:
+            (變動或新增的紀錄, 已移除的站點 UID)
+        """
+        changed: List[Dict[str, Any]] = []
+        seen = set()
+        current = self.records
+        for record in records:
+            uid = record.get("StationUID")
+            if not uid:
+                continue
+            seen.add(uid)
+            previous = current.get(uid)
+            if previous is None or _version_of(previous) != _version_of(record):
+                changed.append(record)
+        removed = [uid for uid in current if uid not in seen]
+
+        for record in changed:
+            current[record["StationUID"]] = record
+        for uid in removed:
+            del current[uid]
+        if changed or removed:
+            self.version += 1
+            self._body = None
+        self.fetched_at = time.time()
+        return changed, removed
+
+
+class AvailabilitySnapshot:
+    """各縣市的即時車位快照"""
+
+    def __init__(self) -> None:
+        self._cities: Dict[str, CitySnapshot] = {}
+        self._listeners: List[Listener] = []
+        self.changed_records = 0
+        self.unchanged_fetches = 0
+
+    def get(self, city: str) -> Optional[CitySnapshot]:
+        """返回已載入的縣市快照，尚未載入時返回 None"""
+        return self._cities.get(city)
+
+    def subscribe(self, listener: Listener) -> None:
+        """註冊變動通知；第一次載入時所有紀錄都視為變動"""
+        self._listeners.append(listener)
+
+    def apply(self, city: str, records: List[Dict[str, Any]]) -> int:
+        """
+        套用一次完整抓取的結果並通知訂閱者
+
+        Args:
+            city: 縣市
+            records: 該縣市的全部紀錄
+
+        Returns:
+            變動（含新增與移除）的紀錄數
+        """
+        snapshot = self._cities.get(city) or CitySnapshot(city)
+        changed, removed = snapshot.apply(records)
+        self._cities[city] = snapshot
+        if not (changed or removed):
+            self.unchanged_fetches += 1
+            return 0
+        self.changed_records += len(changed) + len(removed)
+        for listener in self._listeners:
+            try:
+                listener(city, changed, removed)
+            except Exception as e:
+                print(f"即時車位快照通知失敗: {e}", file=sys.stderr)
+        return len(changed) + len(removed)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各縣市快照的大小、版本與更新時間"""
+        return {
+            "cities": {
+                city: {
+                    "stations": len(snapshot.records),
+                    "version": snapshot.version,
+                    "fetched_at": snapshot.fetched_at,
+                }
+                for city, snapshot in self._cities.items()
+            },
+            "changed_records": self.changed_records,
+            "unchanged_fetches": self.unchanged_fetches,
+        }
+
+
+class SharedSnapshotStore:
+    """
+    多個工作行程共用的快照目錄
+
+    代理以 StdioWorkerPool 啟動多個伺服器行程；取得目錄鎖的行程（leader）負責向 TDX
+    抓取並把結果寫入檔案，其他行程只讀取檔案，上游負載不隨工作行程數增加，新啟動或
+    重啟的行程也不需要重新向 TDX 完整載入。leader 結束時作業系統釋放鎖，由下一個嘗試
+    取得鎖的行程接手。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        初始化快照目錄
+
+        Args:
+            directory: 目錄路徑，如未提供則從環境變量 TDX_SNAPSHOT_DIR 獲取，
+                預設為模組目錄下的 .snapshot_cache
+        """
+        self.directory = directory or os.getenv(
+            "TDX_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR
+        )
+        self._lock_file: Optional[Any] = None
+        # 檔案名稱 -> 上次讀取時的 (mtime_ns, size)
+        self._seen: Dict[str, Tuple[int, int]] = {}
+
+    def is_leader(self) -> bool:
+        """返回本行程是否持有目錄鎖；尚未持有時嘗試取得（不等待）"""
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, "leader.lock"), "a+b")
+        if not _try_lock(lock_file):
+            lock_file.close()
+            return False
+        # 保持開啟直到行程結束，鎖隨之釋放
+        self._lock_file = lock_file
+        return True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def write(self, name: str, data: bytes) -> None:
+        """以原子方式寫入檔案，讀取端不會讀到寫到一半的內容"""
+        os.makedirs(self.directory, exist_ok=True)
+        _write_atomic(self._path(name), data)
+
+    def read(self, name: str) -> Optional[bytes]:
+        """
+        讀取檔案
+
+        Returns:
+            檔案內容；檔案不存在或自上次讀取後沒有改變時返回 None
+        """
+        path = self._path(name)
+        try:
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+            if self._seen.get(name) == version:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._seen[name] = version
+        return data
+
+
+def _try_lock(lock_file: Any) -> bool:
+    """對檔案取得不等待的排他鎖"""
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+class AvailabilityScheduler:
+    """定期抓取各縣市的即時車位並更新快照"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        snapshot: AvailabilitySnapshot,
+        cities: Optional[List[str]] = None,
+        interval: Optional[float] = None,
+        store: Optional[SharedSnapshotStore] = None,
+    ):
+        """
+        初始化排程器
+
+        Args:
+            client: TDX API 客戶端
+            snapshot: 要更新的快照
+            cities: 縣市列表，如未提供則呼叫 configured_cities
+            interval: 抓取間隔秒數，如未提供則從環境變量
+                TDX_AVAILABILITY_REFRESH_INTERVAL 獲取
+            store: 與其他工作行程共用的快照目錄；未提供時每次都向 TDX 抓取
+        """
+        self.client = client
+        self.snapshot = snapshot
+        self.cities = cities or configured_cities()
+        self.interval = interval or float(
+            os.getenv("TDX_AVAILABILITY_REFRESH_INTERVAL", DEFAULT_INTERVAL)
+        )
+        self.store = store
+        self.fetches = 0
+        self.shared_loads = 0
+        self.failures = 0
+        self.ready = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def _is_leader(self) -> bool:
+        return self.store is None or self.store.is_leader()
+
+    async def refresh(self, city: str) -> int:
+        """
+        向 TDX 抓取一個縣市的即時車位，套用到快照並寫入共用目錄
+
+        Returns:
+            變動的紀錄數
+        """
+        # no-cache 使請求略過回應快取與快照本身，直接向 TDX 抓取
+        response = await self.client.get(
+            f"/v2/Bike/Availability/City/{city}",
+            params={"$format": "JSON"},
+            headers={"Cache-Control": "no-cache"},
+        )
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict):
+            # v3 回應以物件包裝紀錄列表
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        self.fetches += 1
+        changed = self.snapshot.apply(city, data)
+        current = self.snapshot.get(city)
+        if self.store is not None and current is not None:
+            # 沒有變動也重寫，讓其他行程的快照更新時間跟著前進
+            self.store.write(f"availability.{city}.json", current.body())
+        return changed
+
+    def load_shared(self, city: str) -> Optional[int]:
+        """
+        由共用目錄載入 leader 寫入的即時車位
+
+        Returns:
+            變動的紀錄數；檔案不存在或沒有更新時返回 None
+        """
+        raw = self.store.read(f"availability.{city}.json") if self.store else None
+        if raw is None:
+            return None
+        self.shared_loads += 1
+        return self.snapshot.apply(city, fast_json.loads(raw))
+
+    async def _update(self, city: str) -> None:
+        if self._is_leader():
+            await self.refresh(city)
+        else:
+            self.load_shared(city)
+
+    async def _run_city(self, city: str, delay: float) -> None:
+        # 錯開各縣市的抓取時間，避免同時佔用上游並發名額
+        await asyncio.sleep(delay)
+        while True:
+            started = time.monotonic()
+            try:
+                await self._update(city)
+            except Exception as e:
+                self.failures += 1
+                print(f"更新 {city} 即時車位失敗: {e}", file=sys.stderr)
+            # 非 leader 只檢查檔案，較頻繁地檢查以縮短延遲
+            interval = (
+                self.interval
+                if self._is_leader()
+                else min(self.interval, FOLLOWER_POLL_INTERVAL)
+            )
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def _load_all(self) -> None:
+        if not self._is_leader():
+            # 等待 leader 完成第一次載入；期間 leader 結束則由本行程接手
+            deadline = time.monotonic() + FOLLOWER_WAIT
+            pending = list(self.cities)
+            while pending and time.monotonic() < deadline and not self._is_leader():
+                pending = [c for c in pending if self.load_shared(c) is None]
+                if pending:
+                    await asyncio.sleep(0.5)
+            if not self._is_leader():
+                return
+        results = await asyncio.gather(
+            *(self.refresh(city) for city in self.cities), return_exceptions=True
+        )
+        for city, result in zip(self.cities, results):
+            if isinstance(result, Exception):
+                self.failures += 1
+                print(f"載入 {city} 即時車位失敗: {result}", file=sys.stderr)
+
+    def start(self) -> None:
+        """在背景載入所有縣市並開始定期更新"""
+
+        async def initial() -> None:
+            try:
+                await self._load_all()
+            finally:
+                self.ready.set()
+
+        step = self.interval / max(1, len(self.cities))
+        self._tasks = [asyncio.create_task(initial())] + [
+            asyncio.create_task(self._run_city(city, self.interval + i * step))
+            for i, city in enumerate(self.cities)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+class SnapshotTransport(httpx.AsyncBaseTransport):
+    """以快照回應已載入縣市的 Availability 請求，其餘請求交給下一層傳輸"""
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, snapshot: AvailabilitySnapshot
+    ):
+        self.transport = transport
+        self.snapshot = snapshot
+        self.served = 0
+
+    def _lookup(self, request: httpx.Request) -> Optional[CitySnapshot]:
+        if request.method != "GET":
+            return None
+        if "no-cache" in request.headers.get("cache-control", ""):
+            return None
+        match = AVAILABILITY_PATH.search(request.url.path)
+        if match is None:
+            return None
+        if not set(request.url.params.keys()) <= _SNAPSHOT_PARAMS:
+            return None
+        return self.snapshot.get(match["city"])
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        city = self._lookup(request)
+        if city is None:
+            return await self.transport.handle_async_request(request)
+
+        params = request.url.params
+        if "$top" in params or "$skip" in params:
+            # 與 TDX 相同地套用 $top / $skip；$select 由 ODataTool 在伺服器端投影
+            skip = int(params.get("$skip") or 0)
+            records = list(city.records.values())
+            top = int(params.get("$top") or len(records))
+            body = fast_json.dumps_bytes(records[skip : skip + top])
+        else:
+            body = city.body()
+        self.served += 1
+        return httpx.Response(
+            200,
+            headers={
+                "Content-Type": "application/json",
+                "X-Snapshot-Version": str(city.version),
+            },
+            stream=httpx.ByteStream(body),
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,259 @@
+"""
+TDX API 回應快取
+
+以 httpx 傳輸層包裝實作：GET 回應依路徑規則設定的 TTL 快取，過期後以
+ETag（If-None-Match）與 Last-Modified（If-Modified-Since）向上游重新驗證，
+收到 304 時沿用快取內容；快取以總位元組數為上限，超過時淘汰最久未使用的條目。
+請求帶 Cache-Control: no-cache 時略過新鮮的快取（例如自行排程更新的背景工作）。
+OpenAPI 產生的工具經由 httpx.AsyncClient 呼叫 API，因此不需修改工具本身。
+"""
+
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# 預設的路徑 TTL 規則（依序比對，第一個符合的規則生效）：
+# 站點基本資料幾乎不變；即時車位資料 TDX 約每分鐘更新一次
+DEFAULT_TTL_RULES: Dict[str, float] = {
+    r"/Bike/Station/": 3600.0,
+    r"/Bike/Availability/": 60.0,
+    r"/Bike/Shape/": 86400.0,
+    r"/Bike/CyclingShape/": 86400.0,
+}
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 依請求內容變化的回應標頭，回傳快取內容時不沿用
+_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "date"}
+
+
+class _Entry:
+    """快取條目"""
+
+    __slots__ = ("status", "headers", "body", "expires_at", "etag", "last_modified")
+
+    def __init__(
+        self,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        expires_at: float,
+    ):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+        lookup = httpx.Headers(headers)
+        self.etag = lookup.get("etag")
+        self.last_modified = lookup.get("last-modified")
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+    @property
+    def revalidatable(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+
+def load_ttl_rules(value: Optional[str] = None) -> List[Tuple[re.Pattern, float]]:
+    """
+    解析路徑 TTL 規則
+
+    Args:
+        value: JSON 物件字串，鍵為路徑的正規表示式，值為 TTL 秒數；
+            如未提供則從環境變量 TDX_CACHE_TTLS 獲取，仍未設定時使用預設規則
+
+    Returns:
+        (已編譯的路徑樣式, TTL 秒數) 列表
+
+    Raises:
+        ValueError: 設定不是 JSON 物件時
+    """
+    value = value if value is not None else os.getenv("TDX_CACHE_TTLS")
+    rules = DEFAULT_TTL_RULES
+    if value:
+        rules = json.loads(value)
+        if not isinstance(rules, dict):
+            raise ValueError(
+                'TDX_CACHE_TTLS 必須是 JSON 物件，例如 {"/Station/": 3600}'
+            )
+    return [(re.compile(pattern), float(ttl)) for pattern, ttl in rules.items()]
+
+
+def _max_age(headers: httpx.Headers) -> Optional[float]:
+    """讀取 Cache-Control 的 max-age；no-store / no-cache 時返回 0"""
+    directives = [
+        d.strip().lower() for d in headers.get("cache-control", "").split(",")
+    ]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0.0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return float(directive[8:])
+            except ValueError:
+                return None
+    return None
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """為 GET 請求加上 TTL 快取與條件式重新驗證的 httpx 傳輸層"""
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        ttl_rules: Optional[List[Tuple[re.Pattern, float]]] = None,
+        max_bytes: Optional[int] = None,
+        max_entry_bytes: Optional[int] = None,
+    ):
+        """
+        初始化快取傳輸層
+
+        Args:
+            transport: 實際發送請求的傳輸層，預設為 httpx.AsyncHTTPTransport()
+            ttl_rules: 路徑 TTL 規則，如未提供則呼叫 load_ttl_rules；
+                未符合任何規則的路徑依回應的 Cache-Control max-age 決定
+            max_bytes: 快取總大小上限，如未提供則從環境變量 TDX_CACHE_MAX_BYTES 獲取
+            max_entry_bytes: 單一回應的大小上限，預設為總上限的四分之一
+        """
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.ttl_rules = ttl_rules if ttl_rules is not None else load_ttl_rules()
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(os.getenv("TDX_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        )
+        self.max_entry_bytes = max_entry_bytes or self.max_bytes // 4
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        """返回路徑的 TTL；沒有符合的規則時返回 None"""
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    @staticmethod
+    def _key(request: httpx.Request) -> str:
+        # 查詢參數排序後作為鍵，參數順序不同的相同查詢共用條目
+        url = request.url
+        query = "&".join(sorted(url.query.decode("ascii").split("&")))
+        return f"{url.host}{url.path}?{query}"
+
+    def _response(self, entry: _Entry, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            entry.status,
+            headers=entry.headers,
+            # 以 stream 傳入未解壓縮的內容；content= 會立即解壓縮並標記為已讀取
+            stream=httpx.ByteStream(entry.body),
+            request=request,
+        )
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        self._discard(key)
+        if entry.size > self.max_entry_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            return await self.transport.handle_async_request(request)
+
+        key = self._key(request)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        # 請求帶 Cache-Control: no-cache 時不使用新鮮的快取，但仍可重新驗證
+        no_cache = "no-cache" in request.headers.get("cache-control", "")
+        if entry is not None and now < entry.expires_at and not no_cache:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._response(entry, request)
+        if entry is not None and entry.revalidatable:
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            if entry.etag:
+                request.headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request.headers["If-Modified-Since"] = entry.last_modified
+        else:
+            self.misses += 1
+
+        response = await self.transport.handle_async_request(request)
+        ttl = self.ttl_for(request.url.path)
+        if ttl is None:
+            ttl = _max_age(response.headers) or 0.0
+
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            self.not_modified += 1
+            entry.expires_at = time.monotonic() + ttl
+            return self._response(entry, request)
+
+        if response.status_code != 200 or "no-store" in response.headers.get(
+            "cache-control", ""
+        ):
+            if entry is not None and response.status_code == 200:
+                self._discard(key)
+            return response
+
+        # 讀取未解壓縮的原始內容，連同 Content-Encoding 標頭一起保存
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        headers = [
+            (name, value)
+            for name, value in response.headers.raw
+            if name.decode("latin-1").lower() not in _HOP_HEADERS
+        ]
+        new_entry = _Entry(200, headers, body, time.monotonic() + ttl)
+        if ttl > 0 or new_entry.revalidatable:
+            self._store(key, new_entry)
+        else:
+            self._discard(key)
+        return self._response(new_entry, request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    def clear(self) -> None:
+        """清除所有快取條目"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回快取命中、重新驗證與淘汰計數"""
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.not_modified) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,236 @@
+"""
+TDX OData 查詢參數與結果分頁
+
+TDX API 支援 $select / $filter / $orderby / $top / $skip，但規格中不是每個操作都有
+宣告，未宣告的參數不會出現在產生的工具上，也不會被送出。ODataTool 為每個 GET 工具
+補上這些參數，未指定 $top 時套用預設頁面大小，並在上游忽略 $top / $skip / $select 時
+於伺服器端截斷與投影，回傳附帶 next_skip 的分頁結果。
+
+上游是否支援 $skip 無法由單一回應判斷（只回傳不超過一頁的紀錄時，可能是已跳過，
+也可能是資料本來就少），因此每個工具第一次取 $skip > 0 的頁面時，另以 $top=1 取
+第一筆比對：相同表示上游忽略 $skip，之後改為從頭取到本頁結尾再於伺服器端跳過。
+"""
+
+import os
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastmcp.server.openapi import OpenAPITool
+from fastmcp.tools.tool import _convert_to_content
+from fastmcp.utilities.openapi import ParameterInfo
+from mcp.types import TextContent
+
+import fast_json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# 參數名稱 -> (JSON schema, 說明)
+ODATA_PARAMETERS: Dict[str, Tuple[Dict[str, Any], str]] = {
+    "$select": (
+        {"type": "string"},
+        "只回傳指定欄位，以逗號分隔，例如 StationUID,StationName,AvailableRentBikes",
+    ),
+    "$filter": (
+        {"type": "string"},
+        "OData 篩選條件，例如 ServiceStatus eq 1",
+    ),
+    "$orderby": ({"type": "string"}, "排序欄位，例如 UpdateTime desc"),
+    "$top": ({"type": "integer", "minimum": 1}, "回傳筆數上限"),
+    "$skip": (
+        {"type": "integer", "minimum": 0},
+        "跳過的筆數，取得下一頁時傳入上次結果的 next_skip",
+    ),
+}
+
+
+def _page_size(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _as_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _records(data: Any) -> Tuple[Optional[List[Any]], Optional[str]]:
+    """
+    找出回應中的紀錄列表
+
+    TDX v2 直接回傳陣列；v3 以物件包裝，例如 {"UpdateTime": ..., "BikeStations": [...]}
+
+    Returns:
+        (紀錄列表, 包裝物件中的欄位名稱)，找不到唯一的列表時返回 (None, None)
+    """
+    if isinstance(data, list):
+        return data, None
+    if isinstance(data, dict):
+        keys = [key for key, value in data.items() if isinstance(value, list)]
+        if len(keys) == 1:
+            return data[keys[0]], keys[0]
+    return None, None
+
+
+def _project(records: List[Any], fields: List[str]) -> List[Any]:
+    """只保留指定的頂層欄位；上游已投影時直接返回"""
+    wanted = set(fields)
+    if all(not isinstance(r, dict) or r.keys() <= wanted for r in records):
+        return records
+    return [
+        {k: v for k, v in r.items() if k in wanted} if isinstance(r, dict) else r
+        for r in records
+    ]
+
+
+class _CapturingClient:
+    """
+    包裝 OpenAPITool 使用的 httpx 客戶端
+
+    在 ODataTool.run 期間，成功的回應保存到 context 變數，交給 OpenAPITool 的只是
+    內容為 null 的回應；如此 ODataTool 能直接處理原始 JSON，OpenAPITool 也不會先把
+    整個結果以縮排格式序列化一次（單筆的陣列還會被攤平成物件）。
+    """
+
+    def __init__(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def request(self, *args: Any, **kwargs: Any) -> httpx.Response:
+        response = await self._client.request(*args, **kwargs)
+        captured = _captured.get()
+        if captured is None or not response.is_success:
+            return response
+        captured.append(response)
+        return httpx.Response(200, content=b"null", request=response.request)
+
+
+# ODataTool.run 執行期間的回應收集處
+_captured: ContextVar[Optional[List[httpx.Response]]] = ContextVar(
+    "odata_captured", default=None
+)
+
+
+class ODataTool(OpenAPITool):
+    """補上 OData 查詢參數並將結果分頁的 OpenAPI 工具"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._default_top = _page_size("TDX_DEFAULT_TOP", DEFAULT_PAGE_SIZE)
+        self._max_top = max(self._default_top, _page_size("TDX_MAX_TOP", MAX_PAGE_SIZE))
+        self._paged = self._route.method.upper() == "GET"
+        # 上游是否支援 $skip；None 表示尚未判斷
+        self._upstream_skips: Optional[bool] = None
+        if self._paged:
+            self._add_odata_parameters()
+            self._client = _CapturingClient(self._client)
+
+    def _add_odata_parameters(self) -> None:
+        """為路由與參數 schema 補上缺少的 OData 參數"""
+        declared = {p.name for p in self._route.parameters}
+        properties = self.parameters.setdefault("properties", {})
+        for name, (schema, description) in ODATA_PARAMETERS.items():
+            if name == "$top":
+                description = (
+                    f"{description}，預設 {self._default_top}，最多 {self._max_top}"
+                )
+            if name not in declared:
+                self._route.parameters.append(
+                    ParameterInfo.model_validate(
+                        {
+                            "name": name,
+                            "location": "query",
+                            "required": False,
+                            "schema": schema,
+                            "description": description,
+                        }
+                    )
+                )
+            prop = properties.setdefault(name, dict(schema))
+            prop.setdefault("description", description)
+
+    def _page_arguments(
+        self, arguments: Dict[str, Any], top: int, skip: int
+    ) -> Dict[str, Any]:
+        """返回送往上游的參數；多取一筆以判斷是否還有下一頁"""
+        arguments = dict(arguments)
+        if self._upstream_skips is False:
+            # 上游忽略 $skip：從頭取到本頁結尾，於伺服器端跳過
+            arguments["$top"] = skip + top + 1
+            arguments["$skip"] = None
+        else:
+            arguments["$top"] = top + 1
+            arguments["$skip"] = skip or None
+        return arguments
+
+    async def _fetch(
+        self, arguments: Dict[str, Any]
+    ) -> Tuple[List[Any], Optional[httpx.Response]]:
+        """呼叫 API，返回 OpenAPITool 的結果與成功時的原始回應"""
+        captured: List[httpx.Response] = []
+        token = _captured.set(captured)
+        try:
+            content = await super().run(arguments)
+        finally:
+            _captured.reset(token)
+        return content, captured[0] if captured else None
+
+    async def _skip_ignored(self, arguments: Dict[str, Any], first: Any) -> bool:
+        """不帶 $skip 取第一筆，與帶 $skip 的結果的第一筆相同表示上游忽略 $skip"""
+        _, response = await self._fetch({**arguments, "$top": 1, "$skip": None})
+        if response is None:
+            return False
+        try:
+            records, _ = _records(fast_json.loads(response.content))
+        except ValueError:
+            return False
+        return bool(records) and records[0] == first
+
+    async def run(self, arguments: Dict[str, Any]) -> List[Any]:
+        if not self._paged:
+            return await super().run(arguments)
+
+        top = _as_int(arguments.get("$top"), self._default_top)
+        top = min(max(1, top), self._max_top)
+        skip = max(0, _as_int(arguments.get("$skip"), 0))
+        select = arguments.get("$select")
+        sent = self._page_arguments(arguments, top, skip)
+
+        content, response = await self._fetch(sent)
+        if response is None:
+            return content
+        try:
+            data = fast_json.loads(response.content)
+        except ValueError:
+            return [TextContent(type="text", text=response.text)]
+        records, key = _records(data)
+        if records is None:
+            return _convert_to_content(data)
+
+        if skip and records and self._upstream_skips is None:
+            self._upstream_skips = not await self._skip_ignored(sent, records[0])
+            if not self._upstream_skips:
+                # 回應是從頭開始的紀錄，改為從頭取到本頁結尾
+                return await self.run(arguments)
+        # 上游忽略 $top 時回應會超過一頁，一併在伺服器端截斷
+        offset = skip if self._upstream_skips is False else 0
+        records = records[offset : offset + top + 1]
+        has_more = len(records) > top
+        records = records[:top]
+        if select:
+            records = _project(records, [f.strip() for f in select.split(",")])
+
+        page: Dict[str, Any] = {}
+        if key is not None:
+            page.update({k: v for k, v in data.items() if k != key})
+        page.update(
+            {
+                "items": records,
+                "count": len(records),
+                "skip": skip,
+                "next_skip": skip + top if has_more else None,
+            }
+        )
+        # 緊湊格式，不使用預設序列化的縮排
+        return [TextContent(type="text", text=fast_json.dumps(page))]
@@ -0,0 +1,396 @@
+"""
+OpenAPI 規格與工具定義的磁碟快取
+
+FastMCP.from_openapi 每次啟動都要下載規格、解析並展開 $ref、產生每個工具的
+參數 schema 與說明；本模組把下載的規格與產生好的工具表存到磁碟，以規格內容的
+SHA-256 為鍵。啟動時若工具表已存在，直接由 JSON 建立工具，不下載也不解析規格；
+規格在伺服器的事件迴圈上定期重新下載（下載與解析在執行緒中進行），內容改變時才
+重新產生工具表、替換伺服器上的工具，並通知客戶端工具列表已改變。
+
+替換工具使用公開的 FastMCP.add_tool / remove_tool，但以下功能 FastMCP 2.7
+沒有公開的介面，因此依賴其內部屬性，pyproject.toml 也將 fastmcp 鎖定在 2.7.x：
+
+- 產生工具表：FastMCPOpenAPI._tool_manager._tools 與 OpenAPITool._route
+  （HTTPRoute 是重建 OpenAPITool 唯一需要但不公開的資料）
+- ToolListNotifier：FastMCP._mcp_server 的 request_handlers 與 request_context
+
+升級 FastMCP 前須確認這些屬性仍存在，tests/test_openapi_cache.py 會檢查。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import weakref
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Type,
+)
+
+import fastmcp
+import httpx
+from fastmcp import FastMCP
+from fastmcp.server.openapi import FastMCPOpenAPI, OpenAPITool, RouteMap
+from fastmcp.utilities.openapi import HTTPRoute
+
+# 工具表格式版本；格式或產生方式改變時遞增，使舊的工具表失效
+TABLE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".openapi_cache")
+
+# 預設每天檢查一次規格是否更新
+DEFAULT_REFRESH_INTERVAL = 24 * 60 * 60
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """先寫入暫存檔再改名，避免多個工作行程同時讀到寫到一半的檔案"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class OpenAPIToolCache:
+    """以規格內容雜湊為鍵的 OpenAPI 工具表快取"""
+
+    def __init__(
+        self,
+        spec_url: str,
+        client: httpx.AsyncClient,
+        route_maps: Optional[List[RouteMap]] = None,
+        cache_dir: Optional[str] = None,
+        refresh_interval: Optional[float] = None,
+        timeout: float = 30.0,
+    ):
+        """
+        初始化快取
+
+        Args:
+            spec_url: OpenAPI 規格的下載網址
+            client: 產生工具定義時交給 FastMCPOpenAPI 的 API 客戶端（產生時不會發送請求）
+            route_maps: 傳給 FastMCPOpenAPI 的路由對應
+            cache_dir: 快取目錄，如未提供則從環境變量 TDX_OPENAPI_CACHE_DIR 獲取，
+                預設為模組目錄下的 .openapi_cache
+            refresh_interval: 背景重新下載規格的間隔秒數，如未提供則從環境變量
+                TDX_OPENAPI_REFRESH_INTERVAL 獲取，0 表示不在背景更新
+            timeout: 下載規格的逾時秒數
+        """
+        self.spec_url = spec_url
+        self.client = client
+        self.route_maps = route_maps
+        self.cache_dir = cache_dir or os.getenv(
+            "TDX_OPENAPI_CACHE_DIR", DEFAULT_CACHE_DIR
+        )
+        if refresh_interval is None:
+            refresh_interval = float(
+                os.getenv("TDX_OPENAPI_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL)
+            )
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        # 以網址區分不同規格，同一目錄可供多個伺服器共用
+        self._key = hashlib.sha256(spec_url.encode("utf-8")).hexdigest()[:16]
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self._key}.meta.json")
+
+    def _spec_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key}.spec.{digest[:16]}.json")
+
+    def _table_path(self, digest: str) -> str:
+        # 工具表依賴 FastMCP 的產生邏輯，升級 FastMCP 後需要重新產生
+        variant = f"{TABLE_VERSION}-{fastmcp.__version__}"
+        return os.path.join(
+            self.cache_dir, f"{self._key}.tools.{digest[:16]}.{variant}.json"
+        )
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path, "rb") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_table(self, digest: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._table_path(digest), "rb") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_spec(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._spec_path(digest), "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        # 檔案損毀時視為不存在
+        if hashlib.sha256(raw).hexdigest() != digest:
+            return None
+        return raw
+
+    def _store_spec(self, raw: bytes) -> str:
+        """保存規格並更新中繼資料，返回內容雜湊"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        digest = hashlib.sha256(raw).hexdigest()
+        if not os.path.exists(self._spec_path(digest)):
+            _write_atomic(self._spec_path(digest), raw)
+        previous = self._read_meta()
+        meta = {"sha256": digest, "url": self.spec_url, "fetched_at": time.time()}
+        _write_atomic(self._meta_path, json.dumps(meta).encode("utf-8"))
+        if previous and previous.get("sha256") not in (None, digest):
+            # 舊版本的規格與工具表已不再使用
+            for path in os.listdir(self.cache_dir):
+                if path.startswith(self._key) and previous["sha256"][:16] in path:
+                    try:
+                        os.unlink(os.path.join(self.cache_dir, path))
+                    except OSError:
+                        pass
+        return digest
+
+    def _download(self) -> bytes:
+        """
+        下載規格
+
+        Raises:
+            httpx.HTTPError: 下載失敗時
+            ValueError: 內容不是 JSON 時
+        """
+        response = httpx.get(self.spec_url, timeout=self.timeout)
+        response.raise_for_status()
+        raw = response.content
+        json.loads(raw)
+        return raw
+
+    def _build_table(self, raw: bytes, digest: str) -> List[Dict[str, Any]]:
+        """解析規格並產生工具表，同時寫入磁碟"""
+        # 只借用 FastMCPOpenAPI 產生工具定義，產生的工具不會被呼叫
+        server = FastMCPOpenAPI(
+            openapi_spec=json.loads(raw),
+            client=self.client,
+            route_maps=self.route_maps,
+        )
+        table = [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters,
+                "tags": sorted(tool.tags),
+                "route": tool._route.model_dump(mode="json", by_alias=True),
+            }
+            for tool in server._tool_manager._tools.values()
+            if isinstance(tool, OpenAPITool)
+        ]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        _write_atomic(
+            self._table_path(digest),
+            json.dumps(table, ensure_ascii=False).encode("utf-8"),
+        )
+        return table
+
+    def load_table(self) -> List[Dict[str, Any]]:
+        """
+        取得工具表：優先讀取快取，其次由快取的規格產生，最後才下載規格
+
+        Returns:
+            工具定義列表
+
+        Raises:
+            httpx.HTTPError: 沒有任何快取且下載失敗時
+        """
+        meta = self._read_meta()
+        if meta:
+            digest = meta["sha256"]
+            table = self._read_table(digest)
+            if table is not None:
+                return table
+            raw = self._read_spec(digest)
+            if raw is not None:
+                return self._build_table(raw, digest)
+        raw = self._download()
+        return self._build_table(raw, self._store_spec(raw))
+
+    def create_tools(
+        self,
+        client: httpx.AsyncClient,
+        table: Optional[List[Dict[str, Any]]] = None,
+        timeout_for: Optional[Callable[[str], Optional[float]]] = None,
+        tool_class: Type[OpenAPITool] = OpenAPITool,
+    ) -> List[OpenAPITool]:
+        """
+        由工具表建立工具
+
+        Args:
+            client: 工具呼叫 API 時使用的 httpx 客戶端
+            table: 工具表，如未提供則呼叫 load_table
+            timeout_for: 依 OpenAPI 路徑返回 API 呼叫逾時秒數的函數；未提供時
+                OpenAPITool 以 timeout=None 呼叫 API，即沒有逾時
+            tool_class: 建立工具使用的類別，例如 odata.ODataTool
+
+        Returns:
+            OpenAPITool 列表
+        """
+        if table is None:
+            table = self.load_table()
+        tools = []
+        for entry in table:
+            route = HTTPRoute.model_validate(entry["route"])
+            tools.append(
+                tool_class(
+                    client=client,
+                    route=route,
+                    name=entry["name"],
+                    description=entry["description"],
+                    parameters=entry["parameters"],
+                    tags=set(entry["tags"]),
+                    timeout=timeout_for(route.path) if timeout_for else None,
+                )
+            )
+        return tools
+
+    def refresh(self) -> bool:
+        """
+        重新下載規格，內容改變時重新產生工具表
+
+        Returns:
+            規格內容是否改變
+        """
+        meta = self._read_meta()
+        raw = self._download()
+        digest = self._store_spec(raw)
+        if meta and meta.get("sha256") == digest:
+            return False
+        self._build_table(raw, digest)
+        return True
+
+    def seconds_until_refresh(self) -> float:
+        """距離下次應重新下載規格的秒數"""
+        meta = self._read_meta()
+        if not meta:
+            return 0.0
+        return max(0.0, meta["fetched_at"] + self.refresh_interval - time.time())
+
+    def start_background_refresh(
+        self, on_change: Callable[[List[Dict[str, Any]]], Awaitable[None]]
+    ) -> None:
+        """
+        在目前的事件迴圈上啟動背景任務，定期更新規格
+
+        下載與產生工具表在執行緒中進行，on_change 則在事件迴圈上執行，
+        因此可以安全地呼叫 FastMCP.add_tool / remove_tool 並發送通知。
+
+        Args:
+            on_change: 規格改變時以新的工具表呼叫的協程函數
+        """
+        if self.refresh_interval <= 0 or self._task is not None:
+            return
+
+        async def loop() -> None:
+            while True:
+                await asyncio.sleep(self.seconds_until_refresh())
+                try:
+                    if await asyncio.to_thread(self.refresh):
+                        await on_change(await asyncio.to_thread(self.load_table))
+                except Exception as e:
+                    print(f"更新 OpenAPI 規格失敗: {e}", file=sys.stderr)
+                    # 失敗時稍後重試，不要立即重複下載
+                    await asyncio.sleep(min(self.refresh_interval, 300))
+
+        self._task = asyncio.create_task(loop())
+
+    async def stop(self) -> None:
+        """停止背景更新"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def register_tools(
+    mcp: FastMCP, tools: List[OpenAPITool], previous: Iterable[str] = ()
+) -> Set[str]:
+    """
+    以新的工具集合替換伺服器上由 OpenAPI 產生的工具
+
+    須在伺服器啟動前或在伺服器的事件迴圈中呼叫；替換期間沒有 await，
+    其他請求不會看到替換到一半的工具集合，進行中的呼叫仍使用舊的工具物件。
+
+    Args:
+        mcp: FastMCP 伺服器
+        tools: 新的工具
+        previous: 上一次由本函數註冊的工具名稱
+
+    Returns:
+        本次註冊的工具名稱，下次替換時作為 previous 傳入
+    """
+    names = {tool.name for tool in tools}
+    for name in previous:
+        # 同名的工具也先移除，避免 add_tool 發出重複工具的警告
+        mcp.remove_tool(name)
+    for tool in tools:
+        mcp.add_tool(tool)
+    return names
+
+
+class ToolListNotifier:
+    """
+    記錄曾發出請求的 MCP 工作階段，工具改變時發送 notifications/tools/list_changed
+
+    MCPSessionPool 會快取 tools/list 直到收到這個通知，不通知的話代理會一直
+    提供舊的工具列表。
+    """
+
+    def __init__(self, mcp: FastMCP):
+        """
+        初始化並包裝伺服器的請求處理函數
+
+        Args:
+            mcp: 已設定好處理函數的 FastMCP 伺服器
+        """
+        self._sessions: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        server = mcp._mcp_server
+        for request_type, handler in list(server.request_handlers.items()):
+            server.request_handlers[request_type] = self._track(server, handler)
+
+    def _track(self, server: Any, handler: Callable[[Any], Awaitable[Any]]) -> Any:
+        async def tracked(request: Any) -> Any:
+            self._sessions.add(server.request_context.session)
+            return await handler(request)
+
+        return tracked
+
+    async def notify(self) -> int:
+        """
+        通知所有工作階段工具列表已改變
+
+        Returns:
+            成功通知的工作階段數
+        """
+        sent = 0
+        for session in list(self._sessions):
+            try:
+                await session.send_tool_list_changed()
+                sent += 1
+            except Exception:
+                # 工作階段已關閉
+                self._sessions.discard(session)
+        return sent
@@ -0,0 +1,452 @@
+"""
+YouBike 站點空間索引
+
+將各縣市的站點依經緯度放入固定大小（預設 500 公尺）的網格，查詢時由查詢點所在
+的格子向外一圈一圈搜尋，找到 k 個符合條件的站點且下一圈不可能更近時停止，
+不需要掃描整個縣市的站點列表；查詢點遠離所有站點時（例如座標輸入錯誤）則改為
+逐一計算距離。站點資料由 StationIndexUpdater
+在背景定期經由 TDX API 更新，即時車位則只套用 AvailabilitySnapshot 中有變動的紀錄。
+"""
+
+import asyncio
+import heapq
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+import fast_json
+
+from availability_snapshot import (
+    FOLLOWER_POLL_INTERVAL,
+    FOLLOWER_WAIT,
+    AvailabilitySnapshot,
+    SharedSnapshotStore,
+    configured_cities,
+)
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+DEFAULT_CELL_SIZE_M = 500.0
+DEFAULT_STATION_INTERVAL = 3600.0
+
+# 查詢點離網格範圍超過此距離時，網格的平面距離下界不再可靠，改為逐一計算
+FAR_QUERY_DISTANCE_M = 50_000.0
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """兩點間的大圓距離（公尺）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class Station:
+    """站點基本資料與即時車位"""
+
+    __slots__ = (
+        "uid",
+        "name",
+        "city",
+        "lat",
+        "lon",
+        "address",
+        "capacity",
+        "rent",
+        "returns",
+        "status",
+        "updated",
+    )
+
+    def __init__(
+        self,
+        uid: str,
+        name: str,
+        city: str,
+        lat: float,
+        lon: float,
+        address: Optional[str] = None,
+        capacity: Optional[int] = None,
+    ):
+        self.uid = uid
+        self.name = name
+        self.city = city
+        self.lat = lat
+        self.lon = lon
+        self.address = address
+        self.capacity = capacity
+        # 尚未取得即時車位時為 None
+        self.rent: Optional[int] = None
+        self.returns: Optional[int] = None
+        self.status: Optional[int] = None
+        self.updated: Optional[str] = None
+
+    @classmethod
+    def from_tdx(cls, record: Dict[str, Any], city: str) -> Optional["Station"]:
+        """由 TDX Station API 的紀錄建立站點，缺少坐標時返回 None"""
+        position = record.get("StationPosition") or {}
+        lat, lon = position.get("PositionLat"), position.get("PositionLon")
+        if lat is None or lon is None or not record.get("StationUID"):
+            return None
+        name = record.get("StationName") or {}
+        address = record.get("StationAddress") or {}
+        return cls(
+            uid=record["StationUID"],
+            name=name.get("Zh_tw") or name.get("En") or record["StationUID"],
+            city=city,
+            lat=float(lat),
+            lon=float(lon),
+            address=address.get("Zh_tw") or address.get("En"),
+            capacity=record.get("BikesCapacity"),
+        )
+
+    def apply_availability(self, record: Dict[str, Any]) -> None:
+        """套用 TDX Availability API 的紀錄"""
+        self.rent = record.get("AvailableRentBikes")
+        self.returns = record.get("AvailableReturnBikes")
+        self.status = record.get("ServiceStatus")
+        self.updated = record.get("SrcUpdateTime") or record.get("UpdateTime")
+
+    def to_dict(self, distance: Optional[float] = None) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "station_uid": self.uid,
+            "name": self.name,
+            "city": self.city,
+            "lat": self.lat,
+            "lon": self.lon,
+            "address": self.address,
+            "capacity": self.capacity,
+            "available_rent_bikes": self.rent,
+            "available_return_bikes": self.returns,
+            "service_status": self.status,
+            "updated_at": self.updated,
+        }
+        if distance is not None:
+            result["distance_m"] = round(distance)
+        return result
+
+
+class StationIndex:
+    """以經緯度網格索引的站點集合"""
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE_M):
+        """
+        初始化索引
+
+        Args:
+            cell_size: 網格邊長（公尺）；約為常見查詢半徑時效果最好
+        """
+        self.cell_size = cell_size
+        self._stations: Dict[str, Station] = {}
+        self._cells: Dict[Tuple[int, int], List[Station]] = {}
+        self._cell_lat = cell_size / METERS_PER_DEGREE
+        self._cell_lon = self._cell_lat
+        self._bounds = (0, 0, 0, 0)
+        self.availability_updated_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def get(self, uid: str) -> Optional[Station]:
+        return self._stations.get(uid)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self._cell_lat), math.floor(lon / self._cell_lon)
+
+    def _rebuild(self) -> None:
+        # 經度方向的格寬以最高緯度計算，使每格在所有站點的緯度上都至少 cell_size 公尺寬，
+        # 搜尋到第 r 圈時，圈外的站點距離必定大於 r * cell_size
+        max_lat = max((abs(s.lat) for s in self._stations.values()), default=0.0)
+        self._cell_lon = self._cell_lat / max(math.cos(math.radians(max_lat)), 1e-6)
+        cells: Dict[Tuple[int, int], List[Station]] = {}
+        for station in self._stations.values():
+            cells.setdefault(self._cell(station.lat, station.lon), []).append(station)
+        self._cells = cells
+        rows = [r for r, _ in cells] or [0]
+        cols = [c for _, c in cells] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def replace_city(self, city: str, stations: Iterable[Station]) -> None:
+        """
+        以新的站點列表取代某個縣市的站點，保留仍存在站點的即時車位
+
+        Args:
+            city: 縣市
+            stations: 該縣市的全部站點
+        """
+        merged = {uid: s for uid, s in self._stations.items() if s.city != city}
+        for station in stations:
+            previous = self._stations.get(station.uid)
+            if previous is not None:
+                station.rent, station.returns = previous.rent, previous.returns
+                station.status, station.updated = previous.status, previous.updated
+            merged[station.uid] = station
+        # 建好新的字典與網格後一次替換，查詢不會看到一半的狀態
+        self._stations = merged
+        self._rebuild()
+
+    def update_availability(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        套用即時車位紀錄
+
+        Args:
+            records: TDX Availability API 的紀錄
+
+        Returns:
+            更新的站點數
+        """
+        updated = 0
+        for record in records:
+            station = self._stations.get(record.get("StationUID"))
+            if station is not None:
+                station.apply_availability(record)
+                updated += 1
+        self.availability_updated_at = time.time()
+        return updated
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        min_bikes: int = 0,
+        min_docks: int = 0,
+        max_distance: Optional[float] = None,
+    ) -> List[Tuple[float, Station]]:
+        """
+        查詢最近的站點
+
+        Args:
+            lat: 緯度
+            lon: 經度
+            k: 返回的站點數
+            min_bikes: 可借車輛數下限
+            min_docks: 可還空位數下限
+            max_distance: 搜尋半徑上限（公尺）
+
+        Returns:
+            依距離排序的 (距離公尺, 站點) 列表
+        """
+        cells = self._cells
+        if not cells or k <= 0:
+            return []
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self._bounds
+        # 查詢點到網格範圍的圈數：更內圈的格子都在範圍外，直接從這一圈開始
+        first_ring = max(min_row - row, row - max_row, min_col - col, col - max_col, 0)
+        # 超過網格範圍後不會再有站點
+        max_ring = max(
+            abs(row - min_row),
+            abs(row - max_row),
+            abs(col - min_col),
+            abs(col - max_col),
+        )
+        if max_distance is not None:
+            max_ring = min(max_ring, math.ceil(max_distance / self.cell_size) + 1)
+        if first_ring > max_ring:
+            return []
+        if first_ring * self.cell_size > FAR_QUERY_DISTANCE_M:
+            return self._scan(lat, lon, k, min_bikes, min_docks, max_distance)
+
+        found: List[Tuple[float, Station]] = []
+        for ring in range(first_ring, max_ring + 1):
+            # 只走訪圈上位於網格範圍內的格子
+            for r in range(max(row - ring, min_row), min(row + ring, max_row) + 1):
+                if r in (row - ring, row + ring):
+                    columns: Iterable[int] = range(
+                        max(col - ring, min_col), min(col + ring, max_col) + 1
+                    )
+                else:
+                    columns = [
+                        c for c in {col - ring, col + ring} if min_col <= c <= max_col
+                    ]
+                for c in columns:
+                    for station in cells.get((r, c), ()):
+                        if min_bikes and (station.rent or 0) < min_bikes:
+                            continue
+                        if min_docks and (station.returns or 0) < min_docks:
+                            continue
+                        distance = haversine(lat, lon, station.lat, station.lon)
+                        if max_distance is None or distance <= max_distance:
+                            found.append((distance, station))
+            if len(found) >= k:
+                found.sort(key=lambda item: item[0])
+                # 下一圈的站點至少相距 ring * cell_size 公尺
+                if found[k - 1][0] <= ring * self.cell_size:
+                    break
+        found.sort(key=lambda item: item[0])
+        return found[:k]
+
+    def _scan(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        min_bikes: int,
+        min_docks: int,
+        max_distance: Optional[float],
+    ) -> List[Tuple[float, Station]]:
+        """逐一計算所有站點的距離，供遠離網格範圍的查詢使用"""
+        found: List[Tuple[float, Station]] = []
+        for station in self._stations.values():
+            if min_bikes and (station.rent or 0) < min_bikes:
+                continue
+            if min_docks and (station.returns or 0) < min_docks:
+                continue
+            distance = haversine(lat, lon, station.lat, station.lon)
+            if max_distance is None or distance <= max_distance:
+                found.append((distance, station))
+        return heapq.nsmallest(k, found, key=lambda item: item[0])
+
+
+class StationIndexUpdater:
+    """定期經由 TDX API 更新站點索引，即時車位則由 AvailabilitySnapshot 的變動通知套用"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        index: StationIndex,
+        snapshot: AvailabilitySnapshot,
+        cities: Optional[List[str]] = None,
+        station_interval: Optional[float] = None,
+        store: Optional[SharedSnapshotStore] = None,
+    ):
+        """
+        初始化更新器
+
+        Args:
+            client: TDX API 客戶端
+            index: 要更新的索引
+            snapshot: 即時車位快照，只有變動的紀錄會套用到索引
+            cities: 縣市列表，如未提供則呼叫 configured_cities
+            station_interval: 站點基本資料更新間隔秒數，如未提供則從環境變量
+                TDX_STATION_REFRESH_INTERVAL 獲取
+            store: 與其他工作行程共用的快照目錄；持有目錄鎖的行程向 TDX 抓取並寫入，
+                其他行程讀取檔案
+        """
+        self.client = client
+        self.index = index
+        self.snapshot = snapshot
+        self.cities = cities or configured_cities()
+        self.station_interval = station_interval or float(
+            os.getenv("TDX_STATION_REFRESH_INTERVAL", DEFAULT_STATION_INTERVAL)
+        )
+        self.store = store
+        self.ready = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        snapshot.subscribe(self._on_availability)
+
+    def _is_leader(self) -> bool:
+        return self.store is None or self.store.is_leader()
+
+    def _on_availability(
+        self, city: str, changed: List[Dict[str, Any]], removed: List[str]
+    ) -> None:
+        self.index.update_availability(changed)
+
+    async def refresh_stations(self, city: str) -> None:
+        # 更新間隔由本更新器決定，不使用回應快取中尚未過期的舊資料
+        response = await self.client.get(
+            f"/v2/Bike/Station/City/{city}",
+            params={"$format": "JSON"},
+            headers={"Cache-Control": "no-cache"},
+        )
+        response.raise_for_status()
+        records = response.json()
+        if isinstance(records, dict):
+            # v3 回應以物件包裝紀錄列表
+            records = next((v for v in records.values() if isinstance(v, list)), [])
+        if self.store is not None:
+            self.store.write(f"stations.{city}.json", fast_json.dumps_bytes(records))
+        self._replace_city(city, records)
+
+    def load_shared(self, city: str) -> bool:
+        """
+        由共用目錄載入 leader 寫入的站點資料
+
+        Returns:
+            是否載入了新的資料
+        """
+        raw = self.store.read(f"stations.{city}.json") if self.store else None
+        if raw is None:
+            return False
+        self._replace_city(city, fast_json.loads(raw))
+        return True
+
+    def _replace_city(self, city: str, records: List[Dict[str, Any]]) -> None:
+        stations = [Station.from_tdx(record, city) for record in records]
+        self.index.replace_city(city, [s for s in stations if s is not None])
+        # 新加入的站點還沒有即時車位，從快照補上
+        current = self.snapshot.get(city)
+        if current is not None:
+            self.index.update_availability(current.records.values())
+
+    async def refresh_all(self) -> None:
+        """更新所有縣市的站點；個別縣市失敗不影響其他縣市"""
+        if not self._is_leader():
+            for city in self.cities:
+                try:
+                    self.load_shared(city)
+                except Exception as e:
+                    print(f"載入共用站點資料失敗: {e}", file=sys.stderr)
+            return
+        results = await asyncio.gather(
+            *(self.refresh_stations(city) for city in self.cities),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"更新站點索引失敗: {result}", file=sys.stderr)
+
+    async def _load_initial(self) -> None:
+        if not self._is_leader():
+            # 等待 leader 完成第一次載入；期間 leader 結束則由本行程接手
+            deadline = time.monotonic() + FOLLOWER_WAIT
+            pending = list(self.cities)
+            while pending and time.monotonic() < deadline and not self._is_leader():
+                pending = [c for c in pending if not self.load_shared(c)]
+                if pending:
+                    await asyncio.sleep(0.5)
+            if not self._is_leader():
+                return
+        await self.refresh_all()
+
+    async def _loop(self) -> None:
+        while True:
+            # 非 leader 只檢查檔案，較頻繁地檢查以縮短延遲
+            interval = (
+                self.station_interval
+                if self._is_leader()
+                else min(self.station_interval, FOLLOWER_POLL_INTERVAL)
+            )
+            await asyncio.sleep(interval)
+            await self.refresh_all()
+
+    def start(self) -> None:
+        """在背景載入索引並開始定期更新"""
+
+        async def initial() -> None:
+            try:
+                await self._load_initial()
+            finally:
+                self.ready.set()
+
+        self._tasks = [
+            asyncio.create_task(initial()),
+            asyncio.create_task(self._loop()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
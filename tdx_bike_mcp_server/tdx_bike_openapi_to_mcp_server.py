@@ -1,33 +1,140 @@
-import httpx
+import asyncio
 import os
+import sys
+from typing import Any, Dict, Optional
 
 from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
 from fastmcp.server.openapi import RouteMap, MCPType
 from dotenv import load_dotenv
 
+# 共用專案根目錄的限流器與 JSON 編解碼
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_json  # noqa: E402
+from availability_snapshot import (  # noqa: E402
+    AvailabilityScheduler,
+    AvailabilitySnapshot,
+    SharedSnapshotStore,
+)
+from odata import ODataTool  # noqa: E402
+from openapi_cache import OpenAPIToolCache, ToolListNotifier, register_tools  # noqa: E402
+from station_index import StationIndex, StationIndexUpdater  # noqa: E402
+from tdx_client import create_api_client, route_timeout  # noqa: E402
+
 load_dotenv()
 
 # Initialize the proxy with your TDX credentials
-TDX_ACCESS_TOKEN = os.getenv("TDX_ACCESS_TOKEN", default=None)
-if not TDX_ACCESS_TOKEN:
-    raise ValueError("TDX_ACCESS_TOKEN 必須在環境變數中設定")
-api_client = httpx.AsyncClient(
-    base_url="https://tdx.transportdata.tw/api/basic",
-    headers={"Authorization": f"Bearer {TDX_ACCESS_TOKEN}"},
+# 以 TDX_CLIENT_ID / TDX_CLIENT_SECRET 自動取得並更新權杖，或使用固定的 TDX_ACCESS_TOKEN；
+# 客戶端已設定回應快取、並發上限、keep-alive 連線池與 HTTP/2；
+# 設定縣市的即時車位由背景排程定期抓取，Availability 工具直接由快照回應
+availability = AvailabilitySnapshot()
+api_client = create_api_client(snapshot=availability)
+# 代理啟動多個工作行程時，只有持有快照目錄鎖的行程向 TDX 預先抓取
+snapshot_store = SharedSnapshotStore()
+availability_scheduler = AvailabilityScheduler(
+    api_client, availability, store=snapshot_store
 )
 
 # Load your OpenAPI spec
-openapi_spec = httpx.get(
-    "https://tdx.transportdata.tw/webapi/File/Swagger/V3/2cc9b888-a592-496f-99de-9ab35b7fb70d"
-).json()
+# 規格與產生的工具表快取在磁碟上，啟動時不需下載與解析規格
+spec_cache = OpenAPIToolCache(
+    os.getenv(
+        "TDX_OPENAPI_SPEC_URL",
+        "https://tdx.transportdata.tw/webapi/File/Swagger/V3/2cc9b888-a592-496f-99de-9ab35b7fb70d",
+    ),
+    api_client,
+    route_maps=[RouteMap(mcp_type=MCPType.TOOL)],
+)
 
 # Create the MCP server
-mcp = FastMCP.from_openapi(
-    openapi_spec=openapi_spec,
-    client=api_client,
-    name="TDX Bike MCP Server",
-    route_maps=[RouteMap(mcp_type=MCPType.TOOL)],
+mcp = FastMCP(name="TDX Bike MCP Server", tool_serializer=fast_json.dumps)
+
+
+def _create_tools(table=None):
+    # 每個 GET 工具都提供 $select / $filter / $top / $skip，結果預設分頁
+    return spec_cache.create_tools(
+        api_client, table, timeout_for=route_timeout, tool_class=ODataTool
+    )
+
+
+_openapi_tools = register_tools(mcp, _create_tools())
+# 規格更新後通知客戶端（例如代理的工作階段池）重新列出工具
+tool_notifier = ToolListNotifier(mcp)
+
+
+async def _on_spec_change(table):
+    global _openapi_tools
+    _openapi_tools = register_tools(mcp, _create_tools(table), _openapi_tools)
+    await tool_notifier.notify()
+
+
+# 站點空間索引，於背景定期更新站點，即時車位隨快照的變動更新
+station_index = StationIndex()
+index_updater = StationIndexUpdater(
+    api_client, station_index, availability, store=snapshot_store
 )
 
+
+@mcp.tool
+async def find_nearest_stations(
+    lat: float,
+    lon: float,
+    k: int = 5,
+    min_available_bikes: int = 1,
+    min_available_docks: int = 0,
+    max_distance_m: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    查詢指定位置附近的 YouBike 站點與即時車位。
+
+    Parameters:
+        lat: 緯度，例如 25.0478
+        lon: 經度，例如 121.5170
+        k: 返回的站點數，默認值為 5
+        min_available_bikes: 可借車輛數下限，默認值為 1（只返回有車可借的站點）
+        min_available_docks: 可還空位數下限，默認值為 0
+        max_distance_m: 搜尋半徑上限（公尺），默認不限制
+    Returns:
+        包含 stations（依距離排序的站點，含 distance_m 與即時車位）、cities（已索引的縣市）
+        與 availability_updated_at（即時車位更新時間戳）的字典
+    Raises:
+        ToolError: 經緯度超出範圍時
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ToolError(f"經緯度超出範圍: lat={lat}, lon={lon}")
+    if not index_updater.ready.is_set():
+        await index_updater.ready.wait()
+    if not availability_scheduler.ready.is_set():
+        await availability_scheduler.ready.wait()
+    results = station_index.nearest(
+        lat,
+        lon,
+        k=max(1, min(k, 50)),
+        min_bikes=min_available_bikes,
+        min_docks=min_available_docks,
+        max_distance=max_distance_m,
+    )
+    return {
+        "stations": [station.to_dict(distance) for distance, station in results],
+        "cities": index_updater.cities,
+        "availability_updated_at": station_index.availability_updated_at,
+    }
+
+
+async def main():
+    spec_cache.start_background_refresh(_on_spec_change)
+    # 結束時關閉連線池
+    async with api_client:
+        availability_scheduler.start()
+        index_updater.start()
+        try:
+            await mcp.run_async()
+        finally:
+            await index_updater.stop()
+            await availability_scheduler.stop()
+            await spec_cache.stop()
+
+
 if __name__ == "__main__":
-    mcp.run()
+    asyncio.run(main())
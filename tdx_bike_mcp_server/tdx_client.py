@@ -0,0 +1,271 @@
+"""
+TDX API 客戶端
+
+建立 OpenAPI 工具使用的 httpx.AsyncClient，依序包裝：
+即時車位快照（availability_snapshot.SnapshotTransport，選用）→
+回應快取（http_cache.CachingTransport）→ 並發與速率限制 → 連線池（keep-alive、HTTP/2）。
+存取權杖以 client credentials 自動取得並在到期前更新，收到 401 時更新一次後重試，
+避免權杖過期時大量並發呼叫同時失敗。
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+
+from availability_snapshot import AvailabilitySnapshot, SnapshotTransport
+from http_cache import CachingTransport
+from rate_limit import AsyncRateLimiter
+
+# HTTP/2 需要 httpx[http2]；未安裝 h2 時 http2=True 會在建立客戶端時拋出 ImportError
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_BASE_URL = "https://tdx.transportdata.tw/api/basic"
+DEFAULT_TOKEN_URL = (
+    "https://tdx.transportdata.tw/auth/realms/TDXConnect/protocol/openid-connect/token"
+)
+DEFAULT_TIMEOUT = 10.0
+
+# 預設的路徑逾時規則：整個縣市的站點與路網資料較大，給予較長的時間
+DEFAULT_TIMEOUT_RULES: Dict[str, float] = {
+    r"/Bike/Shape/": 30.0,
+    r"/Bike/CyclingShape/": 30.0,
+    r"/Bike/Station/": 20.0,
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def load_timeout_rules(value: Optional[str] = None) -> List[Tuple[re.Pattern, float]]:
+    """
+    解析路徑逾時規則
+
+    Args:
+        value: JSON 物件字串，鍵為路徑的正規表示式，值為逾時秒數；
+            如未提供則從環境變量 TDX_ROUTE_TIMEOUTS 獲取，仍未設定時使用預設規則
+
+    Returns:
+        (已編譯的路徑樣式, 逾時秒數) 列表
+
+    Raises:
+        ValueError: 設定不是 JSON 物件時
+    """
+    value = value if value is not None else os.getenv("TDX_ROUTE_TIMEOUTS")
+    rules = DEFAULT_TIMEOUT_RULES
+    if value:
+        rules = json.loads(value)
+        if not isinstance(rules, dict):
+            raise ValueError(
+                'TDX_ROUTE_TIMEOUTS 必須是 JSON 物件，例如 {"/Shape/": 30}'
+            )
+    return [(re.compile(pattern), float(seconds)) for pattern, seconds in rules.items()]
+
+
+def route_timeout(
+    path: str,
+    rules: Optional[List[Tuple[re.Pattern, float]]] = None,
+    default: Optional[float] = None,
+) -> float:
+    """
+    返回路徑的逾時秒數
+
+    Args:
+        path: OpenAPI 路徑
+        rules: 路徑逾時規則，如未提供則呼叫 load_timeout_rules
+        default: 沒有符合的規則時使用的逾時，如未提供則從環境變量 TDX_TIMEOUT 獲取
+    """
+    for pattern, seconds in rules if rules is not None else load_timeout_rules():
+        if pattern.search(path):
+            return seconds
+    return (
+        default if default is not None else _env_float("TDX_TIMEOUT", DEFAULT_TIMEOUT)
+    )
+
+
+class TDXAuth(httpx.Auth):
+    """
+    TDX 存取權杖認證（僅供 AsyncClient 使用）
+
+    提供 client_id / client_secret 時以 client credentials 取得權杖，於到期前
+    refresh_margin 秒自動更新；並發請求共用同一次更新。只提供固定權杖時無法更新。
+    """
+
+    def __init__(
+        self,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        access_token: Optional[str] = None,
+        token_url: str = DEFAULT_TOKEN_URL,
+        refresh_margin: float = 300.0,
+    ):
+        """
+        初始化認證
+
+        Args:
+            client_id: TDX 應用程式 Client Id
+            client_secret: TDX 應用程式 Client Secret
+            access_token: 固定的存取權杖，未提供 client_id 時使用
+            token_url: 取得權杖的端點
+            refresh_margin: 提前更新權杖的秒數
+
+        Raises:
+            ValueError: 既沒有 client credentials 也沒有存取權杖時
+        """
+        if not (client_id and client_secret) and not access_token:
+            raise ValueError(
+                "必須設定 TDX_CLIENT_ID 與 TDX_CLIENT_SECRET，或設定 TDX_ACCESS_TOKEN"
+            )
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self._token = access_token
+        self._expires_at = float("inf") if access_token else 0.0
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    @property
+    def can_refresh(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    async def _fetch_token(self) -> None:
+        async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT) as client:
+            response = await client.post(
+                self.token_url,
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                },
+            )
+            response.raise_for_status()
+            data = response.json()
+        self._token = data["access_token"]
+        self._expires_at = time.monotonic() + float(data.get("expires_in", 3600))
+        self.refreshes += 1
+
+    async def token(self, stale: Optional[str] = None) -> str:
+        """
+        取得有效的存取權杖
+
+        Args:
+            stale: 已被伺服器拒絕的權杖；若目前權杖仍是它則強制更新
+        """
+        if self.can_refresh and (
+            self._token is None
+            or self._token == stale
+            or time.monotonic() > self._expires_at - self.refresh_margin
+        ):
+            async with self._lock:
+                # 等待鎖期間其他請求可能已完成更新
+                if (
+                    self._token is None
+                    or self._token == stale
+                    or time.monotonic() > self._expires_at - self.refresh_margin
+                ):
+                    await self._fetch_token()
+        return self._token
+
+    async def async_auth_flow(
+        self, request: httpx.Request
+    ) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        token = await self.token()
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+        if response.status_code == 401 and self.can_refresh:
+            await response.aread()
+            request.headers["Authorization"] = f"Bearer {await self.token(token)}"
+            yield request
+
+
+class LimitedTransport(httpx.AsyncBaseTransport):
+    """以 AsyncRateLimiter 限制同時進行的上游請求數與每分鐘請求數"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AsyncRateLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async with self.limiter.slot():
+            response = await self.transport.handle_async_request(request)
+            # 在名額內讀完回應，名額才真正對應到一條進行中的連線
+            try:
+                body = b"".join([chunk async for chunk in response.aiter_raw()])
+            finally:
+                await response.aclose()
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers.raw,
+            # 以 stream 傳入原始內容，解壓縮留給最外層的客戶端
+            stream=httpx.ByteStream(body),
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def create_api_client(
+    base_url: Optional[str] = None, snapshot: Optional[AvailabilitySnapshot] = None
+) -> httpx.AsyncClient:
+    """
+    依環境變量建立 TDX API 客戶端
+
+    Args:
+        base_url: API 基底網址，如未提供則從環境變量 TDX_BASE_URL 獲取
+        snapshot: 即時車位快照；提供時已載入縣市的 Availability 請求由快照回應
+
+    Returns:
+        已設定認證、快取、並發限制與連線池的 httpx.AsyncClient
+
+    Raises:
+        ValueError: 未設定任何 TDX 認證資訊時
+    """
+    auth = TDXAuth(
+        client_id=os.getenv("TDX_CLIENT_ID"),
+        client_secret=os.getenv("TDX_CLIENT_SECRET"),
+        access_token=os.getenv("TDX_ACCESS_TOKEN"),
+        token_url=os.getenv("TDX_TOKEN_URL", DEFAULT_TOKEN_URL),
+    )
+    http2 = os.getenv("TDX_HTTP2", "true").lower() in ("1", "true", "yes")
+    if http2 and not HTTP2_AVAILABLE:
+        # stdout 是 MCP 的傳輸通道，訊息只能寫到 stderr
+        print(
+            "未安裝 h2，改用 HTTP/1.1。請執行 pip install httpx[http2]", file=sys.stderr
+        )
+        http2 = False
+    network = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("TDX_MAX_CONNECTIONS", 50)),
+            max_keepalive_connections=int(os.getenv("TDX_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=_env_float("TDX_KEEPALIVE_EXPIRY", 30.0),
+        ),
+        retries=1,
+    )
+    limiter = AsyncRateLimiter(
+        rate_per_minute=_env_float("TDX_RATE_LIMIT_PER_MINUTE", 0),
+        burst=int(os.getenv("TDX_RATE_LIMIT_BURST", 10)),
+        max_in_flight=int(os.getenv("TDX_MAX_IN_FLIGHT", 16)),
+    )
+    # 快取在限流之外：命中快取的呼叫不佔用並發名額
+    transport: httpx.AsyncBaseTransport = CachingTransport(
+        LimitedTransport(network, limiter)
+    )
+    if snapshot is not None:
+        transport = SnapshotTransport(transport, snapshot)
+    return httpx.AsyncClient(
+        base_url=base_url or os.getenv("TDX_BASE_URL", DEFAULT_BASE_URL),
+        auth=auth,
+        transport=transport,
+        timeout=_env_float("TDX_TIMEOUT", DEFAULT_TIMEOUT),
+    )
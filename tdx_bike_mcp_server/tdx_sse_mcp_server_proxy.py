@@ -1,14 +1,42 @@
-from fastmcp import FastMCP, Client
+import json
+import os
+import sys
+
 from fastmcp.client.transports import PythonStdioTransport
+from fastmcp.server.proxy import FastMCPProxy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# 建立一個客戶端連接到原始的 STDIO 伺服器
-proxy_client = Client(
-    transport=PythonStdioTransport(
+from mcp_client_pool import PooledProxyClient, ToolResultCache  # noqa: E402
+from mcp_worker_pool import StdioWorkerPool  # noqa: E402
+
+# 維持一組預先啟動的 STDIO 伺服器子行程，SSE 客戶端的請求分散到各行程處理
+workers = StdioWorkerPool(
+    lambda: PythonStdioTransport(
         "./tdx_bike_mcp_server/tdx_bike_openapi_to_mcp_server.py"
     ),
+    min_workers=int(os.getenv("TDX_MIN_WORKERS", "2")),
+    max_workers=int(os.getenv("TDX_MAX_WORKERS", "0")) or None,
 )
 
-proxy = FastMCP.as_proxy(proxy_client, name="TDX Bike MCP Server")
+# TDX 工具都是唯讀查詢：相同參數的並發呼叫合併為一次，結果依工具名稱快取一段時間。
+# 即時車位本身每分鐘才更新，較短的 TTL 不會讓結果明顯落後
+DEFAULT_TOOL_TTLS = {
+    "find_nearest_stations": 10,
+    "Availability": 15,
+    "Station": 300,
+    "Shape": 3600,
+}
+
+result_cache = ToolResultCache(
+    json.loads(os.getenv("TDX_PROXY_TOOL_TTLS") or "null") or DEFAULT_TOOL_TTLS,
+    max_size=int(os.getenv("TDX_PROXY_CACHE_SIZE", "1024")),
+)
+
+proxy = FastMCPProxy(
+    client=PooledProxyClient(workers, result_cache=result_cache),
+    name="TDX Bike MCP Server",
+)
 
 if __name__ == "__main__":
     proxy.run(transport="sse", port=8002, host="0.0.0.0")
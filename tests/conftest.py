@@ -0,0 +1,12 @@
+import os
+import sys
+
+# 與各腳本相同，將專案根目錄、TDX 伺服器目錄與基準測試目錄加入 sys.path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (
+    ROOT,
+    os.path.join(ROOT, "tdx_bike_mcp_server"),
+    os.path.join(ROOT, "benchmarks"),
+):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+
+from availability_snapshot import (
+    AvailabilitySnapshot,
+    SharedSnapshotStore,
+    SnapshotTransport,
+)
+
+
+def record(uid, updated, rent=1):
+    return {"StationUID": uid, "SrcUpdateTime": updated, "AvailableRentBikes": rent}
+
+
+def test_apply_notifies_only_changes():
+    snapshot = AvailabilitySnapshot()
+    events = []
+    snapshot.subscribe(
+        lambda city, changed, removed: events.append((city, changed, removed))
+    )
+
+    first = [record("A", "t1"), record("B", "t1")]
+    assert snapshot.apply("Taipei", first) == 2
+    assert snapshot.apply("Taipei", first) == 0
+
+    updated = record("A", "t2", rent=5)
+    assert snapshot.apply("Taipei", [updated]) == 2
+
+    assert events == [
+        ("Taipei", first, []),
+        ("Taipei", [updated], ["B"]),
+    ]
+    current = snapshot.get("Taipei")
+    assert current.version == 2
+    assert list(current.records) == ["A"]
+    assert snapshot.stats()["unchanged_fetches"] == 1
+
+
+def test_shared_store_single_leader_and_change_detection(tmp_path):
+    leader = SharedSnapshotStore(str(tmp_path))
+    follower = SharedSnapshotStore(str(tmp_path))
+    assert leader.is_leader()
+    assert not follower.is_leader()
+
+    assert follower.read("availability.Taipei.json") is None
+    leader.write("availability.Taipei.json", b"[1]")
+    assert follower.read("availability.Taipei.json") == b"[1]"
+    # 沒有改變時不重複讀取
+    assert follower.read("availability.Taipei.json") is None
+    leader.write("availability.Taipei.json", b"[1,2]")
+    assert follower.read("availability.Taipei.json") == b"[1,2]"
+
+
+def test_snapshot_transport_serves_loaded_cities():
+    snapshot = AvailabilitySnapshot()
+    snapshot.apply("Taipei", [record("A", "t1"), record("B", "t1"), record("C", "t1")])
+    upstream = []
+
+    def handler(request):
+        upstream.append(request.url.path)
+        return httpx.Response(200, json=[])
+
+    transport = SnapshotTransport(httpx.MockTransport(handler), snapshot)
+
+    async def main():
+        async with httpx.AsyncClient(
+            base_url="https://tdx.test", transport=transport
+        ) as client:
+            path = "/v2/Bike/Availability/City/Taipei"
+            page = await client.get(path, params={"$top": 1, "$skip": 1})
+            full = await client.get(path, params={"$format": "JSON"})
+            # 快照無法處理的參數、未載入的縣市與 no-cache 請求送往上游
+            await client.get(path, params={"$filter": "AvailableRentBikes gt 0"})
+            await client.get("/v2/Bike/Availability/City/Tainan")
+            await client.get(path, headers={"Cache-Control": "no-cache"})
+            return page.json(), full.json()
+
+    page, full = asyncio.run(main())
+    assert [r["StationUID"] for r in page] == ["B"]
+    assert [r["StationUID"] for r in full] == ["A", "B", "C"]
+    assert transport.served == 2
+    assert len(upstream) == 3
@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+
+from stdio.framing import FrameTooLargeError, LineFramer, encode_frame, iter_frames
+
+
+def test_frame_split_across_chunks():
+    framer = LineFramer()
+    assert framer.feed(b'{"id":') == []
+    assert framer.pending == 6
+    assert framer.feed(b'1}\n{"id":2') == [b'{"id":1}']
+    assert framer.feed(b"}\n") == [b'{"id":2}']
+    assert framer.pending == 0
+
+
+def test_multiple_frames_in_one_chunk():
+    framer = LineFramer()
+    assert framer.feed(b"a\nb\nc\n") == [b"a", b"b", b"c"]
+
+
+def test_crlf_and_blank_lines():
+    framer = LineFramer()
+    assert framer.feed(b"a\r\n\r\n\nb\r") == [b"a"]
+    # \r 與 \n 分在兩次讀取
+    assert framer.feed(b"\n") == [b"b"]
+
+
+def test_byte_at_a_time_matches_single_feed():
+    data = b'{"x":1}\r\n{"y":"\xe4\xb8\xad"}\n\n{"z":3}\n'
+    framer = LineFramer()
+    frames = []
+    for i in range(len(data)):
+        frames.extend(framer.feed(data[i : i + 1]))
+    assert frames == LineFramer().feed(data)
+    assert [json.loads(f) for f in frames] == [{"x": 1}, {"y": "中"}, {"z": 3}]
+
+
+def test_frame_too_large():
+    framer = LineFramer(max_frame_size=8)
+    assert framer.feed(b"12345678\n") == [b"12345678"]
+    with pytest.raises(FrameTooLargeError):
+        framer.feed(b"123456789")
+
+
+def test_iter_frames_and_encode_frame():
+    messages = [{"jsonrpc": "2.0", "id": i, "result": "中文"} for i in range(3)]
+    stream = io.BytesIO(b"".join(encode_frame(m) for m in messages))
+    frames = list(iter_frames(stream, chunk_size=7))
+    assert [json.loads(f) for f in frames] == messages
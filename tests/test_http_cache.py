@@ -0,0 +1,154 @@
+import asyncio
+import gzip
+import re
+import zlib
+
+import httpx
+
+from http_cache import CachingTransport
+
+
+class Upstream:
+    """以 ETag 回應條件式請求的上游替身"""
+
+    def __init__(self, body=b'[{"StationUID": "TPE1"}]', headers=None):
+        self.body = body
+        self.headers = headers or {}
+        self.requests = []
+
+    @property
+    def etag(self):
+        return f'"{zlib.crc32(self.body):08x}"'
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        # 以 stream 傳回尚未讀取的內容，與真實的網路傳輸層相同
+        return httpx.Response(
+            200,
+            headers={"ETag": self.etag, **self.headers},
+            stream=httpx.ByteStream(self.body),
+        )
+
+
+def fetch_all(transport, *requests):
+    """依序發送 (路徑, 標頭) 請求並返回回應內容"""
+
+    async def main():
+        async with httpx.AsyncClient(
+            base_url="https://tdx.test", transport=transport
+        ) as client:
+            bodies = []
+            for path, headers in requests:
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                bodies.append(response.content)
+            return bodies
+
+    return asyncio.run(main())
+
+
+def make_transport(upstream, ttl, **kwargs):
+    return CachingTransport(
+        httpx.MockTransport(upstream),
+        ttl_rules=[(re.compile(r"/Bike/"), ttl)],
+        **kwargs,
+    )
+
+
+def test_fresh_entry_is_served_without_upstream_call():
+    upstream = Upstream()
+    transport = make_transport(upstream, ttl=60)
+    bodies = fetch_all(
+        transport,
+        ("/Bike/Station/Taipei?$top=1&$format=JSON", {}),
+        # 參數順序不同的相同查詢共用條目
+        ("/Bike/Station/Taipei?$format=JSON&$top=1", {}),
+    )
+    assert bodies[0] == bodies[1] == upstream.body
+    assert len(upstream.requests) == 1
+    assert transport.stats()["hits"] == 1
+
+
+def test_expired_entry_is_revalidated_with_etag():
+    upstream = Upstream()
+    transport = make_transport(upstream, ttl=0)
+    bodies = fetch_all(
+        transport, ("/Bike/Station/Taipei", {}), ("/Bike/Station/Taipei", {})
+    )
+    assert bodies == [upstream.body] * 2
+    assert "If-None-Match" not in upstream.requests[0].headers
+    assert upstream.requests[1].headers["If-None-Match"] == upstream.etag
+    stats = transport.stats()
+    assert stats["revalidations"] == stats["not_modified"] == 1
+
+
+def test_changed_resource_replaces_entry():
+    upstream = Upstream()
+    transport = make_transport(upstream, ttl=0)
+    fetch_all(transport, ("/Bike/Station/Taipei", {}))
+    upstream.body = b'[{"StationUID": "TPE2"}]'
+    bodies = fetch_all(
+        transport, ("/Bike/Station/Taipei", {}), ("/Bike/Station/Taipei", {})
+    )
+    assert bodies == [upstream.body] * 2
+    assert transport.stats()["not_modified"] == 1
+
+
+def test_no_cache_request_revalidates_fresh_entry():
+    upstream = Upstream()
+    transport = make_transport(upstream, ttl=60)
+    fetch_all(
+        transport,
+        ("/Bike/Station/Taipei", {}),
+        ("/Bike/Station/Taipei", {"Cache-Control": "no-cache"}),
+    )
+    assert len(upstream.requests) == 2
+    assert transport.stats()["not_modified"] == 1
+
+
+def test_compressed_body_is_cached_raw_and_decoded_per_response():
+    body = b'[{"StationUID": "TPE1"}]' * 20
+    upstream = Upstream(body=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+    transport = make_transport(upstream, ttl=0)
+    bodies = fetch_all(
+        transport, ("/Bike/Station/Taipei", {}), ("/Bike/Station/Taipei", {})
+    )
+    assert bodies == [body, body]
+
+
+def test_least_recently_used_entry_is_evicted():
+    upstream = Upstream(body=b"x" * 100)
+    transport = make_transport(upstream, ttl=60, max_bytes=300, max_entry_bytes=300)
+    fetch_all(
+        transport,
+        ("/Bike/Station/Taipei", {}),
+        ("/Bike/Station/Tainan", {}),
+        ("/Bike/Station/Taipei", {}),
+        ("/Bike/Station/Taichung", {}),
+    )
+    stats = transport.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 300
+    # Tainan 最久未使用而被淘汰，Taipei 仍在快取中
+    fetch_all(transport, ("/Bike/Station/Taipei", {}), ("/Bike/Station/Tainan", {}))
+    assert [r.url.path for r in upstream.requests].count("/Bike/Station/Tainan") == 2
+    assert [r.url.path for r in upstream.requests].count("/Bike/Station/Taipei") == 1
+
+
+def test_errors_and_other_methods_are_not_cached():
+    def upstream(request):
+        return httpx.Response(503 if request.method == "GET" else 201)
+
+    transport = make_transport(upstream, ttl=60)
+
+    async def main():
+        async with httpx.AsyncClient(
+            base_url="https://tdx.test", transport=transport
+        ) as client:
+            await client.get("/Bike/Station/Taipei")
+            await client.post("/Bike/Station/Taipei")
+
+    asyncio.run(main())
+    assert transport.stats()["size"] == 0
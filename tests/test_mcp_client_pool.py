@@ -0,0 +1,211 @@
+import asyncio
+
+import mcp.types
+import pytest
+from fastmcp import FastMCP
+from fastmcp.client.transports import FastMCPTransport
+
+from mcp_client_pool import MCPSessionPool, ToolResultCache
+
+
+def make_server():
+    server = FastMCP("test")
+    server.calls = 0
+
+    @server.tool
+    async def echo(text: str) -> str:
+        server.calls += 1
+        await asyncio.sleep(0.05)
+        return text
+
+    return server
+
+
+def tools_changed():
+    return mcp.types.ServerNotification(
+        mcp.types.ToolListChangedNotification(method="notifications/tools/list_changed")
+    )
+
+
+def test_concurrent_calls_spread_across_sessions():
+    server = make_server()
+
+    async def main():
+        async with MCPSessionPool(lambda: FastMCPTransport(server), size=3) as pool:
+            results = await asyncio.gather(
+                *(pool.call_tool("echo", {"text": str(i)}) for i in range(6))
+            )
+            return results, pool.stats()
+
+    results, stats = asyncio.run(main())
+    assert [r[0].text for r in results] == [str(i) for i in range(6)]
+    assert [s["calls"] for s in stats["sessions"]] == [2, 2, 2]
+    assert all(s["in_flight"] == 0 for s in stats["sessions"])
+
+
+def test_list_tools_cached_until_list_changed():
+    server = make_server()
+
+    async def main():
+        async with MCPSessionPool(lambda: FastMCPTransport(server), size=2) as pool:
+            first = await asyncio.gather(*(pool.list_tools() for _ in range(5)))
+            coalesced = pool._list_flight.coalesced
+            await pool.list_tools()
+            hits = pool.list_cache_hits
+
+            @server.tool
+            def added() -> str:
+                return "new"
+
+            await pool._on_message(tools_changed())
+            after = await pool.list_tools()
+            return first, coalesced, hits, after
+
+    first, coalesced, hits, after = asyncio.run(main())
+    assert all([t.name for t in tools] == ["echo"] for tools in first)
+    # 並發的未命中共用同一次往返，之後由快取回應
+    assert coalesced == 4
+    assert hits == 1
+    assert sorted(t.name for t in after) == ["added", "echo"]
+
+
+def test_stale_list_is_not_cached_after_notification():
+    server = make_server()
+
+    async def main():
+        async with MCPSessionPool(lambda: FastMCPTransport(server), size=1) as pool:
+            pending = asyncio.create_task(pool.list_tools())
+            await asyncio.sleep(0)
+            await pool._on_message(tools_changed())
+            await pending
+            return pool.stats()["cached_lists"]
+
+    assert asyncio.run(main()) == []
+
+
+def test_closed_session_is_reconnected():
+    server = make_server()
+
+    async def main():
+        async with MCPSessionPool(lambda: FastMCPTransport(server), size=1) as pool:
+            await pool._sessions[0].client.close()
+            result = await pool.call_tool("echo", {"text": "again"})
+            return result, pool.stats()
+
+    result, stats = asyncio.run(main())
+    assert result[0].text == "again"
+    assert stats["reconnects"] == 1
+    assert stats["sessions"][0]["connects"] == 2
+
+
+def test_start_fails_when_no_session_connects():
+    def factory():
+        raise ConnectionError("refused")
+
+    async def main():
+        async with MCPSessionPool(factory, size=2):
+            pass
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main())
+
+
+class Upstream:
+    """記錄呼叫次數的工具替身"""
+
+    def __init__(self, error=False, delay=0.02):
+        self.calls = 0
+        self.error = error
+        self.delay = delay
+
+    def fetch(self, text):
+        async def fetch():
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return mcp.types.CallToolResult(
+                content=[mcp.types.TextContent(type="text", text=text)],
+                isError=self.error,
+            )
+
+        return fetch
+
+
+def call_all(cache, upstream, calls):
+    async def main():
+        return await asyncio.gather(
+            *(
+                cache.call(name, {"text": text}, upstream.fetch(text))
+                for name, text in calls
+            )
+        )
+
+    return asyncio.run(main())
+
+
+def test_result_cache_coalesces_and_caches_within_ttl():
+    cache = ToolResultCache({r"^Bike_Station": 60})
+    upstream = Upstream()
+    results = call_all(cache, upstream, [("Bike_Station_City", "a")] * 5)
+    assert [r.content[0].text for r in results] == ["a"] * 5
+    assert upstream.calls == 1
+    assert cache.stats()["coalesced"] == 4
+
+    call_all(cache, upstream, [("Bike_Station_City", "a")])
+    assert upstream.calls == 1
+    assert cache.stats()["hits"] == 1
+    # 參數不同的呼叫各自轉送
+    call_all(cache, upstream, [("Bike_Station_City", "b")])
+    assert upstream.calls == 2
+
+
+def test_result_cache_expires_entries(monkeypatch):
+    import mcp_client_pool
+
+    now = [1000.0]
+    monkeypatch.setattr(mcp_client_pool.time, "monotonic", lambda: now[0])
+    cache = ToolResultCache({"Station": 10})
+    upstream = Upstream(delay=0)
+    call_all(cache, upstream, [("Station", "a")])
+    now[0] += 11
+    call_all(cache, upstream, [("Station", "a")])
+    assert upstream.calls == 2
+
+
+def test_error_results_are_not_cached():
+    cache = ToolResultCache({"Station": 60})
+    upstream = Upstream(error=True)
+    call_all(cache, upstream, [("Station", "a")])
+    call_all(cache, upstream, [("Station", "a")])
+    assert upstream.calls == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_zero_ttl_only_coalesces():
+    cache = ToolResultCache({"Availability": 0})
+    upstream = Upstream()
+    call_all(cache, upstream, [("Availability", "a")] * 3)
+    assert upstream.calls == 1
+    call_all(cache, upstream, [("Availability", "a")])
+    assert upstream.calls == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_unmatched_tools_pass_through():
+    cache = ToolResultCache({"Station": 60})
+    upstream = Upstream()
+    call_all(cache, upstream, [("create_order", "a")] * 3)
+    assert upstream.calls == 3
+    assert cache.stats()["misses"] == 0
+
+
+def test_least_recently_used_result_is_evicted():
+    cache = ToolResultCache({"Station": 60}, max_size=2)
+    upstream = Upstream(delay=0)
+    for text in ("a", "b", "a", "c"):
+        call_all(cache, upstream, [("Station", text)])
+    assert cache.stats()["evictions"] == 1
+    assert upstream.calls == 3
+    # b 最久未使用而被淘汰
+    call_all(cache, upstream, [("Station", "a")])
+    call_all(cache, upstream, [("Station", "b")])
+    assert upstream.calls == 4
@@ -0,0 +1,67 @@
+import random
+from datetime import timedelta, timezone
+
+import pytest
+
+from bench_forecast_processing import make_current, make_forecast
+from models import CompactWeatherEntry
+from weather_cache import GeocodeCache
+from weather_service import WeatherService
+
+TZ = timezone(timedelta(hours=8))
+
+
+@pytest.fixture
+def service():
+    service = WeatherService("key", geocode_cache=GeocodeCache(":memory:"))
+    yield service
+    service.close()
+
+
+def without_time(entry):
+    return {k: v for k, v in entry.items() if k != "time"}
+
+
+def test_compact_matches_model_dump(service):
+    rng = random.Random(7)
+    current = make_current(rng)
+    forecast = make_forecast(rng)
+    # OpenWeatherMap 以整數表示整數值
+    current["main"]["temp"] = 23
+    forecast["list"][0]["main"]["temp"] = 18
+    forecast["list"][1]["wind"]["speed"] = 3
+
+    expected = service._build_forecast(
+        service._format_current_weather(current, TZ), forecast, TZ
+    ).model_dump()
+    actual = service._build_compact_forecast(current, forecast, TZ).to_dict()
+
+    assert without_time(actual["today"][0]) == without_time(expected["today"][0])
+    assert actual["today"][1:] == expected["today"][1:]
+    assert actual["tomorrow"] == expected["tomorrow"]
+    assert actual["today"][0]["temperature"] == "23 °C"
+
+
+def test_integer_valued_float_prints_without_decimal():
+    entry = CompactWeatherEntry(
+        timestamp=0,
+        tz=TZ,
+        temperature=23.0,
+        feels_like=22.5,
+        temp_min=20.0,
+        temp_max=25.25,
+        weather_condition="clear sky",
+        humidity=60,
+        wind_speed=3.0,
+        wind_direction=90,
+        rain=None,
+        rain_unit="mm/h",
+        clouds=0,
+    )
+    result = entry.to_dict()
+    # 與 model_dump 對上游 23.0 的輸出（"23.0 °C"）不同，見 _format_number
+    assert result["temperature"] == "23 °C"
+    assert result["feels_like"] == "22.5 °C"
+    assert result["temp_max"] == "25.25 °C"
+    assert result["wind"]["speed"] == "3 m/s"
+    assert result["rain"] == "No rain"
@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastmcp.utilities.openapi import parse_openapi_to_http_routes
+
+from odata import ODataTool
+
+STATIONS = [
+    {"StationUID": f"TPE{i}", "StationName": {"Zh_tw": f"站{i}"}, "BikesCapacity": i}
+    for i in range(10)
+]
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "test", "version": "1"},
+    "paths": {
+        "/v2/Bike/Station/City/{City}": {
+            "get": {
+                "operationId": "Station",
+                "parameters": [
+                    {
+                        "name": "City",
+                        "in": "path",
+                        "required": True,
+                        "schema": {"type": "string"},
+                    }
+                ],
+                "responses": {"200": {"description": "OK"}},
+            }
+        }
+    },
+}
+
+
+class Upstream:
+    """可設定忽略哪些 OData 參數的 TDX 替身"""
+
+    def __init__(self, honours=("$top", "$skip", "$select"), wrap=None):
+        self.honours = set(honours)
+        self.wrap = wrap
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        params = request.url.params
+        records = STATIONS
+        if "$skip" in self.honours and "$skip" in params:
+            records = records[int(params["$skip"]) :]
+        if "$top" in self.honours and "$top" in params:
+            records = records[: int(params["$top"])]
+        if "$select" in self.honours and "$select" in params:
+            fields = params["$select"].split(",")
+            records = [{k: r[k] for k in fields if k in r} for r in records]
+        data = (
+            records if self.wrap is None else {"UpdateTime": "now", self.wrap: records}
+        )
+        return httpx.Response(200, json=data)
+
+
+def make_tool(upstream):
+    (route,) = parse_openapi_to_http_routes(SPEC)
+    client = httpx.AsyncClient(
+        base_url="https://tdx.test", transport=httpx.MockTransport(upstream)
+    )
+    return ODataTool(
+        client=client,
+        route=route,
+        name="Station",
+        description="站點",
+        parameters={
+            "type": "object",
+            "properties": {"City": {"type": "string"}},
+            "required": ["City"],
+        },
+    )
+
+
+def fetch_pages(tool, *arguments):
+    async def main():
+        pages = []
+        for args in arguments:
+            content = await tool.run({"City": "Taipei", **args})
+            pages.append(json.loads(content[0].text))
+        return pages
+
+    return asyncio.run(main())
+
+
+def uids(page):
+    return [record["StationUID"] for record in page["items"]]
+
+
+def test_odata_parameters_are_added():
+    tool = make_tool(Upstream())
+    assert {"$select", "$filter", "$orderby", "$top", "$skip"} <= set(
+        tool.parameters["properties"]
+    )
+
+
+@pytest.mark.parametrize(
+    "honours",
+    [
+        ("$top", "$skip", "$select"),
+        ("$top",),
+        ("$skip",),
+        (),
+    ],
+)
+def test_pages_are_correct_whatever_the_upstream_honours(honours):
+    upstream = Upstream(honours=honours)
+    first, second, last = fetch_pages(
+        make_tool(upstream),
+        {"$top": 4},
+        {"$top": 4, "$skip": 4},
+        {"$top": 4, "$skip": 8},
+    )
+    assert uids(first) == ["TPE0", "TPE1", "TPE2", "TPE3"]
+    assert uids(second) == ["TPE4", "TPE5", "TPE6", "TPE7"]
+    assert uids(last) == ["TPE8", "TPE9"]
+    assert (first["next_skip"], second["next_skip"], last["next_skip"]) == (4, 8, None)
+
+
+def test_skip_support_is_probed_once():
+    upstream = Upstream(honours=("$top",))
+    tool = make_tool(upstream)
+    fetch_pages(tool, {"$top": 2, "$skip": 2})
+    probed = len(upstream.requests)
+    fetch_pages(tool, {"$top": 2, "$skip": 4}, {"$top": 2, "$skip": 6})
+    assert len(upstream.requests) == probed + 2
+    # 已知上游忽略 $skip，之後從頭取到本頁結尾
+    last = upstream.requests[-1].url.params
+    assert "$skip" not in last
+    assert last["$top"] == "9"
+
+
+def test_honoured_skip_is_sent_upstream():
+    upstream = Upstream()
+    fetch_pages(make_tool(upstream), {"$top": 3, "$skip": 3})
+    params = upstream.requests[0].url.params
+    assert (params["$top"], params["$skip"]) == ("4", "3")
+
+
+def test_select_is_projected_when_upstream_ignores_it():
+    upstream = Upstream(honours=("$top", "$skip"), wrap="BikeStations")
+    (page,) = fetch_pages(
+        make_tool(upstream), {"$top": 2, "$select": "StationUID, BikesCapacity"}
+    )
+    assert page["items"] == [
+        {"StationUID": "TPE0", "BikesCapacity": 0},
+        {"StationUID": "TPE1", "BikesCapacity": 1},
+    ]
+    # 包裝物件的其他欄位保留在分頁結果中
+    assert page["UpdateTime"] == "now"
+
+
+def test_default_and_maximum_page_size(monkeypatch):
+    monkeypatch.setenv("TDX_DEFAULT_TOP", "3")
+    monkeypatch.setenv("TDX_MAX_TOP", "5")
+    upstream = Upstream()
+    default, capped = fetch_pages(make_tool(upstream), {}, {"$top": 100})
+    assert default["count"] == 3
+    assert capped["count"] == 5
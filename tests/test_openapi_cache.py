@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import httpx
+import mcp.types
+from fastmcp import Client, FastMCP
+from fastmcp.server.openapi import MCPType, OpenAPITool, RouteMap
+
+from openapi_cache import OpenAPIToolCache, ToolListNotifier, register_tools
+
+
+def make_spec(*operations):
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "test", "version": "1"},
+        "paths": {
+            f"/v2/{operation}": {
+                "get": {
+                    "operationId": operation,
+                    "summary": f"取得 {operation}",
+                    "parameters": [
+                        {"name": "$top", "in": "query", "schema": {"type": "integer"}}
+                    ],
+                    "responses": {"200": {"description": "OK"}},
+                }
+            }
+            for operation in operations
+        },
+    }
+
+
+def make_cache(tmp_path, specs):
+    """建立由 specs 依序提供下載內容的快取，並記錄下載次數"""
+    cache = OpenAPIToolCache(
+        "https://example.test/spec",
+        httpx.AsyncClient(),
+        route_maps=[RouteMap(mcp_type=MCPType.TOOL)],
+        cache_dir=str(tmp_path),
+        refresh_interval=0,
+    )
+    cache.downloads = 0
+
+    def download():
+        cache.downloads += 1
+        return json.dumps(specs[min(cache.downloads, len(specs)) - 1]).encode()
+
+    cache._download = download
+    return cache
+
+
+def test_table_is_built_once_and_reused(tmp_path):
+    cache = make_cache(tmp_path, [make_spec("Station", "Availability")])
+    table = cache.load_table()
+    assert sorted(entry["name"] for entry in table) == ["Availability", "Station"]
+    assert cache.downloads == 1
+
+    # 新的行程：直接讀取磁碟上的工具表，不下載規格
+    restarted = make_cache(tmp_path, [])
+    tools = restarted.create_tools(httpx.AsyncClient(), timeout_for=lambda path: 7.0)
+    assert restarted.downloads == 0
+    assert all(isinstance(tool, OpenAPITool) for tool in tools)
+    by_name = {tool.name: tool for tool in tools}
+    assert by_name["Station"]._route.path == "/v2/Station"
+    assert by_name["Station"]._timeout == 7.0
+    entry = next(entry for entry in table if entry["name"] == "Station")
+    assert by_name["Station"].parameters == entry["parameters"]
+
+
+def test_refresh_rebuilds_only_when_spec_changes(tmp_path):
+    cache = make_cache(
+        tmp_path,
+        [make_spec("Station"), make_spec("Station"), make_spec("Station", "Shape")],
+    )
+    cache.load_table()
+    assert not cache.refresh()
+    assert cache.refresh()
+    assert sorted(entry["name"] for entry in cache.load_table()) == ["Shape", "Station"]
+    # 舊版本的規格與工具表已刪除
+    assert len([p for p in tmp_path.iterdir() if ".tools." in p.name]) == 1
+
+
+def test_register_tools_replaces_previous_tools(tmp_path):
+    cache = make_cache(tmp_path, [make_spec("Station", "Availability")])
+    server = FastMCP("test")
+
+    @server.tool()
+    def ping() -> str:
+        return "pong"
+
+    client = httpx.AsyncClient()
+    names = register_tools(server, cache.create_tools(client))
+    table = [entry for entry in cache.load_table() if entry["name"] == "Station"]
+    names = register_tools(server, cache.create_tools(client, table), names)
+
+    async def main():
+        return set(await server.get_tools())
+
+    assert names == {"Station"}
+    # 非 OpenAPI 的工具不受影響
+    assert asyncio.run(main()) == {"ping", "Station"}
+
+
+def test_notifier_sends_list_changed_to_known_sessions():
+    server = FastMCP("test")
+
+    @server.tool()
+    def ping() -> str:
+        return "pong"
+
+    notifier = ToolListNotifier(server)
+    received = asyncio.Event()
+
+    async def handler(message):
+        if isinstance(message, mcp.types.ServerNotification) and isinstance(
+            message.root, mcp.types.ToolListChangedNotification
+        ):
+            received.set()
+
+    async def main():
+        async with Client(server, message_handler=handler) as client:
+            await client.list_tools()
+            sent = await notifier.notify()
+            await asyncio.wait_for(received.wait(), 5)
+        return sent
+
+    assert asyncio.run(main()) == 1
+
+
+def test_fastmcp_internals_are_available():
+    # 本模組依賴的 FastMCP 內部屬性；升級 FastMCP 時此測試先失敗
+    server = FastMCP("test")
+    assert hasattr(server._tool_manager, "_tools")
+    assert hasattr(server._mcp_server, "request_handlers")
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+from rate_limit import (
+    PRIORITY_LIVE,
+    PRIORITY_REFRESH,
+    AsyncRateLimiter,
+    RateLimiter,
+)
+
+
+def test_async_waiters_admitted_by_priority_then_arrival():
+    async def main():
+        limiter = AsyncRateLimiter(rate_per_minute=0, max_in_flight=1)
+        order = []
+        hold = asyncio.Event()
+
+        async def request(name, priority):
+            async with limiter.slot(priority):
+                order.append(name)
+                if name == "holder":
+                    await hold.wait()
+
+        holder = asyncio.create_task(request("holder", PRIORITY_LIVE))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(request("refresh-1", PRIORITY_REFRESH)),
+            asyncio.create_task(request("live-1", PRIORITY_LIVE)),
+            asyncio.create_task(request("refresh-2", PRIORITY_REFRESH)),
+            asyncio.create_task(request("live-2", PRIORITY_LIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 4
+        hold.set()
+        await asyncio.gather(holder, *waiters)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(main())
+    assert order == ["holder", "live-1", "live-2", "refresh-1", "refresh-2"]
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 5
+
+
+def test_async_cancelled_waiter_is_skipped():
+    async def main():
+        limiter = AsyncRateLimiter(rate_per_minute=0, max_in_flight=1)
+        order = []
+        hold = asyncio.Event()
+
+        async def request(name):
+            async with limiter.slot():
+                order.append(name)
+                if name == "holder":
+                    await hold.wait()
+
+        holder = asyncio.create_task(request("holder"))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(request("cancelled"))
+        after = asyncio.create_task(request("after"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        hold.set()
+        await asyncio.gather(holder, after)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(main())
+    assert order == ["holder", "after"]
+    assert stats["in_flight"] == 0
+
+
+def test_sync_waiters_admitted_by_priority():
+    limiter = RateLimiter(rate_per_minute=0, max_in_flight=1)
+    order = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def request(name, priority):
+        with limiter.slot(priority):
+            with lock:
+                order.append(name)
+            if name == "holder":
+                release.wait()
+
+    holder = threading.Thread(target=request, args=("holder", PRIORITY_LIVE))
+    holder.start()
+    while limiter.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+
+    threads = []
+    for name, priority in (
+        ("refresh-1", PRIORITY_REFRESH),
+        ("live-1", PRIORITY_LIVE),
+        ("refresh-2", PRIORITY_REFRESH),
+        ("live-2", PRIORITY_LIVE),
+    ):
+        thread = threading.Thread(target=request, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        # 逐一等待進入佇列，確保同優先權的先後順序
+        while limiter.stats()["queued"] < len(threads):
+            time.sleep(0.001)
+
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join()
+    assert order == ["holder", "live-1", "live-2", "refresh-1", "refresh-2"]
+
+
+def test_token_bucket_limits_burst():
+    async def main():
+        limiter = AsyncRateLimiter(rate_per_minute=600, burst=2, max_in_flight=10)
+        started = time.monotonic()
+        for _ in range(3):
+            async with limiter.slot():
+                pass
+        return time.monotonic() - started
+
+    # 第三個請求需要等待一個令牌補充（0.1 秒）
+    assert asyncio.run(main()) >= 0.08
@@ -0,0 +1,78 @@
+import pytest
+
+import resilience
+from resilience import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_closed_open_half_open_closed(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock[0] += 30
+    # 冷卻結束後只放行一個試探請求
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.stats() == {
+        "state": CircuitBreaker.CLOSED,
+        "consecutive_failures": 0,
+        "times_opened": 1,
+    }
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_release_returns_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    # 試探請求被取消而沒有結果
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_release_without_probe_is_noop(clock):
+    breaker = CircuitBreaker()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+    started = threading.Event()
+
+    def fetch():
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.1)
+        return {"temp": 25}
+
+    results = []
+
+    def worker():
+        results.append(flight.do("taipei", fetch))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == 1
+    assert flight.coalesced == 4
+    assert results == [{"temp": 25}] * 5
+    assert all(result is results[0] for result in results)
+
+
+def test_error_propagates_to_all_waiters_and_key_is_released():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    errors = []
+
+    def worker():
+        try:
+            flight.do("taipei", fail)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=worker)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert errors == ["upstream down", "upstream down"]
+    # 失敗後不保留結果，下一次呼叫重新執行
+    assert flight.do("taipei", lambda: "ok") == "ok"
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.coalesced == 0
+
+
+def test_async_concurrent_calls_share_one_execution():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        return calls, flight.coalesced, results
+
+    calls, coalesced, results = asyncio.run(main())
+    assert calls == 1
+    assert coalesced == 4
+    assert results == [1] * 5
+
+
+def test_async_error_propagates_to_all_waiters():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("k", fail) for _ in range(3)), return_exceptions=True
+        )
+        after = await flight.do("k", lambda: asyncio.sleep(0, result="ok"))
+        return results, after
+
+    results, after = asyncio.run(main())
+    assert [type(r) for r in results] == [RuntimeError] * 3
+    assert after == "ok"
+
+
+def test_async_cancelled_waiter_does_not_cancel_shared_call():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,107 @@
+import random
+import time
+
+import pytest
+
+from station_index import Station, StationIndex, haversine
+
+
+def make_stations(count, seed=0):
+    rng = random.Random(seed)
+    stations = []
+    for i in range(count):
+        station = Station(
+            uid=f"TPE{i}",
+            name=f"站點{i}",
+            city="Taipei",
+            lat=rng.uniform(24.95, 25.15),
+            lon=rng.uniform(121.45, 121.65),
+        )
+        station.rent = rng.randint(0, 10)
+        station.returns = rng.randint(0, 10)
+        stations.append(station)
+    return stations
+
+
+def brute_force(stations, lat, lon, k, min_bikes=0, min_docks=0, max_distance=None):
+    found = []
+    for station in stations:
+        if (station.rent or 0) < min_bikes or (station.returns or 0) < min_docks:
+            continue
+        distance = haversine(lat, lon, station.lat, station.lon)
+        if max_distance is None or distance <= max_distance:
+            found.append((distance, station.uid))
+    found.sort()
+    return found[:k]
+
+
+@pytest.fixture(scope="module")
+def stations():
+    return make_stations(2000)
+
+
+@pytest.fixture(scope="module")
+def index(stations):
+    index = StationIndex(cell_size=500)
+    index.replace_city("Taipei", stations)
+    return index
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"k": 1},
+        {"k": 5},
+        {"k": 20, "min_bikes": 3},
+        {"k": 10, "min_docks": 8},
+        {"k": 50, "max_distance": 800},
+    ],
+)
+def test_nearest_matches_brute_force(stations, index, options):
+    rng = random.Random(1)
+    for _ in range(50):
+        # 包含網格範圍外的查詢點
+        lat = rng.uniform(24.9, 25.2)
+        lon = rng.uniform(121.4, 121.7)
+        expected = brute_force(stations, lat, lon, **options)
+        actual = index.nearest(lat, lon, **options)
+        assert [uid for _, uid in expected] == [s.uid for _, s in actual]
+        assert [d for d, _ in expected] == pytest.approx([d for d, _ in actual])
+
+
+def test_nearest_on_empty_index():
+    assert StationIndex().nearest(25.0, 121.5) == []
+
+
+def test_replace_city_keeps_availability_and_other_cities():
+    index = StationIndex()
+    index.replace_city("Taipei", [Station("TPE1", "A", "Taipei", 25.0, 121.5)])
+    index.replace_city("NewTaipei", [Station("NWT1", "B", "NewTaipei", 25.01, 121.5)])
+    index.update_availability(
+        [{"StationUID": "TPE1", "AvailableRentBikes": 4, "AvailableReturnBikes": 6}]
+    )
+
+    index.replace_city("Taipei", [Station("TPE1", "A2", "Taipei", 25.0, 121.5)])
+
+    assert len(index) == 2
+    station = index.get("TPE1")
+    assert (station.name, station.rent, station.returns) == ("A2", 4, 6)
+    assert index.get("NWT1") is not None
+
+
+@pytest.mark.parametrize(
+    "lat, lon",
+    [(0.0, 0.0), (30.0, 121.55), (25.05, 127.0), (-45.0, -170.0)],
+)
+def test_nearest_far_outside_grid_is_fast(stations, index, lat, lon):
+    started = time.monotonic()
+    actual = index.nearest(lat, lon, k=3)
+    assert time.monotonic() - started < 1
+    expected = brute_force(stations, lat, lon, 3)
+    assert [uid for _, uid in expected] == [s.uid for _, s in actual]
+
+
+def test_far_query_beyond_max_distance_returns_nothing(index):
+    started = time.monotonic()
+    assert index.nearest(0.0, 0.0, k=3, max_distance=1000) == []
+    assert time.monotonic() - started < 0.1
@@ -0,0 +1,84 @@
+import sys
+import textwrap
+import time
+
+import pytest
+
+from stdio.mcp_stdio_client_diy import MCPClient, MCPError
+
+# 依方法名稱回應的最小 JSON-RPC 伺服器；slow 的回應晚於之後的請求
+FAKE_SERVER = textwrap.dedent(
+    """
+    import json, sys, threading, time
+
+    def reply(message, **fields):
+        sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": message["id"], **fields}) + "\\n")
+        sys.stdout.flush()
+
+    def slow(message):
+        time.sleep(message["params"]["seconds"])
+        reply(message, result={"slow": True})
+
+    for line in sys.stdin:
+        message = json.loads(line)
+        method = message.get("method")
+        if method == "slow":
+            threading.Thread(target=slow, args=(message,), daemon=True).start()
+        elif method == "junk":
+            sys.stdout.write('[1, 2]\\n"text"\\nnot json\\n42\\n')
+            reply(message, result={"after": "junk"})
+        elif method == "fail":
+            reply(message, error={"code": -32000, "message": "boom"})
+        elif method == "exit":
+            sys.exit(0)
+        else:
+            reply(message, result=message.get("params"))
+    """
+)
+
+
+@pytest.fixture
+def client(tmp_path):
+    script = tmp_path / "fake_server.py"
+    script.write_text(FAKE_SERVER)
+    client = MCPClient([sys.executable, str(script)], verbose=False)
+    client.start()
+    yield client
+    client.close()
+
+
+def test_responses_are_matched_by_id(client):
+    slow = client.request_async("slow", {"seconds": 0.3})
+    assert client.request("echo", {"n": 1}) == {"n": 1}
+    assert not slow.done()
+    assert slow.result(timeout=5) == {"slow": True}
+    assert client._pending == {}
+
+
+def test_timeout_removes_pending_request(client):
+    with pytest.raises(TimeoutError):
+        client.request("slow", {"seconds": 0.5}, timeout=0.1)
+    assert client._pending == {}
+    # 逾時請求的回應晚到時被忽略，不影響之後的請求
+    time.sleep(0.6)
+    assert client.request("echo", {"n": 2}) == {"n": 2}
+    assert client._pending == {}
+
+
+def test_non_object_messages_are_ignored(client):
+    assert client.request("junk") == {"after": "junk"}
+    assert client.read_thread.is_alive()
+
+
+def test_error_response_raises(client):
+    with pytest.raises(MCPError) as info:
+        client.request("fail")
+    assert info.value.code == -32000
+
+
+def test_server_exit_fails_pending_requests(client):
+    pending = client.request_async("slow", {"seconds": 10})
+    client.notify("exit")
+    with pytest.raises(ConnectionError):
+        pending.result(timeout=5)
+    assert client._pending == {}
@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from rate_limit import AsyncRateLimiter
+from tdx_client import (
+    LimitedTransport,
+    TDXAuth,
+    load_timeout_rules,
+    route_timeout,
+)
+
+
+class FakeTokenAuth(TDXAuth):
+    """不連線到 TDX 的認證：每次更新發出新的權杖"""
+
+    async def _fetch_token(self) -> None:
+        await asyncio.sleep(0.01)
+        self.refreshes += 1
+        self._token = f"token-{self.refreshes}"
+        self._expires_at = time.monotonic() + 3600
+
+
+def make_client(auth, accepted):
+    """建立只接受 accepted() 權杖的 API 客戶端，並記錄收到的權杖"""
+    seen = []
+
+    def handler(request):
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        seen.append(token)
+        return httpx.Response(200 if token == accepted() else 401)
+
+    client = httpx.AsyncClient(
+        base_url="https://tdx.test", auth=auth, transport=httpx.MockTransport(handler)
+    )
+    return client, seen
+
+
+def test_token_is_refreshed_and_request_retried_after_401():
+    auth = FakeTokenAuth(client_id="id", client_secret="secret")
+    accepted = "token-1"
+    client, seen = make_client(auth, lambda: accepted)
+
+    async def main():
+        nonlocal accepted
+        async with client:
+            first = await client.get("/Bike/Station/City/Taipei")
+            # 伺服器端撤銷權杖，下一個請求收到 401 後更新一次並重試
+            accepted = "token-2"
+            second = await client.get("/Bike/Station/City/Taipei")
+            return first.status_code, second.status_code
+
+    assert asyncio.run(main()) == (200, 200)
+    assert seen == ["token-1", "token-1", "token-2"]
+    assert auth.refreshes == 2
+
+
+def test_concurrent_401s_share_one_refresh():
+    auth = FakeTokenAuth(client_id="id", client_secret="secret")
+    accepted = "token-1"
+    client, seen = make_client(auth, lambda: accepted)
+
+    async def main():
+        nonlocal accepted
+        async with client:
+            await client.get("/Bike/Station/City/Taipei")
+            accepted = "token-2"
+            responses = await asyncio.gather(
+                *(client.get("/Bike/Availability/City/Taipei") for _ in range(10))
+            )
+            return [response.status_code for response in responses]
+
+    assert asyncio.run(main()) == [200] * 10
+    assert auth.refreshes == 2
+
+
+def test_token_is_refreshed_before_expiry():
+    auth = FakeTokenAuth(client_id="id", client_secret="secret", refresh_margin=300)
+
+    async def main():
+        first = await auth.token()
+        auth._expires_at = time.monotonic() + 60
+        return first, await auth.token()
+
+    assert asyncio.run(main()) == ("token-1", "token-2")
+
+
+def test_fixed_token_is_not_retried():
+    auth = TDXAuth(access_token="fixed")
+    client, seen = make_client(auth, lambda: "other")
+
+    async def main():
+        async with client:
+            return (await client.get("/Bike/Station/City/Taipei")).status_code
+
+    assert asyncio.run(main()) == 401
+    assert seen == ["fixed"]
+
+
+def test_credentials_are_required():
+    with pytest.raises(ValueError):
+        TDXAuth(client_id="id")
+
+
+def test_limited_transport_caps_requests_in_flight():
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return httpx.Response(200, stream=httpx.ByteStream(b"[]"))
+
+    transport = LimitedTransport(
+        httpx.MockTransport(handler),
+        AsyncRateLimiter(rate_per_minute=0, max_in_flight=3),
+    )
+
+    async def main():
+        async with httpx.AsyncClient(
+            base_url="https://tdx.test", transport=transport
+        ) as client:
+            responses = await asyncio.gather(
+                *(client.get("/Bike/Station/City/Taipei") for _ in range(10))
+            )
+            return [response.json() for response in responses]
+
+    assert asyncio.run(main()) == [[]] * 10
+    assert peak == 3
+
+
+def test_route_timeout_rules():
+    rules = load_timeout_rules('{"/Shape/": 45, "/Station/": 20}')
+    assert route_timeout("/v2/Bike/Shape/City/{City}", rules) == 45.0
+    assert route_timeout("/v2/Bike/Availability/City/{City}", rules, default=5) == 5
+    with pytest.raises(ValueError):
+        load_timeout_rules("[30]")
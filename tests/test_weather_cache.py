@@ -0,0 +1,93 @@
+import pytest
+
+import weather_cache
+from weather_cache import ForecastCache, GeocodeCache
+
+
+def test_geocode_persists_across_instances(tmp_path):
+    path = str(tmp_path / "geocode.sqlite3")
+    cache = GeocodeCache(path)
+    cache.put("Taipei", 25.03, 121.56)
+    cache.close()
+
+    reopened = GeocodeCache(path)
+    assert reopened.get("Taipei") == (25.03, 121.56)
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_geocode_key_ignores_case_and_whitespace():
+    cache = GeocodeCache(":memory:")
+    cache.put("New  York", 40.71, -74.01)
+    assert cache.get(" new york ") == (40.71, -74.01)
+    assert cache.missing(["NEW YORK", "Tokyo"]) == ["Tokyo"]
+
+
+def test_geocode_memory_lru_falls_back_to_sqlite():
+    cache = GeocodeCache(":memory:", max_size=1)
+    cache.put("Taipei", 25.03, 121.56)
+    cache.put("Tokyo", 35.68, 139.69)
+    # 已被記憶體 LRU 淘汰，仍可由 SQLite 取回
+    assert cache.get("Taipei") == (25.03, 121.56)
+    assert len(cache) == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(weather_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_fresh_stale_and_expired(clock):
+    cache = ForecastCache(ttl=60, stale_ttl=240)
+    payload = {"list": []}
+    cache.put(25.03, 121.56, payload)
+
+    clock.now += 59
+    assert cache.get(25.03, 121.56) == (payload, True)
+
+    clock.now += 2
+    assert cache.get(25.03, 121.56) == (payload, False)
+
+    clock.now += 180
+    assert cache.get(25.03, 121.56) == (None, False)
+    # 超過 stale_ttl 的條目仍可供降級使用
+    assert cache.get_last(25.03, 121.56) is payload
+
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 1, 1)
+
+
+def test_put_refreshes_entry(clock):
+    cache = ForecastCache(ttl=60, stale_ttl=240)
+    cache.put(25.03, 121.56, {"v": 1})
+    clock.now += 100
+    assert cache.get(25.03, 121.56) == ({"v": 1}, False)
+    cache.put(25.03, 121.56, {"v": 2})
+    assert cache.get(25.03, 121.56) == ({"v": 2}, True)
+
+
+def test_coordinates_are_rounded(clock):
+    cache = ForecastCache(ttl=60, precision=2)
+    cache.put(25.031, 121.561, {"v": 1})
+    assert cache.get(25.034, 121.559) == ({"v": 1}, True)
+    assert cache.get(25.04, 121.56) == (None, False)
+
+
+def test_lru_eviction(clock):
+    cache = ForecastCache(ttl=60, max_size=2)
+    cache.put(1, 1, {"v": 1})
+    cache.put(2, 2, {"v": 2})
+    cache.get(1, 1)
+    cache.put(3, 3, {"v": 3})
+    assert cache.get_last(2, 2) is None
+    assert cache.get_last(1, 1) == {"v": 1}
+    assert cache.evictions == 1
@@ -0,0 +1,361 @@
+import asyncio
+import importlib
+import logging
+import time
+import traceback
+
+import httpx
+import pytest
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+from fake_owm_server import create_app
+from rate_limit import AsyncRateLimiter
+from resilience import CircuitBreaker, RetryPolicy
+from weather_cache import ForecastCache, GeocodeCache
+from models import WeatherError
+from weather_service import AsyncWeatherService
+
+API_KEY = "SECRETKEY"
+
+
+def make_service(transport: httpx.AsyncBaseTransport, **kwargs) -> AsyncWeatherService:
+    """建立以指定傳輸層取代真實上游的非同步天氣服務"""
+    kwargs.setdefault("rate_limiter", AsyncRateLimiter(rate_per_minute=0))
+    kwargs.setdefault("retry_policy", RetryPolicy(base_delay=0.001, max_delay=0.002))
+    service = AsyncWeatherService(
+        API_KEY,
+        geocode_cache=GeocodeCache(":memory:"),
+        forecast_cache=ForecastCache(ttl=60),
+        **kwargs,
+    )
+    service.client = httpx.AsyncClient(
+        base_url=service.base_url, transport=transport, timeout=5
+    )
+    return service
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """記錄請求並轉交給本機 OpenWeatherMap 替身"""
+
+    def __init__(self, hook=None, **app_options):
+        """
+        Args:
+            hook: 非同步函數 (請求, 序號) -> 回應或 None；返回 None 時轉交給替身
+            app_options: create_app 的參數
+        """
+        app_options.setdefault("latency", 0.0)
+        self.inner = httpx.ASGITransport(app=create_app(**app_options))
+        self.hook = hook
+        self.requests = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.hook is not None:
+            response = await self.hook(request, len(self.requests))
+            if response is not None:
+                return response
+        return await self.inner.handle_async_request(request)
+
+    def count(self, path: str) -> int:
+        return sum(1 for r in self.requests if r.url.path.endswith(path))
+
+
+def test_get_forecast_sends_key_and_units():
+    transport = CountingTransport()
+
+    async def main():
+        async with make_service(transport) as service:
+            return await service.get_forecast("Taipei", 8)
+
+    forecast = asyncio.run(main())
+    assert forecast.today
+    params = transport.requests[0].url.params
+    assert params["appid"] == API_KEY
+    assert params["units"] == "metric"
+    assert {transport.count("/weather"), transport.count("/forecast")} == {1}
+
+
+def test_client_is_shared_across_calls():
+    transport = CountingTransport()
+
+    async def main():
+        async with make_service(transport) as service:
+            client = service.client
+            await asyncio.gather(
+                *(service.get_forecast(city, 8) for city in ("Taipei", "Tokyo"))
+            )
+            await service.get_forecast("Taipei", 8)
+            return client is service.client, client.is_closed
+
+    same_client, closed_inside = asyncio.run(main())
+    assert same_client
+    assert not closed_inside
+
+
+def test_aclose_closes_client():
+    async def main():
+        service = make_service(CountingTransport())
+        await service.aclose()
+        return service.client.is_closed
+
+    assert asyncio.run(main())
+
+
+def test_http2_request_without_h2_falls_back(monkeypatch):
+    import weather_service
+
+    monkeypatch.setattr(weather_service, "_HTTP2_AVAILABLE", False)
+    service = AsyncWeatherService(
+        API_KEY, geocode_cache=GeocodeCache(":memory:"), http2=True
+    )
+    try:
+        assert service.client is not None
+    finally:
+        asyncio.run(service.aclose())
+
+
+def test_stale_forecast_is_served_and_refreshed_in_background():
+    transport = CountingTransport()
+
+    async def main():
+        service = make_service(transport)
+        # TTL 為 0：寫入後立即過期，但仍在 stale_ttl 內
+        service.forecast_cache = ForecastCache(ttl=0, stale_ttl=60)
+        async with service:
+            await service.get_forecast("Taipei", 8)
+            await service.get_forecast("Taipei", 8)
+            assert service.forecast_cache.stale_hits == 1
+            await asyncio.gather(*service._refresh_tasks)
+
+    asyncio.run(main())
+    assert transport.count("/weather") == 2
+    # 第一次查詢 + 背景重新整理，第二次查詢不等待預報
+    assert transport.count("/forecast") == 2
+
+
+def test_concurrent_lookups_for_one_location_share_upstream_calls():
+    transport = CountingTransport(latency=0.05)
+
+    async def main():
+        async with make_service(transport) as service:
+            await asyncio.gather(
+                *(service.get_forecast(name, 8) for name in ("Taipei", " taipei ") * 5)
+            )
+            return service._inflight.coalesced
+
+    assert asyncio.run(main()) == 9
+    assert transport.count("/weather") == 1
+    assert transport.count("/forecast") == 1
+
+
+def test_batch_reports_failed_locations_without_failing_the_rest():
+    transport = CountingTransport()
+
+    async def main():
+        async with make_service(transport) as service:
+            return await service.get_forecasts(["Taipei", "Nowhere", "Taipei"], 8)
+
+    batch = asyncio.run(main())
+    assert list(batch.forecasts) == ["Taipei"]
+    assert list(batch.errors) == ["Nowhere"]
+    assert batch.errors["Nowhere"].error_type == "NETWORK_ERROR"
+    assert API_KEY not in batch.errors["Nowhere"].message
+    assert "appid=***" in batch.errors["Nowhere"].message
+
+
+def test_single_location_error_does_not_leak_key():
+    async def main():
+        async with make_service(CountingTransport()) as service:
+            with pytest.raises(WeatherError) as info:
+                await service.get_forecast("Nowhere", 8)
+            return info.value
+
+    error = asyncio.run(main())
+    assert error.error_type == "NETWORK_ERROR"
+    assert API_KEY not in str(error)
+    # 不串接原始異常，日誌中的 traceback 也不會帶出金鑰
+    assert API_KEY not in "".join(traceback.format_exception(error))
+
+
+def test_tool_error_and_log_do_not_leak_key(monkeypatch):
+    monkeypatch.setenv("OPENWEATHER_API_KEY", API_KEY)
+    monkeypatch.setenv("WEATHER_GEOCODE_CACHE_PATH", ":memory:")
+    server = importlib.import_module("weather_forecast_mcp_server")
+    service = server.weather_service
+    monkeypatch.setattr(service, "api_key", API_KEY)
+    monkeypatch.setattr(
+        service,
+        "client",
+        httpx.AsyncClient(base_url=service.base_url, transport=CountingTransport()),
+    )
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = lambda record: records.append(logging.Formatter().format(record))
+    logger = logging.getLogger("FastMCP")
+    logger.addHandler(handler)
+
+    async def main():
+        async with Client(server.mcp) as client:
+            with pytest.raises(ToolError) as info:
+                await client.call_tool("get_current_weather", {"location": "Nowhere"})
+            return str(info.value)
+
+    try:
+        message = asyncio.run(main())
+    finally:
+        logger.removeHandler(handler)
+    assert "city not found" in message or "404" in message
+    assert API_KEY not in message
+    assert records
+    assert not any(API_KEY in record for record in records)
+
+
+def unavailable(times):
+    """前 times 個請求回應 503"""
+
+    async def hook(request, n):
+        if n <= times:
+            return httpx.Response(503, json={"cod": 503})
+        return None
+
+    return hook
+
+
+def test_transient_errors_are_retried():
+    transport = CountingTransport(hook=unavailable(2))
+
+    async def main():
+        async with make_service(transport) as service:
+            await service.get_forecast("Taipei", 8)
+            return service.retries, service.circuit_breaker.state
+
+    retries, state = asyncio.run(main())
+    assert retries == 2
+    assert state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_are_not_retried():
+    transport = CountingTransport()
+
+    async def main():
+        async with make_service(transport) as service:
+            with pytest.raises(WeatherError):
+                await service.get_forecast("Nowhere", 8)
+            return service.retries
+
+    assert asyncio.run(main()) == 0
+    assert transport.count("/weather") == 1
+
+
+def test_open_circuit_rejects_without_calling_upstream():
+    transport = CountingTransport(hook=unavailable(1000))
+
+    async def main():
+        async with make_service(
+            transport,
+            retry_policy=RetryPolicy(max_attempts=1),
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        ) as service:
+            for _ in range(2):
+                with pytest.raises(WeatherError):
+                    await service.get_forecast("Taipei", 8)
+            sent = len(transport.requests)
+            with pytest.raises(WeatherError) as info:
+                await service.get_forecast("Taipei", 8)
+            return sent, info.value.error_type
+
+    sent, error_type = asyncio.run(main())
+    assert error_type == "CIRCUIT_OPEN"
+    assert len(transport.requests) == sent
+
+
+def test_falls_back_to_cached_forecast_when_upstream_is_down():
+    down = False
+
+    async def hook(request, n):
+        return httpx.Response(503, json={"cod": 503}) if down else None
+
+    transport = CountingTransport(hook=hook)
+
+    async def main():
+        nonlocal down
+        async with make_service(
+            transport,
+            retry_policy=RetryPolicy(max_attempts=1),
+            circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60),
+        ) as service:
+            fresh = await service.get_forecast("Taipei", 8)
+            down = True
+            # 5xx 與之後斷路器開路都改以快取的預報降級回應
+            degraded = await service.get_forecast("Taipei", 8)
+            sent = len(transport.requests)
+            rejected = await service.get_forecast("Taipei", 8)
+            return fresh, degraded, rejected, sent, service
+
+    fresh, degraded, rejected, sent, service = asyncio.run(main())
+    assert service.fallbacks == 2
+    assert service.circuit_breaker.state == CircuitBreaker.OPEN
+    assert len(transport.requests) == sent
+    assert degraded.tomorrow == rejected.tomorrow == fresh.tomorrow
+
+
+def test_slow_request_is_hedged():
+    async def hook(request, n):
+        if n == 1:
+            # 第一個請求卡住，對沖請求應先完成
+            await asyncio.sleep(5)
+        return None
+
+    transport = CountingTransport(hook=hook)
+
+    async def main():
+        async with make_service(transport) as service:
+            for _ in range(service.latency.min_samples):
+                service.latency.record(0.01)
+            started = time.monotonic()
+            await service._request("/weather", {"q": "Taipei"})
+            return time.monotonic() - started, service.hedged_requests
+
+    elapsed, hedged = asyncio.run(main())
+    assert hedged == 1
+    assert elapsed < 1
+    assert len(transport.requests) == 2
+
+
+def test_hedging_can_be_disabled():
+    async def hook(request, n):
+        await asyncio.sleep(0.2)
+        return None
+
+    async def main():
+        async with make_service(CountingTransport(hook=hook), hedge=False) as service:
+            for _ in range(service.latency.min_samples):
+                service.latency.record(0.01)
+            await service._request("/weather", {"q": "Taipei"})
+            return service.hedged_requests
+
+    assert asyncio.run(main()) == 0
+
+
+def test_cancelled_probe_releases_half_open_circuit():
+    async def hook(request, n):
+        await asyncio.sleep(5)
+
+    async def main():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        async with make_service(
+            CountingTransport(hook=hook), circuit_breaker=breaker, hedge=False
+        ) as service:
+            probe = asyncio.create_task(service._request("/weather", {"q": "Taipei"}))
+            await asyncio.sleep(0.05)
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            assert not breaker.allow()
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            return breaker.allow()
+
+    assert asyncio.run(main())
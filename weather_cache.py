@@ -0,0 +1,259 @@
+"""
+天氣預報系統 - 快取
+提供地理坐標與預報數據快取，減少上游請求
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+
+DEFAULT_GEOCODE_CACHE_PATH = "geocode_cache.sqlite3"
+DEFAULT_FORECAST_TTL = 1800.0
+
+
+class GeocodeCache:
+    """
+    地理坐標快取
+
+    城市坐標不會改變，因此以正規化後的地點名稱為鍵，
+    前端使用記憶體 LRU，後端以 SQLite 持久化，重新啟動後仍然有效。
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 1024):
+        """
+        初始化地理坐標快取
+
+        Args:
+            path: SQLite 檔案路徑，如未提供則從環境變量 WEATHER_GEOCODE_CACHE_PATH 獲取，
+                傳入 ":memory:" 則不落地
+            max_size: 記憶體 LRU 的最大條目數
+        """
+        self.path = path or os.getenv(
+            "WEATHER_GEOCODE_CACHE_PATH", DEFAULT_GEOCODE_CACHE_PATH
+        )
+        self.max_size = max_size
+        self._memory: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "location TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def normalize(location: str) -> str:
+        """將地點名稱正規化為快取鍵（忽略大小寫與多餘空白）"""
+        return " ".join(location.split()).casefold()
+
+    def get(self, location: str) -> Optional[tuple[float, float]]:
+        """
+        查詢地點坐標
+
+        Args:
+            location: 地點名稱
+
+        Returns:
+            (緯度, 經度)，未命中時返回 None
+        """
+        key = self.normalize(location)
+        with self._lock:
+            coords = self._memory.get(key)
+            if coords is not None:
+                self._memory.move_to_end(key)
+                return coords
+
+            row = self._db.execute(
+                "SELECT lat, lon FROM geocode WHERE location = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            coords = (row[0], row[1])
+            self._remember(key, coords)
+            return coords
+
+    def put(self, location: str, lat: float, lon: float) -> None:
+        """
+        寫入地點坐標
+
+        Args:
+            location: 地點名稱
+            lat: 緯度
+            lon: 經度
+        """
+        key = self.normalize(location)
+        with self._lock:
+            if self._memory.get(key) == (lat, lon):
+                self._memory.move_to_end(key)
+                return
+            self._remember(key, (lat, lon))
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO geocode (location, lat, lon) VALUES (?, ?, ?)",
+                    (key, lat, lon),
+                )
+
+    def missing(self, locations: Iterable[str]) -> list[str]:
+        """返回尚未快取坐標的地點"""
+        return [location for location in locations if self.get(location) is None]
+
+    def _remember(self, key: str, coords: tuple[float, float]) -> None:
+        """寫入記憶體 LRU 並淘汰最久未使用的條目（呼叫端需持有鎖）"""
+        self._memory[key] = coords
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def close(self) -> None:
+        """關閉 SQLite 連線"""
+        with self._lock:
+            self._db.close()
+
+
+class ForecastCache:
+    """
+    預報數據快取
+
+    以四捨五入後的 (緯度, 經度) 為鍵保存 /forecast 原始回應。
+    條目在 TTL 內視為新鮮；超過 TTL 但仍在 stale_ttl 內時照常返回，
+    由呼叫端在背景重新整理（stale-while-revalidate）；超過 stale_ttl 則視為未命中，
+    但條目仍保留至被 LRU 淘汰，供上游不可用時以 get_last 降級使用。
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        max_size: int = 256,
+        precision: int = 2,
+    ):
+        """
+        初始化預報數據快取
+
+        Args:
+            ttl: 新鮮期秒數，如未提供則從環境變量 WEATHER_FORECAST_CACHE_TTL 獲取
+            stale_ttl: 可返回過期數據的最長秒數，預設為 ttl 的 4 倍
+            max_size: 最大條目數，超過時淘汰最久未使用的條目
+            precision: 坐標四捨五入的小數位數
+        """
+        self.ttl = (
+            ttl
+            if ttl is not None
+            else float(os.getenv("WEATHER_FORECAST_CACHE_TTL", DEFAULT_FORECAST_TTL))
+        )
+        self.stale_ttl = stale_ttl if stale_ttl is not None else self.ttl * 4
+        self.max_size = max_size
+        self.precision = precision
+        self._entries: OrderedDict[
+            tuple[float, float], tuple[float, Dict[str, Any]]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, lat: float, lon: float) -> tuple[float, float]:
+        """將坐標四捨五入為快取鍵"""
+        return round(lat, self.precision), round(lon, self.precision)
+
+    def get(self, lat: float, lon: float) -> tuple[Optional[Dict[str, Any]], bool]:
+        """
+        查詢預報數據
+
+        Args:
+            lat: 緯度
+            lon: 經度
+
+        Returns:
+            (預報數據, 是否新鮮)，未命中時返回 (None, False)
+        """
+        key = self.key(lat, lon)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            stored_at, payload = entry
+            age = now - stored_at
+            if age > self.stale_ttl:
+                self.misses += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            if age > self.ttl:
+                self.stale_hits += 1
+                return payload, False
+
+            self.hits += 1
+            return payload, True
+
+    def get_last(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """
+        查詢最後一次寫入的預報數據，不論是否過期，也不計入命中統計
+
+        Args:
+            lat: 緯度
+            lon: 經度
+
+        Returns:
+            預報數據，從未快取時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(self.key(lat, lon))
+        return None if entry is None else entry[1]
+
+    def put(self, lat: float, lon: float, payload: Dict[str, Any]) -> None:
+        """
+        寫入預報數據
+
+        Args:
+            lat: 緯度
+            lon: 經度
+            payload: /forecast 端點的原始回應數據
+        """
+        key = self.key(lat, lon)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_miss(self) -> None:
+        """記錄一次無法以坐標查詢的未命中（例如地點坐標尚未快取）"""
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回快取命中、未命中與淘汰計數"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (
+                    (self.hits + self.stale_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -1,20 +1,32 @@
+import asyncio
 import os
-from typing import Dict, Any
-from weather_service import WeatherService
+from typing import Dict, Any, List
+import fast_json
+import metrics
+from weather_service import AsyncWeatherService
 from dotenv import load_dotenv
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import Response
 
 load_dotenv(".env")
 
-# 建立一個 FastMCP 伺服器實例
-mcp = FastMCP(name="WeatherService")
+# 建立一個 FastMCP 伺服器實例，工具結果以快速 JSON 編碼器序列化
+mcp = FastMCP(name="WeatherService", tool_serializer=fast_json.dumps)
 
-weather_service = WeatherService(os.getenv("OPENWEATHER_API_KEY"))
+# 所有工具呼叫共用同一個非同步服務（與其 HTTP 連線池）
+weather_service = AsyncWeatherService(os.getenv("OPENWEATHER_API_KEY"))
+
+# 支援查詢的城市，啟動時會預先寫入地理坐標快取
+SUPPORTED_LOCATIONS = ["Taipei", "Taichung", "Kaohsiung"]
 
 
 # 定義一個 Tool
 @mcp.tool
-def get_current_weather(location: str, timezone_offset: int = 0) -> Dict[str, Any]:
+@metrics.instrument_tool
+async def get_current_weather(
+    location: str, timezone_offset: int = 0
+) -> Dict[str, Any]:
     """
     獲取指定城市的當前天氣資訊。
 
@@ -25,7 +37,24 @@ def get_current_weather(location: str, timezone_offset: int = 0) -> Dict[str, An
         包含今天和明天天氣預報的字典
     """
     # Call weather forecast function
-    return weather_service.get_forecast(location, timezone_offset)
+    return await weather_service.get_forecast(location, timezone_offset)
+
+
+@mcp.tool
+@metrics.instrument_tool
+async def get_forecasts(
+    locations: List[str], timezone_offset: int = 0
+) -> Dict[str, Any]:
+    """
+    一次獲取多個城市的天氣資訊。
+
+    Parameters:
+        locations: 位置名稱列表，必須是英文，例如 ["Taipei", "Tokyo", "New York"]
+        timezone_offset: 時區偏移量，以小時為單位，例如台北為 8，紐約為 -4。默認值為 0 (UTC 時間)
+    Returns:
+        包含 forecasts（各城市今天和明天的天氣預報）與 errors（查詢失敗的城市及原因）的字典
+    """
+    return await weather_service.get_forecasts(locations, timezone_offset)
 
 
 # 定義一個 Resource
@@ -36,7 +65,24 @@ def get_current_weather(location: str, timezone_offset: int = 0) -> Dict[str, An
 )
 def get_supported_locations() -> list[str]:
     """返回支援的城市列表。"""
-    return ["Taipei", "Taichung", "Kaohsiung"]
+    return SUPPORTED_LOCATIONS
+
+
+@mcp.resource(
+    uri="resource://cache-stats",
+    name="CacheStats",
+    description="天氣服務快取命中率、請求合併與上游限流狀態，用於調整快取大小與配額。",
+)
+def get_cache_stats() -> Dict[str, Any]:
+    """返回天氣服務快取、請求合併與限流器的統計資訊。"""
+    return weather_service.cache_stats()
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def get_metrics(request: Request) -> Response:
+    """以 Prometheus 文字格式輸出各階段耗時、上游狀態碼、快取與進行中請求等指標。"""
+    metrics.record_cache_stats(weather_service.cache_stats())
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # 定義一個 Prompt
@@ -56,8 +102,21 @@ def weather_assistant_role():
     # return content
 
 
+async def preseed_supported_locations() -> list[str]:
+    """預先查詢支援城市的地理坐標並寫入快取。"""
+    # 使用獨立的服務實例，避免主服務的連線池綁定到這個暫時的事件迴圈
+    async with AsyncWeatherService(
+        weather_service.api_key, geocode_cache=weather_service.geocode_cache
+    ) as seeder:
+        return await seeder.preseed_locations(SUPPORTED_LOCATIONS)
+
+
 # 5. 運行伺服器
 if __name__ == "__main__":
+    seeded = asyncio.run(preseed_supported_locations())
+    if seeded:
+        print(f"已預先快取城市坐標: {', '.join(seeded)}")
     print("啟動天氣 SSE MCP 伺服器於 http://127.0.0.1:8001/sse")
+    print("指標輸出於 http://127.0.0.1:8001/metrics")
     # 將伺服器以 SSE 模式運行
     mcp.run(transport="sse", port=8001)
@@ -3,26 +3,104 @@
 提供完整的天氣預報功能
 """
 
+import abc
+import asyncio
+import importlib.util
+import httpx
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 import os
+import threading
+import time
 
-from models import WeatherForecast, WeatherEntry, WindInfo, WeatherError
+import fast_json
+import forecast_vectorized
+from metrics import UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS, UPSTREAM_SECONDS, traced
+from models import (
+    BatchWeatherForecast,
+    CompactWeatherEntry,
+    CompactWeatherForecast,
+    DailyWeatherSummary,
+    ForecastSeries,
+    ForecastErrorInfo,
+    WeatherForecast,
+    WeatherEntry,
+    WindInfo,
+    WeatherError,
+    redact_api_key,
+)
+from rate_limit import (
+    PRIORITY_LIVE,
+    PRIORITY_REFRESH,
+    AsyncRateLimiter,
+    RateLimiter,
+)
+from resilience import CircuitBreaker, LatencyTracker, RetryPolicy
+from singleflight import AsyncSingleFlight, SingleFlight
+from weather_cache import ForecastCache, GeocodeCache
 
+# 未安裝 httpx[http2]（h2 套件）時退回 HTTP/1.1
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# OpenWeatherMap API 位址，可用環境變量 OPENWEATHER_BASE_URL 覆寫（例如指向本機測試伺服器）
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5"
+
+# 批次查詢時預設同時進行的地點數
+DEFAULT_BATCH_CONCURRENCY = 10
+
+# 上游不可用時改以最後一次快取的數據回應的錯誤類型
+_DEGRADABLE_ERRORS = ("CIRCUIT_OPEN", "RATE_LIMITED")
 
-class WeatherService:
-    """天氣預報服務類"""
 
-    def __init__(self, api_key: Optional[str] = None):
+class _BaseWeatherService(abc.ABC):
+    """同步與非同步天氣服務共用的設定與數據格式化邏輯"""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        geocode_cache: Optional[GeocodeCache],
+        forecast_cache: Optional[ForecastCache],
+        retry_policy: Optional[RetryPolicy],
+        circuit_breaker: Optional[CircuitBreaker],
+        *,
+        rate_limiter: Union[RateLimiter, AsyncRateLimiter],
+        inflight: Union[SingleFlight, AsyncSingleFlight],
+    ):
         """
         初始化天氣服務
 
         Args:
             api_key: OpenWeatherMap API 金鑰，如未提供則從環境變量獲取
+            geocode_cache: 地理坐標快取，如未提供則使用預設的 SQLite 檔案
+            forecast_cache: 預報數據快取，如未提供則使用預設 TTL 建立
+            retry_policy: 上游請求重試策略，如未提供則使用預設值
+            circuit_breaker: 上游斷路器，如未提供則使用預設值
+            rate_limiter: 上游限流器（同步或非同步版本，由子類別決定）
+            inflight: 合併相同地點並發查詢的請求合併器
         """
+        self.rate_limiter = rate_limiter
+        self._inflight = inflight
         self.api_key = api_key or self._get_api_key()
-        self.base_url = "https://api.openweathermap.org/data/2.5"
+        self.base_url = os.getenv("OPENWEATHER_BASE_URL", DEFAULT_BASE_URL)
+        self.geocode_cache = (
+            geocode_cache if geocode_cache is not None else GeocodeCache()
+        )
+        self.forecast_cache = (
+            forecast_cache if forecast_cache is not None else ForecastCache()
+        )
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breaker = (
+            circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        )
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedged_requests = 0
+        self.fallbacks = 0
+        # 正在背景重新整理預報的地點，避免重複排程
+        self._refreshing: set[str] = set()
+        self._refreshing_lock = threading.Lock()
 
     def _get_api_key(self) -> str:
         """從環境變量獲取API金鑰"""
@@ -34,54 +112,196 @@ class WeatherService:
             )
         return api_key
 
-    def _get_coordinates(self, location: str) -> tuple[float, float]:
+    def _location_params(self, location: str) -> Dict[str, Any]:
         """
-        獲取地理坐標
+        產生查詢地點用的參數
+
+        已快取坐標的地點改以經緯度查詢，避免上游再做一次地名解析。
 
         Args:
             location: 地點名稱
 
         Returns:
-            (緯度, 經度)
+            查詢參數
         """
-        geocode_url = f"{self.base_url}/weather"
-        params = {"q": location, "appid": self.api_key, "units": "metric"}
+        coords = self.geocode_cache.get(location)
+        if coords is None:
+            return {"q": location}
+        lat, lon = coords
+        return {"lat": lat, "lon": lon}
 
-        try:
-            response = requests.get(geocode_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+    def _remember_coordinates(self, location: str, data: Dict[str, Any]) -> None:
+        """
+        從 /weather 回應中記錄地點坐標
 
-            return data["coord"]["lat"], data["coord"]["lon"]
+        Args:
+            location: 地點名稱
+            data: /weather 端點的原始回應數據
+        """
+        self.geocode_cache.put(location, data["coord"]["lat"], data["coord"]["lon"])
 
-        except requests.RequestException as e:
-            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR")
-        except KeyError as e:
+    def _lookup_forecast(self, location: str) -> tuple[Optional[Dict[str, Any]], bool]:
+        """
+        從快取查詢地點的預報數據
+
+        Args:
+            location: 地點名稱
+
+        Returns:
+            (預報數據, 是否新鮮)，坐標未知或未命中時返回 (None, False)
+        """
+        coords = self.geocode_cache.get(location)
+        if coords is None:
+            self.forecast_cache.record_miss()
+            return None, False
+        return self.forecast_cache.get(*coords)
+
+    def _store_forecast(self, location: str, forecast_data: Dict[str, Any]) -> None:
+        """
+        將預報數據寫入快取
+
+        Args:
+            location: 地點名稱
+            forecast_data: /forecast 端點的原始回應數據
+        """
+        coords = self.geocode_cache.get(location)
+        if coords is None:
+            coord = forecast_data["city"]["coord"]
+            coords = (coord["lat"], coord["lon"])
+        self.forecast_cache.put(*coords, forecast_data)
+
+    def _collect_batch(
+        self, locations: List[str], results: List[Any]
+    ) -> BatchWeatherForecast:
+        """
+        將各地點的查詢結果整理為批次預報，失敗的地點記錄於 errors
+
+        Args:
+            locations: 地點名稱列表
+            results: 與 locations 對應的預報對象或異常
+
+        Returns:
+            多地點天氣預報對象
+        """
+        forecasts: Dict[str, WeatherForecast] = {}
+        errors: Dict[str, ForecastErrorInfo] = {}
+        for location, result in zip(locations, results):
+            if isinstance(result, WeatherError):
+                errors[location] = ForecastErrorInfo(
+                    error_type=result.error_type, message=result.message
+                )
+            elif isinstance(result, BaseException):
+                errors[location] = ForecastErrorInfo(
+                    error_type="UNEXPECTED_ERROR", message=redact_api_key(str(result))
+                )
+            else:
+                forecasts[location] = result
+        return BatchWeatherForecast(forecasts=forecasts, errors=errors)
+
+    def _check_rate_limited(self, status_code: int) -> None:
+        """上游回應 429 時拋出 RATE_LIMITED 錯誤"""
+        if status_code == 429:
             raise WeatherError(
-                f"API回應數據結構錯誤: 缺少 {str(e)}", "DATA_STRUCTURE_ERROR"
+                "OpenWeatherMap API 呼叫次數已達上限，請稍後再試", "RATE_LIMITED"
             )
 
-    def _get_current_weather(
-        self, lat: float, lon: float, tz: timezone
-    ) -> Dict[str, Any]:
+    def _record_latency(self, path: str, status_code: int, started: float) -> None:
+        """記錄上游回應的狀態碼與延遲"""
+        elapsed = time.monotonic() - started
+        self.latency.record(elapsed)
+        UPSTREAM_REQUESTS.inc(endpoint=path, status=status_code)
+        UPSTREAM_SECONDS.observe(elapsed, endpoint=path)
+
+    def _check_circuit(self) -> None:
+        """斷路器開路時拋出 CIRCUIT_OPEN 錯誤"""
+        if not self.circuit_breaker.allow():
+            raise WeatherError(
+                "OpenWeatherMap 暫時無法連線，已暫停對上游發送請求", "CIRCUIT_OPEN"
+            )
+
+    def _is_degradable(self, error: BaseException) -> bool:
+        """判斷錯誤是否代表上游暫時不可用，可改以快取數據降級回應"""
+        if isinstance(error, WeatherError):
+            return error.error_type in _DEGRADABLE_ERRORS
+        return self._is_retryable(error)
+
+    @abc.abstractmethod
+    def _is_retryable(self, error: BaseException) -> bool:
+        """判斷錯誤是否為暫時性的上游錯誤（逾時、連線錯誤、5xx、429）"""
+
+    def _fallback_weather_data(
+        self, location: str
+    ) -> Optional[tuple[Dict[str, Any], Dict[str, Any]]]:
         """
-        獲取當前天氣
+        以最後一次快取的預報數據作為降級回應
+
+        當前天氣取預報中最接近現在的時段，3 小時降雨量換算為每小時。
 
         Args:
-            lat: 緯度
-            lon: 經度
-            tz: 時區
+            location: 地點名稱
 
         Returns:
-            當前天氣數據
+            (當前天氣數據, 預報數據)，沒有可用的快取時返回 None
         """
-        current_url = f"{self.base_url}/weather"
-        params = {"lat": lat, "lon": lon, "appid": self.api_key, "units": "metric"}
+        coords = self.geocode_cache.get(location)
+        if coords is None:
+            return None
+        forecast_data = self.forecast_cache.get_last(*coords)
+        if not forecast_data or not forecast_data.get("list"):
+            return None
 
-        response = requests.get(current_url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        now = time.time()
+        slot = min(forecast_data["list"], key=lambda entry: abs(entry["dt"] - now))
+        current_data = dict(slot)
+        if "rain" in slot:
+            current_data["rain"] = {"1h": round(slot["rain"].get("3h", 0) / 3, 2)}
+        self.fallbacks += 1
+        return current_data, forecast_data
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回快取、請求合併、限流器與上游容錯的統計資訊"""
+        return {
+            "geocode": {"size": len(self.geocode_cache)},
+            "forecast": self.forecast_cache.stats(),
+            "coalesced_requests": self._inflight.coalesced,
+            "rate_limiter": self.rate_limiter.stats(),
+            "resilience": {
+                "circuit_breaker": self.circuit_breaker.stats(),
+                "retries": self.retries,
+                "hedged_requests": self.hedged_requests,
+                "fallbacks": self.fallbacks,
+                "latency_p95": self.latency.percentile(),
+            },
+        }
+
+    def _claim_refresh(self, location: str) -> bool:
+        """標記地點正在重新整理；已有重新整理進行中時返回 False"""
+        key = GeocodeCache.normalize(location)
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, location: str) -> None:
+        """清除地點的重新整理標記"""
+        with self._refreshing_lock:
+            self._refreshing.discard(GeocodeCache.normalize(location))
+
+    @traced("format")
+    def _format_current_weather(
+        self, data: Dict[str, Any], tz: timezone
+    ) -> Dict[str, Any]:
+        """
+        格式化當前天氣
+
+        Args:
+            data: /weather 端點的原始回應數據
+            tz: 時區
 
+        Returns:
+            格式化的當前天氣條目
+        """
         return {
             "time": datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S"),
             "temperature": f"{data['main']['temp']} °C",
@@ -100,24 +320,6 @@ class WeatherService:
             "clouds": f"{data['clouds']['all']}%",
         }
 
-    def _get_forecast_data(self, lat: float, lon: float) -> Dict[str, Any]:
-        """
-        獲取預報數據
-
-        Args:
-            lat: 緯度
-            lon: 經度
-
-        Returns:
-            預報數據
-        """
-        forecast_url = f"{self.base_url}/forecast"
-        params = {"lat": lat, "lon": lon, "appid": self.api_key, "units": "metric"}
-
-        response = requests.get(forecast_url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-
     def _format_forecast_entry(
         self, entry: Dict[str, Any], dt: datetime, is_3h_forecast: bool = True
     ) -> Dict[str, Any]:
@@ -153,6 +355,387 @@ class WeatherService:
             "clouds": f"{entry['clouds']['all']}%",
         }
 
+    @traced("validate")
+    def _build_forecast(
+        self,
+        current_weather: Dict[str, Any],
+        forecast_data: Dict[str, Any],
+        tz: timezone,
+    ) -> WeatherForecast:
+        """
+        將當前天氣與預報數據整理為今日、明日預報
+
+        Args:
+            current_weather: 格式化後的當前天氣條目
+            forecast_data: /forecast 端點的原始回應數據
+            tz: 時區
+
+        Returns:
+            天氣預報對象
+        """
+        today = datetime.now(tz).date()
+        tomorrow = today + timedelta(days=1)
+
+        today_forecast = [current_weather]
+        tomorrow_forecast = []
+
+        # 處理預報數據
+        for entry in forecast_data["list"]:
+            dt = datetime.fromtimestamp(entry["dt"], tz)
+            formatted_entry = self._format_forecast_entry(entry, dt)
+
+            if dt.date() == today:
+                today_forecast.append(formatted_entry)
+            elif dt.date() == tomorrow:
+                tomorrow_forecast.append(formatted_entry)
+
+        return WeatherForecast(today=today_forecast, tomorrow=tomorrow_forecast)
+
+    def _compact_current_weather(
+        self, current_data: Dict[str, Any], tz: timezone
+    ) -> CompactWeatherEntry:
+        """
+        將當前天氣整理為精簡條目
+
+        Args:
+            current_data: /weather 端點的原始回應數據
+            tz: 時區
+
+        Returns:
+            精簡天氣條目
+        """
+        main = current_data["main"]
+        return CompactWeatherEntry(
+            timestamp=datetime.now(tz).timestamp(),
+            tz=tz,
+            temperature=float(main["temp"]),
+            feels_like=float(main["feels_like"]),
+            temp_min=float(main["temp_min"]),
+            temp_max=float(main["temp_max"]),
+            weather_condition=current_data["weather"][0]["description"],
+            humidity=main["humidity"],
+            wind_speed=float(current_data["wind"]["speed"]),
+            wind_direction=current_data["wind"]["deg"],
+            rain=float(current_data["rain"].get("1h", 0))
+            if "rain" in current_data
+            else None,
+            rain_unit="mm/h",
+            clouds=current_data["clouds"]["all"],
+        )
+
+    @traced("compact_build")
+    def _build_compact_forecast(
+        self,
+        current_data: Dict[str, Any],
+        forecast_data: Dict[str, Any],
+        tz: timezone,
+        vectorized: bool = False,
+    ) -> CompactWeatherForecast:
+        """
+        將當前天氣與預報數據整理為精簡的數值欄位格式
+
+        Args:
+            current_data: /weather 端點的原始回應數據
+            forecast_data: /forecast 端點的原始回應數據
+            tz: 時區
+            vectorized: 是否以 NumPy 向量化處理（需要 numpy）
+
+        Returns:
+            精簡天氣預報對象
+        """
+        current = self._compact_current_weather(current_data, tz)
+        if vectorized:
+            return forecast_vectorized.build_compact_forecast(
+                current, forecast_data, tz
+            )
+
+        today = datetime.fromtimestamp(current.timestamp, tz).date()
+        tomorrow = today + timedelta(days=1)
+        today_series = ForecastSeries(tz)
+        tomorrow_series = ForecastSeries(tz)
+
+        for entry in forecast_data["list"]:
+            dt = datetime.fromtimestamp(entry["dt"], tz)
+            date = dt.date()
+            if date == today:
+                series = today_series
+            elif date == tomorrow:
+                series = tomorrow_series
+            else:
+                continue
+
+            main = entry["main"]
+            series.append(
+                timestamp=float(entry["dt"]),
+                temperature=main["temp"],
+                feels_like=main["feels_like"],
+                temp_min=main["temp_min"],
+                temp_max=main["temp_max"],
+                weather_condition=entry["weather"][0]["description"],
+                humidity=main["humidity"],
+                wind_speed=entry["wind"]["speed"],
+                wind_direction=entry["wind"]["deg"],
+                rain=entry["rain"].get("3h", 0) if "rain" in entry else None,
+                clouds=entry["clouds"]["all"],
+            )
+
+        return CompactWeatherForecast(current, today_series, tomorrow_series)
+
+
+class WeatherService(_BaseWeatherService):
+    """天氣預報服務類"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        geocode_cache: Optional[GeocodeCache] = None,
+        forecast_cache: Optional[ForecastCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        初始化天氣服務
+
+        Args:
+            api_key: OpenWeatherMap API 金鑰，如未提供則從環境變量獲取
+            geocode_cache: 地理坐標快取，如未提供則使用預設的 SQLite 檔案
+            forecast_cache: 預報數據快取，如未提供則使用預設 TTL 建立
+            rate_limiter: 上游限流器，如未提供則依環境變量設定建立
+            retry_policy: 上游請求重試策略，如未提供則使用預設值
+            circuit_breaker: 上游斷路器，如未提供則使用預設值
+        """
+        super().__init__(
+            api_key,
+            geocode_cache,
+            forecast_cache,
+            retry_policy,
+            circuit_breaker,
+            rate_limiter=rate_limiter if rate_limiter is not None else RateLimiter(),
+            # 合併相同地點的並發查詢
+            inflight=SingleFlight(),
+        )
+        # 重用 TCP/TLS 連線，避免每次請求重新握手
+        self.session = requests.Session()
+        # 用於並行發送當前天氣與預報請求
+        self._executor = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="weather-fetch"
+        )
+
+    def _is_retryable(self, error: BaseException) -> bool:
+        """判斷錯誤是否為暫時性的上游錯誤（逾時、連線錯誤、5xx、429）"""
+        if isinstance(error, WeatherError):
+            return error.error_type == "RATE_LIMITED"
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code >= 500
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def _send(self, path: str, params: Dict[str, Any], priority: int) -> Dict[str, Any]:
+        """發送單次 GET 請求並記錄延遲"""
+        with self.rate_limiter.slot(priority):
+            started = time.monotonic()
+            UPSTREAM_IN_FLIGHT.inc()
+            try:
+                response = self.session.get(
+                    f"{self.base_url}{path}",
+                    params={**params, "appid": self.api_key, "units": "metric"},
+                    timeout=10,
+                )
+            except requests.RequestException as e:
+                UPSTREAM_REQUESTS.inc(endpoint=path, status=type(e).__name__)
+                raise
+            finally:
+                UPSTREAM_IN_FLIGHT.dec()
+            self._record_latency(path, response.status_code, started)
+        self._check_rate_limited(response.status_code)
+        response.raise_for_status()
+        return fast_json.loads(response.content)
+
+    def _request(
+        self, path: str, params: Dict[str, Any], priority: int = PRIORITY_LIVE
+    ) -> Dict[str, Any]:
+        """
+        對 OpenWeatherMap 發送 GET 請求，受限流器與斷路器控制
+
+        暫時性錯誤依重試策略以抖動指數退避重試，超出時間預算即放棄。
+
+        Args:
+            path: API 路徑，例如 "/weather"
+            params: 查詢參數（不含 API 金鑰與單位）
+            priority: 排隊優先權，背景重新整理使用 PRIORITY_REFRESH
+
+        Returns:
+            解析後的 JSON 數據
+
+        Raises:
+            WeatherError: 斷路器開路時（CIRCUIT_OPEN）
+        """
+        self._check_circuit()
+        started = time.monotonic()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    data = self._send(path, params, priority)
+                except Exception as e:
+                    if not self._is_retryable(e):
+                        # 上游有回應（例如 404），不算作上游故障
+                        self.circuit_breaker.record_success()
+                        raise
+                    self.circuit_breaker.record_failure()
+                    delay = self.retry_policy.next_delay(
+                        attempt, time.monotonic() - started
+                    )
+                    if delay is None or not self.circuit_breaker.allow():
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    time.sleep(delay)
+                else:
+                    self.circuit_breaker.record_success()
+                    return data
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # 被取消（CancelledError）或中斷時沒有上游結果，歸還半開狀態的試探名額
+                self.circuit_breaker.release()
+            raise
+
+    @traced("geocode")
+    def _get_coordinates(
+        self, location: str, priority: int = PRIORITY_LIVE
+    ) -> tuple[float, float]:
+        """
+        獲取地理坐標，優先使用快取
+
+        Args:
+            location: 地點名稱
+            priority: 排隊優先權
+
+        Returns:
+            (緯度, 經度)
+        """
+        coords = self.geocode_cache.get(location)
+        if coords is not None:
+            return coords
+
+        try:
+            data = self._request("/weather", {"q": location}, priority)
+            self._remember_coordinates(location, data)
+            return data["coord"]["lat"], data["coord"]["lon"]
+
+        except requests.RequestException as e:
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except KeyError as e:
+            raise WeatherError(
+                f"API回應數據結構錯誤: 缺少 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+
+    @traced("current_fetch")
+    def _get_current_weather(self, location: str) -> Dict[str, Any]:
+        """
+        獲取當前天氣
+
+        /weather 的回應同時包含地理坐標與當前天氣，因此不需另外查詢坐標；
+        未快取的地點會順帶記錄其坐標。
+
+        Args:
+            location: 地點名稱
+
+        Returns:
+            當前天氣原始數據
+        """
+        params = self._location_params(location)
+        data = self._request("/weather", params)
+        if "q" in params:
+            self._remember_coordinates(location, data)
+        return data
+
+    @traced("forecast_fetch")
+    def _get_forecast_data(
+        self, location: str, priority: int = PRIORITY_LIVE
+    ) -> Dict[str, Any]:
+        """
+        獲取預報數據
+
+        Args:
+            location: 地點名稱
+            priority: 排隊優先權
+
+        Returns:
+            預報數據
+        """
+        return self._request("/forecast", self._location_params(location), priority)
+
+    def _fetch_weather_data(
+        self, location: str
+    ) -> tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        獲取地點的當前天氣與預報原始數據
+
+        Args:
+            location: 地點名稱
+
+        Returns:
+            (當前天氣數據, 預報數據)
+        """
+        forecast_data, fresh = self._lookup_forecast(location)
+        try:
+            if forecast_data is None:
+                # 並行獲取當前天氣與預報數據
+                forecast_future = self._executor.submit(
+                    self._get_forecast_data, location
+                )
+                current_data = self._get_current_weather(location)
+                forecast_data = forecast_future.result()
+                self._store_forecast(location, forecast_data)
+            else:
+                current_data = self._get_current_weather(location)
+                if not fresh:
+                    self._schedule_forecast_refresh(location)
+        except Exception as e:
+            fallback = self._fallback_weather_data(location)
+            if fallback is None or not self._is_degradable(e):
+                raise
+            return fallback
+        return current_data, forecast_data
+
+    def _refresh_forecast(self, location: str) -> None:
+        """重新獲取預報數據並更新快取，失敗時保留舊數據"""
+        try:
+            forecast_data = self._get_forecast_data(location, PRIORITY_REFRESH)
+            self._store_forecast(location, forecast_data)
+        except Exception:
+            pass
+        finally:
+            self._release_refresh(location)
+
+    def _schedule_forecast_refresh(self, location: str) -> None:
+        """在背景執行緒重新整理過期的預報數據"""
+        if self._claim_refresh(location):
+            self._executor.submit(self._refresh_forecast, location)
+
+    def preseed_locations(self, locations: list[str]) -> list[str]:
+        """
+        預先將地點坐標寫入快取
+
+        Args:
+            locations: 地點名稱列表
+
+        Returns:
+            本次成功寫入快取的地點
+        """
+        missing = self.geocode_cache.missing(locations)
+
+        def seed(location: str) -> Optional[str]:
+            try:
+                self._get_coordinates(location, PRIORITY_REFRESH)
+                return location
+            except WeatherError:
+                return None
+
+        return [loc for loc in self._executor.map(seed, missing) if loc is not None]
+
+    @traced("get_forecast")
     def get_forecast(self, location: str, timezone_offset: int) -> WeatherForecast:
         """
         獲取天氣預報
@@ -168,36 +751,88 @@ class WeatherService:
             WeatherError: 當獲取天氣數據失敗時
         """
         try:
-            # 獲取地理坐標
-            lat, lon = self._get_coordinates(location)
-
             # 設置時區
             tz = timezone(timedelta(hours=timezone_offset))
-            today = datetime.now(tz).date()
-            tomorrow = today + timedelta(days=1)
 
-            # 獲取當前天氣
-            current_weather = self._get_current_weather(lat, lon, tz)
-            today_forecast = [current_weather]
-            tomorrow_forecast = []
+            # 相同地點的並發請求共用同一次上游查詢
+            current_data, forecast_data = self._inflight.do(
+                GeocodeCache.normalize(location),
+                lambda: self._fetch_weather_data(location),
+            )
 
-            # 獲取預報數據
-            forecast_data = self._get_forecast_data(lat, lon)
+            current_weather = self._format_current_weather(current_data, tz)
+            return self._build_forecast(current_weather, forecast_data, tz)
 
-            # 處理預報數據
-            for entry in forecast_data["list"]:
-                dt = datetime.fromtimestamp(entry["dt"], tz)
-                formatted_entry = self._format_forecast_entry(entry, dt)
+        except WeatherError:
+            raise
+        except requests.RequestException as e:
+            # 原始異常的訊息帶有含 API 金鑰的請求網址，不串接以免連同日誌輸出
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except ValueError as e:
+            raise WeatherError(f"JSON解析錯誤: {str(e)}", "JSON_PARSE_ERROR")
+        except KeyError as e:
+            raise WeatherError(
+                f"數據結構錯誤: 缺少關鍵字 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+        except Exception as e:
+            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR") from None
 
-                if dt.date() == today:
-                    today_forecast.append(formatted_entry)
-                elif dt.date() == tomorrow:
-                    tomorrow_forecast.append(formatted_entry)
+    @traced("get_forecast_dict")
+    def get_forecast_dict(self, location: str, timezone_offset: int) -> Dict[str, Any]:
+        """
+        獲取天氣預報（字典格式）
 
-            return WeatherForecast(today=today_forecast, tomorrow=tomorrow_forecast)
+        Args:
+            location: 地點名稱
+            timezone_offset: 時區偏移（小時）
 
+        Returns:
+            天氣預報字典
+        """
+        try:
+            forecast = self.get_forecast(location, timezone_offset)
+            return forecast.model_dump()
+        except WeatherError:
+            raise
+        except Exception as e:
+            raise WeatherError(
+                f"轉換為字典格式時發生錯誤: {str(e)}", "CONVERSION_ERROR"
+            )
+
+    @traced("get_forecast_compact")
+    def get_forecast_compact(
+        self, location: str, timezone_offset: int, vectorized: bool = False
+    ) -> CompactWeatherForecast:
+        """
+        獲取天氣預報（精簡數值格式）
+
+        不經過 pydantic 驗證，也不在處理過程中格式化字串，適合大量地點的批次處理。
+
+        Args:
+            location: 地點名稱
+            timezone_offset: 時區偏移（小時）
+            vectorized: 是否以 NumPy 向量化處理預報數據（需要 numpy）
+
+        Returns:
+            精簡天氣預報對象
+
+        Raises:
+            WeatherError: 當獲取天氣數據失敗時
+        """
+        try:
+            tz = timezone(timedelta(hours=timezone_offset))
+            current_data, forecast_data = self._inflight.do(
+                GeocodeCache.normalize(location),
+                lambda: self._fetch_weather_data(location),
+            )
+            return self._build_compact_forecast(
+                current_data, forecast_data, tz, vectorized
+            )
+
+        except WeatherError:
+            raise
         except requests.RequestException as e:
-            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR")
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
         except ValueError as e:
             raise WeatherError(f"JSON解析錯誤: {str(e)}", "JSON_PARSE_ERROR")
         except KeyError as e:
@@ -205,9 +840,482 @@ class WeatherService:
                 f"數據結構錯誤: 缺少關鍵字 {str(e)}", "DATA_STRUCTURE_ERROR"
             )
         except Exception as e:
-            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR")
+            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR") from None
 
-    def get_forecast_dict(self, location: str, timezone_offset: int) -> Dict[str, Any]:
+    @traced("get_daily_summary")
+    def get_daily_summary(
+        self, location: str, timezone_offset: int
+    ) -> List[DailyWeatherSummary]:
+        """
+        獲取預報期間每日的天氣統計（最低、最高、平均溫度等）
+
+        以 NumPy 向量化計算，需要安裝 numpy。
+
+        Args:
+            location: 地點名稱
+            timezone_offset: 時區偏移（小時）
+
+        Returns:
+            依日期排序的每日統計
+
+        Raises:
+            WeatherError: 當獲取天氣數據失敗或未安裝 numpy 時
+        """
+        try:
+            tz = timezone(timedelta(hours=timezone_offset))
+            _, forecast_data = self._inflight.do(
+                GeocodeCache.normalize(location),
+                lambda: self._fetch_weather_data(location),
+            )
+            return forecast_vectorized.summarize_daily(forecast_data, tz)
+
+        except WeatherError:
+            raise
+        except requests.RequestException as e:
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except ValueError as e:
+            raise WeatherError(f"JSON解析錯誤: {str(e)}", "JSON_PARSE_ERROR")
+        except KeyError as e:
+            raise WeatherError(
+                f"數據結構錯誤: 缺少關鍵字 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+        except Exception as e:
+            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR") from None
+
+    @traced("get_forecasts")
+    def get_forecasts(
+        self,
+        locations: List[str],
+        timezone_offset: int,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> BatchWeatherForecast:
+        """
+        獲取多個地點的天氣預報
+
+        以有限的並發數同時查詢，並共用快取；單一地點失敗不影響其他地點。
+
+        Args:
+            locations: 地點名稱列表（重複的地點只查詢一次）
+            timezone_offset: 時區偏移（小時）
+            max_concurrency: 同時進行的查詢數上限
+
+        Returns:
+            多地點天氣預報對象
+        """
+        locations = list(dict.fromkeys(locations))
+
+        def fetch(location: str) -> Any:
+            try:
+                return self.get_forecast(location, timezone_offset)
+            except WeatherError as e:
+                return e
+
+        # 使用獨立的執行緒池，避免與單次查詢內部的並行請求互相佔用
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_concurrency, len(locations) or 1)),
+            thread_name_prefix="weather-batch",
+        ) as pool:
+            results = list(pool.map(fetch, locations))
+        return self._collect_batch(locations, results)
+
+    def close(self) -> None:
+        """關閉底層 HTTP 連線池與背景執行緒"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AsyncWeatherService(_BaseWeatherService):
+    """
+    非同步天氣預報服務類
+
+    所有請求共用同一個長期存在的 httpx.AsyncClient，
+    透過 keep-alive 連線池與 HTTP/2 多工降低每次查詢的連線成本，
+    且不會阻塞 MCP 伺服器的事件迴圈。
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        geocode_cache: Optional[GeocodeCache] = None,
+        forecast_cache: Optional[ForecastCache] = None,
+        rate_limiter: Optional[AsyncRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        http2: Optional[bool] = None,
+    ):
+        """
+        初始化非同步天氣服務
+
+        Args:
+            api_key: OpenWeatherMap API 金鑰，如未提供則從環境變量獲取
+            geocode_cache: 地理坐標快取，如未提供則使用預設的 SQLite 檔案
+            forecast_cache: 預報數據快取，如未提供則使用預設 TTL 建立
+            rate_limiter: 上游限流器，如未提供則依環境變量設定建立
+            retry_policy: 上游請求重試策略，如未提供則使用預設值
+            circuit_breaker: 上游斷路器，如未提供則使用預設值
+            hedge: 請求超過近期 p95 延遲仍未回應時，是否再發送一次對沖請求
+            max_connections: 連線池最大連線數
+            max_keepalive_connections: 保持存活的閒置連線數上限
+            keepalive_expiry: 閒置連線保留秒數
+            timeout: 單一請求逾時秒數
+            http2: 是否啟用 HTTP/2，預設啟用；未安裝 h2 套件時一律使用 HTTP/1.1
+        """
+        super().__init__(
+            api_key,
+            geocode_cache,
+            forecast_cache,
+            retry_policy,
+            circuit_breaker,
+            rate_limiter=(
+                rate_limiter if rate_limiter is not None else AsyncRateLimiter()
+            ),
+            # 合併相同地點的並發查詢
+            inflight=AsyncSingleFlight(),
+        )
+        self.hedge = hedge
+        # 背景重新整理任務，保留引用避免被垃圾回收
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            # 沒有 h2 時 httpx 會在建立客戶端時拋出 ImportError，即使明確要求也改用 HTTP/1.1
+            http2=_HTTP2_AVAILABLE and (http2 is None or http2),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+    async def __aenter__(self) -> "AsyncWeatherService":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """取消背景重新整理並關閉底層 HTTP 連線池"""
+        for task in self._refresh_tasks:
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        await self.client.aclose()
+
+    def _is_retryable(self, error: BaseException) -> bool:
+        """判斷錯誤是否為暫時性的上游錯誤（逾時、連線錯誤、5xx、429）"""
+        if isinstance(error, WeatherError):
+            return error.error_type == "RATE_LIMITED"
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return isinstance(error, httpx.TransportError)
+
+    async def _send(
+        self, path: str, params: Dict[str, Any], priority: int
+    ) -> Dict[str, Any]:
+        """發送單次 GET 請求並記錄延遲"""
+        async with self.rate_limiter.slot(priority):
+            started = time.monotonic()
+            UPSTREAM_IN_FLIGHT.inc()
+            try:
+                response = await self.client.get(
+                    path, params={**params, "appid": self.api_key, "units": "metric"}
+                )
+            except httpx.HTTPError as e:
+                UPSTREAM_REQUESTS.inc(endpoint=path, status=type(e).__name__)
+                raise
+            finally:
+                UPSTREAM_IN_FLIGHT.dec()
+            self._record_latency(path, response.status_code, started)
+        self._check_rate_limited(response.status_code)
+        response.raise_for_status()
+        return fast_json.loads(response.content)
+
+    async def _send_hedged(
+        self, path: str, params: Dict[str, Any], priority: int
+    ) -> Dict[str, Any]:
+        """
+        發送 GET 請求；超過近期 p95 延遲仍未回應時再發送一次相同請求，
+        採用先成功的回應並取消另一個
+
+        Args:
+            path: API 路徑
+            params: 查詢參數
+            priority: 排隊優先權
+
+        Returns:
+            解析後的 JSON 數據
+        """
+        hedge_delay = self.latency.hedge_delay() if self.hedge else None
+        if hedge_delay is None:
+            return await self._send(path, params, priority)
+
+        pending = {asyncio.ensure_future(self._send(path, params, priority))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                self.hedged_requests += 1
+                # 對沖請求屬於投機性負載，排在即時請求之後，不擠佔上游配額
+                pending.add(
+                    asyncio.ensure_future(self._send(path, params, PRIORITY_REFRESH))
+                )
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _request(
+        self, path: str, params: Dict[str, Any], priority: int = PRIORITY_LIVE
+    ) -> Dict[str, Any]:
+        """
+        對 OpenWeatherMap 發送 GET 請求，受限流器與斷路器控制
+
+        暫時性錯誤依重試策略以抖動指數退避重試，超出時間預算即放棄；
+        慢請求會在 p95 延遲後發送對沖請求以壓低尾延遲。
+
+        Args:
+            path: API 路徑，例如 "/weather"
+            params: 查詢參數（不含 API 金鑰與單位）
+            priority: 排隊優先權，背景重新整理使用 PRIORITY_REFRESH
+
+        Returns:
+            解析後的 JSON 數據
+
+        Raises:
+            WeatherError: 斷路器開路時（CIRCUIT_OPEN）
+        """
+        self._check_circuit()
+        started = time.monotonic()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    data = await self._send_hedged(path, params, priority)
+                except Exception as e:
+                    if not self._is_retryable(e):
+                        # 上游有回應（例如 404），不算作上游故障
+                        self.circuit_breaker.record_success()
+                        raise
+                    self.circuit_breaker.record_failure()
+                    delay = self.retry_policy.next_delay(
+                        attempt, time.monotonic() - started
+                    )
+                    if delay is None or not self.circuit_breaker.allow():
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                else:
+                    self.circuit_breaker.record_success()
+                    return data
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # 被取消（CancelledError）或中斷時沒有上游結果，歸還半開狀態的試探名額
+                self.circuit_breaker.release()
+            raise
+
+    @traced("geocode")
+    async def _get_coordinates(
+        self, location: str, priority: int = PRIORITY_LIVE
+    ) -> tuple[float, float]:
+        """
+        獲取地理坐標，優先使用快取
+
+        Args:
+            location: 地點名稱
+            priority: 排隊優先權
+
+        Returns:
+            (緯度, 經度)
+        """
+        coords = self.geocode_cache.get(location)
+        if coords is not None:
+            return coords
+
+        try:
+            data = await self._request("/weather", {"q": location}, priority)
+            self._remember_coordinates(location, data)
+            return data["coord"]["lat"], data["coord"]["lon"]
+
+        except httpx.HTTPError as e:
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except KeyError as e:
+            raise WeatherError(
+                f"API回應數據結構錯誤: 缺少 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+
+    @traced("current_fetch")
+    async def _get_current_weather(self, location: str) -> Dict[str, Any]:
+        """
+        獲取當前天氣
+
+        /weather 的回應同時包含地理坐標與當前天氣，因此不需另外查詢坐標；
+        未快取的地點會順帶記錄其坐標。
+
+        Args:
+            location: 地點名稱
+
+        Returns:
+            當前天氣原始數據
+        """
+        params = self._location_params(location)
+        data = await self._request("/weather", params)
+        if "q" in params:
+            self._remember_coordinates(location, data)
+        return data
+
+    @traced("forecast_fetch")
+    async def _get_forecast_data(
+        self, location: str, priority: int = PRIORITY_LIVE
+    ) -> Dict[str, Any]:
+        """
+        獲取預報數據
+
+        Args:
+            location: 地點名稱
+            priority: 排隊優先權
+
+        Returns:
+            預報數據
+        """
+        return await self._request(
+            "/forecast", self._location_params(location), priority
+        )
+
+    async def _fetch_weather_data(
+        self, location: str
+    ) -> tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        獲取地點的當前天氣與預報原始數據
+
+        Args:
+            location: 地點名稱
+
+        Returns:
+            (當前天氣數據, 預報數據)
+        """
+        forecast_data, fresh = self._lookup_forecast(location)
+        try:
+            if forecast_data is None:
+                # 並行獲取當前天氣與預報數據
+                current_data, forecast_data = await asyncio.gather(
+                    self._get_current_weather(location),
+                    self._get_forecast_data(location),
+                )
+                self._store_forecast(location, forecast_data)
+            else:
+                current_data = await self._get_current_weather(location)
+                if not fresh:
+                    self._schedule_forecast_refresh(location)
+        except Exception as e:
+            fallback = self._fallback_weather_data(location)
+            if fallback is None or not self._is_degradable(e):
+                raise
+            return fallback
+        return current_data, forecast_data
+
+    async def _refresh_forecast(self, location: str) -> None:
+        """重新獲取預報數據並更新快取，失敗時保留舊數據"""
+        try:
+            forecast_data = await self._get_forecast_data(location, PRIORITY_REFRESH)
+            self._store_forecast(location, forecast_data)
+        except Exception:
+            pass
+        finally:
+            self._release_refresh(location)
+
+    def _schedule_forecast_refresh(self, location: str) -> None:
+        """在背景任務重新整理過期的預報數據"""
+        if self._claim_refresh(location):
+            task = asyncio.create_task(self._refresh_forecast(location))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+
+    async def preseed_locations(self, locations: list[str]) -> list[str]:
+        """
+        預先將地點坐標寫入快取
+
+        Args:
+            locations: 地點名稱列表
+
+        Returns:
+            本次成功寫入快取的地點
+        """
+        missing = self.geocode_cache.missing(locations)
+        results = await asyncio.gather(
+            *(
+                self._get_coordinates(location, PRIORITY_REFRESH)
+                for location in missing
+            ),
+            return_exceptions=True,
+        )
+        return [
+            location
+            for location, result in zip(missing, results)
+            if not isinstance(result, BaseException)
+        ]
+
+    @traced("get_forecast")
+    async def get_forecast(
+        self, location: str, timezone_offset: int
+    ) -> WeatherForecast:
+        """
+        獲取天氣預報
+
+        Args:
+            location: 地點名稱
+            timezone_offset: 時區偏移（小時）
+
+        Returns:
+            天氣預報對象
+
+        Raises:
+            WeatherError: 當獲取天氣數據失敗時
+        """
+        try:
+            # 設置時區
+            tz = timezone(timedelta(hours=timezone_offset))
+
+            # 相同地點的並發請求共用同一次上游查詢
+            current_data, forecast_data = await self._inflight.do(
+                GeocodeCache.normalize(location),
+                lambda: self._fetch_weather_data(location),
+            )
+
+            current_weather = self._format_current_weather(current_data, tz)
+            return self._build_forecast(current_weather, forecast_data, tz)
+
+        except WeatherError:
+            raise
+        except httpx.HTTPError as e:
+            # 原始異常的訊息帶有含 API 金鑰的請求網址，不串接以免連同日誌輸出
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except ValueError as e:
+            raise WeatherError(f"JSON解析錯誤: {str(e)}", "JSON_PARSE_ERROR")
+        except KeyError as e:
+            raise WeatherError(
+                f"數據結構錯誤: 缺少關鍵字 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+        except Exception as e:
+            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR") from None
+
+    @traced("get_forecast_dict")
+    async def get_forecast_dict(
+        self, location: str, timezone_offset: int
+    ) -> Dict[str, Any]:
         """
         獲取天氣預報（字典格式）
 
@@ -219,7 +1327,7 @@ class WeatherService:
             天氣預報字典
         """
         try:
-            forecast = self.get_forecast(location, timezone_offset)
+            forecast = await self.get_forecast(location, timezone_offset)
             return forecast.model_dump()
         except WeatherError:
             raise
@@ -227,3 +1335,118 @@ class WeatherService:
             raise WeatherError(
                 f"轉換為字典格式時發生錯誤: {str(e)}", "CONVERSION_ERROR"
             )
+
+    @traced("get_forecast_compact")
+    async def get_forecast_compact(
+        self, location: str, timezone_offset: int, vectorized: bool = False
+    ) -> CompactWeatherForecast:
+        """
+        獲取天氣預報（精簡數值格式）
+
+        不經過 pydantic 驗證，也不在處理過程中格式化字串，適合大量地點的批次處理。
+
+        Args:
+            location: 地點名稱
+            timezone_offset: 時區偏移（小時）
+            vectorized: 是否以 NumPy 向量化處理預報數據（需要 numpy）
+
+        Returns:
+            精簡天氣預報對象
+
+        Raises:
+            WeatherError: 當獲取天氣數據失敗時
+        """
+        try:
+            tz = timezone(timedelta(hours=timezone_offset))
+            current_data, forecast_data = await self._inflight.do(
+                GeocodeCache.normalize(location),
+                lambda: self._fetch_weather_data(location),
+            )
+            return self._build_compact_forecast(
+                current_data, forecast_data, tz, vectorized
+            )
+
+        except WeatherError:
+            raise
+        except httpx.HTTPError as e:
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except ValueError as e:
+            raise WeatherError(f"JSON解析錯誤: {str(e)}", "JSON_PARSE_ERROR")
+        except KeyError as e:
+            raise WeatherError(
+                f"數據結構錯誤: 缺少關鍵字 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+        except Exception as e:
+            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR") from None
+
+    @traced("get_daily_summary")
+    async def get_daily_summary(
+        self, location: str, timezone_offset: int
+    ) -> List[DailyWeatherSummary]:
+        """
+        獲取預報期間每日的天氣統計（最低、最高、平均溫度等）
+
+        以 NumPy 向量化計算，需要安裝 numpy。
+
+        Args:
+            location: 地點名稱
+            timezone_offset: 時區偏移（小時）
+
+        Returns:
+            依日期排序的每日統計
+
+        Raises:
+            WeatherError: 當獲取天氣數據失敗或未安裝 numpy 時
+        """
+        try:
+            tz = timezone(timedelta(hours=timezone_offset))
+            _, forecast_data = await self._inflight.do(
+                GeocodeCache.normalize(location),
+                lambda: self._fetch_weather_data(location),
+            )
+            return forecast_vectorized.summarize_daily(forecast_data, tz)
+
+        except WeatherError:
+            raise
+        except httpx.HTTPError as e:
+            raise WeatherError(f"網絡請求錯誤: {str(e)}", "NETWORK_ERROR") from None
+        except ValueError as e:
+            raise WeatherError(f"JSON解析錯誤: {str(e)}", "JSON_PARSE_ERROR")
+        except KeyError as e:
+            raise WeatherError(
+                f"數據結構錯誤: 缺少關鍵字 {str(e)}", "DATA_STRUCTURE_ERROR"
+            )
+        except Exception as e:
+            raise WeatherError(f"未預期錯誤: {str(e)}", "UNEXPECTED_ERROR") from None
+
+    @traced("get_forecasts")
+    async def get_forecasts(
+        self,
+        locations: List[str],
+        timezone_offset: int,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> BatchWeatherForecast:
+        """
+        獲取多個地點的天氣預報
+
+        以有限的並發數同時查詢，並共用快取；單一地點失敗不影響其他地點。
+
+        Args:
+            locations: 地點名稱列表（重複的地點只查詢一次）
+            timezone_offset: 時區偏移（小時）
+            max_concurrency: 同時進行的查詢數上限
+
+        Returns:
+            多地點天氣預報對象
+        """
+        locations = list(dict.fromkeys(locations))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(location: str) -> WeatherForecast:
+            async with semaphore:
+                return await self.get_forecast(location, timezone_offset)
+
+        results = await asyncio.gather(
+            *(fetch(location) for location in locations), return_exceptions=True
+        )
+        return self._collect_batch(locations, results)